@@ -0,0 +1,143 @@
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from metrics import registry
+
+# 同时执行的分析任务总数（交互与批量共享）
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "8"))
+# 交互请求（单个上传）的并发与排队上限
+ADMISSION_INTERACTIVE_CONCURRENCY = int(os.getenv("ADMISSION_INTERACTIVE_CONCURRENCY", "8"))
+ADMISSION_INTERACTIVE_QUEUE = int(os.getenv("ADMISSION_INTERACTIVE_QUEUE", "32"))
+# 批量任务（每个文件/链接一项）的并发与排队上限，并发上限小于总数，为交互请求预留名额
+ADMISSION_BATCH_CONCURRENCY = int(os.getenv("ADMISSION_BATCH_CONCURRENCY", "4"))
+ADMISSION_BATCH_QUEUE = int(os.getenv("ADMISSION_BATCH_QUEUE", "64"))
+# 排队等待的最长时间（秒），超时返回503
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+
+LANE_INTERACTIVE = "interactive"
+LANE_BATCH = "batch"
+
+
+class AdmissionRejected(Exception):
+    """系统繁忙，请求未被接纳"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Lane:
+    """一类流量的并发、排队限制和等待队列，priority越小越优先"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, priority: int):
+        self.name = name
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max_queue
+        self.priority = priority
+        self.active = 0
+        self.waiters = deque()
+        # 单个任务平均耗时（指数滑动平均），用于估算Retry-After
+        self.avg_seconds = 5.0
+
+
+class AdmissionController:
+    """
+    接纳控制：限制同时执行的分析任务数，超出部分按优先级排队，
+    队列已满或等待超时时快速拒绝（503 + Retry-After），避免内存和LLM并发无限增长
+    有空闲名额时总是先分配给交互请求，再分配给批量任务；计数在每个工作进程内独立
+    """
+
+    def __init__(self, max_concurrency: int, lanes: List[Lane]):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.active = 0
+        self.lanes: Dict[str, Lane] = {lane.name: lane for lane in lanes}
+        self._by_priority = sorted(lanes, key=lambda lane: lane.priority)
+
+    def _can_run(self, lane: Lane) -> bool:
+        return self.active < self.max_concurrency and lane.active < lane.max_concurrency
+
+    def _update_gauges(self, lane: Lane) -> None:
+        registry.set_gauge(f"admission.{lane.name}.active", lane.active)
+        registry.set_gauge(f"admission.{lane.name}.queued", len(lane.waiters))
+
+    def retry_after(self, lane_name: str) -> int:
+        """按队列长度和平均耗时估算多久后重试（秒）"""
+        lane = self.lanes[lane_name]
+        estimate = lane.avg_seconds * (len(lane.waiters) + 1) / lane.max_concurrency
+        return int(min(max(math.ceil(estimate), 1), 60))
+
+    def _reject(self, lane: Lane, message: str) -> AdmissionRejected:
+        registry.inc(f"admission.{lane.name}.rejected")
+        return AdmissionRejected(message, self.retry_after(lane.name))
+
+    def check(self, lane_name: str) -> None:
+        """快速检查：该类队列已满时直接拒绝，不进入排队"""
+        lane = self.lanes[lane_name]
+        if not self._can_run(lane) and len(lane.waiters) >= lane.max_queue:
+            raise self._reject(lane, "系统繁忙，排队已满，请稍后重试")
+
+    def _dispatch(self) -> None:
+        """把空闲名额按优先级分配给排队中的任务"""
+        for lane in self._by_priority:
+            while lane.waiters and self._can_run(lane):
+                waiter = lane.waiters.popleft()
+                if waiter.done():
+                    continue
+                lane.active += 1
+                self.active += 1
+                waiter.set_result(True)
+            self._update_gauges(lane)
+
+    async def acquire(self, lane_name: str, timeout: Optional[float] = None,
+                      enforce_queue_limit: bool = True) -> None:
+        lane = self.lanes[lane_name]
+        if enforce_queue_limit:
+            self.check(lane_name)
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append(waiter)
+        self._dispatch()
+        try:
+            if not waiter.done():
+                await asyncio.wait_for(waiter, ADMISSION_QUEUE_TIMEOUT if timeout is None else timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # 超时或取消的同时已分配到名额，归还
+                self.release(lane_name)
+            elif waiter in lane.waiters:
+                lane.waiters.remove(waiter)
+                self._update_gauges(lane)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject(lane, "系统繁忙，排队超时，请稍后重试")
+        registry.inc(f"admission.{lane.name}.admitted")
+        registry.observe(f"admission.{lane.name}.wait_seconds", time.perf_counter() - started)
+
+    def release(self, lane_name: str, elapsed: Optional[float] = None) -> None:
+        lane = self.lanes[lane_name]
+        lane.active -= 1
+        self.active -= 1
+        if elapsed is not None:
+            lane.avg_seconds = 0.8 * lane.avg_seconds + 0.2 * elapsed
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, lane_name: str, timeout: Optional[float] = None, enforce_queue_limit: bool = True):
+        """占用一个执行名额，退出时归还"""
+        await self.acquire(lane_name, timeout, enforce_queue_limit)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(lane_name, time.perf_counter() - started)
+
+
+admission = AdmissionController(ADMISSION_MAX_CONCURRENCY, [
+    Lane(LANE_INTERACTIVE, ADMISSION_INTERACTIVE_CONCURRENCY, ADMISSION_INTERACTIVE_QUEUE, priority=0),
+    Lane(LANE_BATCH, ADMISSION_BATCH_CONCURRENCY, ADMISSION_BATCH_QUEUE, priority=1),
+])
@@ -0,0 +1,424 @@
+"""
+离线批量分析：不经过HTTP，直接对目录或压缩包中的简历运行 ResumeProcessor + JobMatcher
+
+用法示例：
+    python bulk_analyze.py resumes/ --job jobs/后端工程师.txt --output results.jsonl
+    python bulk_analyze.py resumes.zip --job 后端=jd1.txt --job 算法=jd2.txt --format parquet --output results/
+
+中断后使用相同参数重新运行即可从检查点继续，已完成的文件不会重复分析
+"""
+import os
+import sys
+import copy
+import json
+import time
+import asyncio
+import argparse
+import tarfile
+import tempfile
+import zipfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from resume_processor import ResumeProcessor
+from job_matcher import JobMatcher
+from prompts import ANALYSIS_MODES, ANALYSIS_MODE_TWO_STEP, ANALYSIS_MODE_COMBINED
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.doc', '.md', '.txt'}
+# 进度输出间隔（秒）
+PROGRESS_INTERVAL = 5.0
+# Parquet每个分片文件的行数
+PARQUET_ROWS_PER_PART = 1000
+# 所有分片使用同一schema：某个分片中整列为空时，按数据推断会得到null类型，与其他分片不兼容
+PARQUET_SCHEMA = pyarrow.schema([
+    ('source', pyarrow.string()),
+    ('job_title', pyarrow.string()),
+    ('status', pyarrow.string()),
+    ('error', pyarrow.string()),
+    ('resume_id', pyarrow.string()),
+    ('name', pyarrow.string()),
+    ('overall_match_score', pyarrow.float64()),
+    ('tfidf_similarity', pyarrow.float64()),
+    ('skill_match_rate', pyarrow.float64()),
+    ('experience_score', pyarrow.float64()),
+    ('education_score', pyarrow.float64()),
+    ('topic_similarity', pyarrow.float64()),
+    ('ai_score', pyarrow.float64()),
+    ('resume_data', pyarrow.string()),
+    ('match_result', pyarrow.string()),
+]) if pyarrow is not None else None
+
+
+class ResumeSource:
+    """输入中的一份简历：key用于检查点，materialize返回可读取的本地路径"""
+
+    def __init__(self, key: str, extension: str, path: Optional[str] = None, read=None):
+        self.key = key
+        self.extension = extension
+        self.path = path
+        self._read = read
+
+    def materialize(self) -> Tuple[str, bool]:
+        """返回 (本地路径, 是否为需要删除的临时文件)"""
+        if self.path is not None:
+            return self.path, False
+        with tempfile.NamedTemporaryFile(delete=False, suffix=self.extension) as temp_file:
+            temp_file.write(self._read())
+            return temp_file.name, True
+
+
+def _extension(name: str) -> str:
+    return os.path.splitext(name)[1].lower()
+
+
+def iter_sources(input_path: str) -> Iterator[ResumeSource]:
+    """遍历目录（递归）、zip或tar压缩包中支持格式的简历，按名称排序保证多次运行顺序一致"""
+    if os.path.isdir(input_path):
+        for root, dirs, files in os.walk(input_path):
+            dirs.sort()
+            for name in sorted(files):
+                if _extension(name) in ALLOWED_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    yield ResumeSource(os.path.relpath(path, input_path), _extension(name), path=path)
+    elif zipfile.is_zipfile(input_path):
+        archive = zipfile.ZipFile(input_path)
+        for info in sorted(archive.infolist(), key=lambda item: item.filename):
+            if not info.is_dir() and _extension(info.filename) in ALLOWED_EXTENSIONS:
+                yield ResumeSource(info.filename, _extension(info.filename),
+                                   read=lambda info=info: archive.read(info))
+    elif tarfile.is_tarfile(input_path):
+        archive = tarfile.open(input_path)
+        for member in sorted(archive.getmembers(), key=lambda item: item.name):
+            if member.isfile() and _extension(member.name) in ALLOWED_EXTENSIONS:
+                yield ResumeSource(member.name, _extension(member.name),
+                                   read=lambda member=member: archive.extractfile(member).read())
+    else:
+        raise ValueError(f"输入必须是目录、zip或tar压缩包: {input_path}")
+
+
+def load_jobs(specs: List[str]) -> List[Dict[str, str]]:
+    """岗位参数格式为 "标题=岗位描述文件" 或 "岗位描述文件"（标题取文件名）"""
+    jobs = []
+    for spec in specs:
+        title, separator, path = spec.partition('=')
+        if not separator:
+            path, title = spec, os.path.splitext(os.path.basename(spec))[0]
+        with open(path, 'r', encoding='utf-8') as file:
+            jobs.append({'title': title, 'description': file.read()})
+    return jobs
+
+
+class Checkpoint:
+    """
+    检查点：每行记录一个已完成的文件及其状态（追加写入），
+    文件的结果写入输出并落盘后才记录，中断后重新运行时跳过已完成的文件
+    输出与检查点分别落盘，两者之间中断时输出中已有记录而检查点没有，由输出中已有的记录补齐（见 BulkAnalyzer.run）
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    key, _, status = line.rstrip('\n').rpartition('\t')
+                    if key:
+                        self.done[key] = status
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def mark(self, entries: List[Tuple[str, str]]) -> None:
+        if not entries:
+            return
+        self._file.write(''.join(f"{key}\t{status}\n" for key, status in entries))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done.update(entries)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _record_key(record: Dict[str, Any]) -> Tuple[str, str]:
+    return record['source'], record['job_title']
+
+
+class JSONLWriter:
+    """
+    逐文件追加JSONL记录，每个文件的记录写入后立即刷盘
+    existing为输出中已有的 (文件, 岗位) -> 状态，同一对有多条记录时以最后一条为准
+    """
+
+    def __init__(self, path: str):
+        self.existing: Dict[Tuple[str, str], str] = {}
+        # 上次中断时可能留下不完整的最后一行，截掉
+        if os.path.exists(path):
+            with open(path, 'rb+') as file:
+                content_end = file.seek(0, os.SEEK_END)
+                if content_end:
+                    file.seek(max(content_end - 65536, 0))
+                    tail = file.read()
+                    if not tail.endswith(b'\n'):
+                        newline = tail.rfind(b'\n')
+                        file.truncate(content_end - len(tail) + newline + 1 if newline >= 0 else 0)
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    record = json.loads(line)
+                    self.existing[_record_key(record)] = record['status']
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, key: str, status: str, records: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """写入一个文件的记录，返回可以记入检查点的文件"""
+        self._file.write(''.join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return [(key, status)]
+
+    def close(self) -> List[Tuple[str, str]]:
+        self._file.close()
+        return []
+
+
+class ParquetWriter:
+    """
+    列式输出：记录缓冲到一定行数后写成一个分片文件（part-00000.parquet），
+    分片写完后其中的文件才记入检查点；嵌套的解析结果以JSON字符串列保存
+    existing为已有分片中的 (文件, 岗位) -> 状态，同一对有多条记录时以编号最大的分片为准
+    """
+
+    def __init__(self, directory: str, rows_per_part: int = PARQUET_ROWS_PER_PART):
+        if pyarrow is None:
+            raise RuntimeError("输出Parquet需要安装pyarrow: pip install pyarrow")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.rows_per_part = rows_per_part
+        parts = sorted(name for name in os.listdir(directory) if name.endswith('.parquet'))
+        self._part = len(parts)
+        self.existing: Dict[Tuple[str, str], str] = {}
+        for name in parts:
+            table = pyarrow.parquet.read_table(os.path.join(directory, name), columns=['source', 'job_title', 'status'])
+            for record in table.to_pylist():
+                self.existing[_record_key(record)] = record['status']
+        self._rows: List[Dict[str, Any]] = []
+        self._pending: List[Tuple[str, str]] = []
+
+    @staticmethod
+    def _float(value: Any) -> Optional[float]:
+        try:
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _flatten(record: Dict[str, Any]) -> Dict[str, Any]:
+        match_result = record.get('match_result') or {}
+        resume_data = record.get('resume_data') or {}
+        ai_assessment = match_result.get('ai_assessment') or {}
+        name = (resume_data.get('personal_info') or {}).get('name')
+        to_float = ParquetWriter._float
+        return {
+            'source': record['source'],
+            'job_title': record['job_title'],
+            'status': record['status'],
+            'error': record.get('error'),
+            'resume_id': resume_data.get('resume_id'),
+            'name': str(name) if name is not None else None,
+            'overall_match_score': to_float(match_result.get('overall_match_score')),
+            'tfidf_similarity': to_float(match_result.get('tfidf_similarity')),
+            'skill_match_rate': to_float((match_result.get('skill_match') or {}).get('match_rate')),
+            'experience_score': to_float((match_result.get('experience_match') or {}).get('match_score')),
+            'education_score': to_float((match_result.get('education_match') or {}).get('match_score')),
+            'topic_similarity': to_float(match_result.get('topic_similarity')),
+            'ai_score': to_float(ai_assessment.get('overall_score')),
+            'resume_data': json.dumps(resume_data, ensure_ascii=False) if resume_data else None,
+            'match_result': json.dumps(match_result, ensure_ascii=False) if match_result else None,
+        }
+
+    def _flush(self) -> List[Tuple[str, str]]:
+        if not self._rows:
+            return []
+        path = os.path.join(self.directory, f"part-{self._part:05d}.parquet")
+        # 先写临时文件再改名，避免中断时留下不完整的分片
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(self._rows, schema=PARQUET_SCHEMA), path + '.tmp')
+        os.replace(path + '.tmp', path)
+        self._part += 1
+        committed, self._rows, self._pending = self._pending, [], []
+        return committed
+
+    def write(self, key: str, status: str, records: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        self._rows.extend(self._flatten(record) for record in records)
+        self._pending.append((key, status))
+        return self._flush() if len(self._rows) >= self.rows_per_part else []
+
+    def close(self) -> List[Tuple[str, str]]:
+        return self._flush()
+
+
+class Progress:
+    """定期输出进度、吞吐量和预计剩余时间"""
+
+    def __init__(self, total: int, skipped: int):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._last_report = 0.0
+
+    def update(self, failed: bool) -> None:
+        self.done += 1
+        self.failed += int(failed)
+        self.report()
+
+    def report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.skipped - self.done
+        eta = time.strftime('%H:%M:%S', time.gmtime(remaining / rate)) if rate > 0 else '--:--:--'
+        finished = self.skipped + self.done
+        print(
+            f"[进度] {finished}/{self.total} ({finished / max(self.total, 1):.1%}) "
+            f"本次完成 {self.done}，失败 {self.failed}，跳过 {self.skipped} | "
+            f"{rate:.2f} 份/秒 | 已用 {time.strftime('%H:%M:%S', time.gmtime(elapsed))} | 预计剩余 {eta}",
+            file=sys.stderr, flush=True
+        )
+
+
+class BulkAnalyzer:
+    """用固定数量的协程并发分析简历，结果按完成顺序写出"""
+
+    def __init__(self, jobs: List[Dict[str, str]], analysis_mode: str = ANALYSIS_MODE_TWO_STEP, workers: int = 4):
+        self.jobs = jobs
+        self.analysis_mode = analysis_mode
+        self.workers = max(workers, 1)
+        self.resume_processor = ResumeProcessor()
+        self.job_matcher = JobMatcher()
+
+    async def analyze(self, source: ResumeSource,
+                      jobs: Optional[List[Dict[str, str]]] = None) -> Tuple[str, List[Dict[str, Any]]]:
+        """分析一份简历对jobs（默认为所有岗位）的匹配，返回 (状态, 每个岗位一条记录)"""
+        jobs = self.jobs if jobs is None else jobs
+        records = []
+        path, is_temp = None, False
+        try:
+            path, is_temp = source.materialize()
+            resume_data = None
+            for job in jobs:
+                # 两步模式下简历解析与岗位无关，只解析一次；合并模式每个岗位单独调用
+                if resume_data is None or self.analysis_mode == ANALYSIS_MODE_COMBINED:
+                    resume_data = await self.resume_processor.process_file(
+                        path, source.extension, job['description'], job['title'], self.analysis_mode
+                    )
+                job_resume_data = copy.deepcopy(resume_data)
+                match_result = await self.job_matcher.calculate_match(
+                    job_resume_data, job['description'], job['title'],
+                    ai_assessment=job_resume_data.pop('ai_assessment', None)
+                )
+                records.append({
+                    'source': source.key,
+                    'job_title': job['title'],
+                    'status': 'success',
+                    'resume_data': job_resume_data,
+                    'match_result': match_result
+                })
+            return 'success', records
+        except Exception as e:
+            print(f"分析失败 {source.key}: {e}", file=sys.stderr)
+            done_jobs = {record['job_title'] for record in records}
+            records.extend({
+                'source': source.key,
+                'job_title': job['title'],
+                'status': 'error',
+                'error': str(e)
+            } for job in jobs if job['title'] not in done_jobs)
+            return 'error', records
+        finally:
+            if is_temp and os.path.exists(path):
+                os.unlink(path)
+
+    async def run(self, sources: List[ResumeSource], writer, checkpoint: Checkpoint, retry_errors: bool = False):
+        # 输出中已有的记录不再重复分析和写入：成功的岗位总是跳过，失败的岗位只在retry_errors时重新分析
+        existing = writer.existing
+        queue: asyncio.Queue = asyncio.Queue()
+        repaired = []
+        for source in sources:
+            if source.key in checkpoint.done and (not retry_errors or checkpoint.done[source.key] == 'success'):
+                continue
+            statuses = {job['title']: existing.get((source.key, job['title'])) for job in self.jobs}
+            jobs = [
+                job for job in self.jobs
+                if statuses[job['title']] is None or (retry_errors and statuses[job['title']] != 'success')
+            ]
+            if jobs:
+                queue.put_nowait((source, jobs, statuses))
+            else:
+                # 上次写完输出、记录检查点之前中断：按输出补记检查点
+                status = 'success' if all(value == 'success' for value in statuses.values()) else 'error'
+                if checkpoint.done.get(source.key) != status:
+                    repaired.append((source.key, status))
+        checkpoint.mark(repaired)
+        progress = Progress(len(sources), len(sources) - queue.qsize())
+        progress.report(force=True)
+
+        async def worker():
+            while True:
+                try:
+                    source, jobs, statuses = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                status, records = await self.analyze(source, jobs)
+                # 本次跳过的岗位中有失败的（未指定retry_errors），整个文件仍记为失败
+                skipped = [statuses[job['title']] for job in self.jobs if job not in jobs]
+                if any(value != 'success' for value in skipped):
+                    status = 'error'
+                checkpoint.mark(writer.write(source.key, status, records))
+                progress.update(status != 'success')
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.workers)))
+        finally:
+            checkpoint.mark(writer.close())
+            progress.report(force=True)
+        return progress
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="离线批量分析简历与岗位匹配度")
+    parser.add_argument('input', help="简历目录、zip或tar压缩包")
+    parser.add_argument('--job', action='append', required=True,
+                        help="岗位描述文件，可写成 标题=文件路径，可重复指定多个岗位")
+    parser.add_argument('--output', required=True, help="输出路径：JSONL文件，或Parquet分片目录")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl', help="输出格式")
+    parser.add_argument('--workers', type=int, default=4, help="同时分析的简历数")
+    parser.add_argument('--analysis-mode', choices=sorted(ANALYSIS_MODES), default=ANALYSIS_MODE_TWO_STEP)
+    parser.add_argument('--checkpoint', help="检查点文件，默认为 输出路径.checkpoint")
+    parser.add_argument('--retry-errors', action='store_true', help="重新分析上次失败的文件")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.job)
+    sources = list(iter_sources(args.input))
+    writer = ParquetWriter(args.output) if args.format == 'parquet' else JSONLWriter(args.output)
+    checkpoint = Checkpoint(args.checkpoint or args.output.rstrip('/\\') + '.checkpoint')
+    print(f"共 {len(sources)} 份简历，{len(jobs)} 个岗位，输出到 {args.output}", file=sys.stderr)
+
+    try:
+        progress = asyncio.run(
+            BulkAnalyzer(jobs, args.analysis_mode, args.workers).run(sources, writer, checkpoint, args.retry_errors)
+        )
+    except KeyboardInterrupt:
+        print("已中断，重新运行相同命令可从检查点继续", file=sys.stderr)
+        return 130
+    finally:
+        checkpoint.close()
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
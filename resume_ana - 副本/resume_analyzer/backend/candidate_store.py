@@ -0,0 +1,357 @@
+import os
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from metrics import registry
+from resume_store import resume_store
+
+# 保存的 (简历, 岗位) 匹配记录上限，以及单个岗位的候选人上限；超过后淘汰最久未更新的记录
+CANDIDATE_STORE_MAX_ROWS = int(os.getenv("CANDIDATE_STORE_MAX_ROWS", "200000"))
+CANDIDATE_STORE_MAX_PER_JOB = int(os.getenv("CANDIDATE_STORE_MAX_PER_JOB", "20000"))
+
+# 参与最终评分的各维度，与 JobMatcher.score_weights 的键一致
+FEATURE_NAMES = ['tfidf_score', 'skill_match', 'experience_match', 'education_match', 'topic_match', 'ai_score']
+
+# 每个 (简历, 岗位) 一行，只保留排序和筛选需要的字段；缺失的得分（如AI评估降级）记为NaN
+CANDIDATE_DTYPE = np.dtype(
+    [('job', '<u4'), ('resume', '<u4'), ('overall_match_score', '<f4')]
+    + [(name, '<f4') for name in FEATURE_NAMES]
+    + [('total_years', '<u2'), ('degree_match', '?'), ('matched_skill_count', '<u2'),
+       ('missing_skill_count', '<u2'), ('skill_start', '<u4'), ('skill_count', '<u2'), ('updated', '<u8')]
+)
+# 已淘汰、等待复用的行
+FREE_JOB = np.iinfo(np.uint32).max
+# 技能数组中失效的片段超过此数量且超过一半时压缩
+SKILL_COMPACT_MIN = 4096
+
+SORTABLE_COLUMNS = ['overall_match_score'] + FEATURE_NAMES + ['total_years', 'matched_skill_count']
+
+
+def make_job_id(job_title: str, job_description: str) -> str:
+    """根据岗位名称和描述生成稳定的岗位ID"""
+    return hashlib.sha1(f"{job_title}\n{job_description}".encode('utf-8')).hexdigest()[:16]
+
+
+class Interner:
+    """字符串与整数ID的双向映射，释放的ID会被复用"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.values: List[Optional[str]] = []
+        self._free: List[int] = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    def intern(self, value: str) -> int:
+        value_id = self._ids.get(value)
+        if value_id is None:
+            if self._free:
+                value_id = self._free.pop()
+                self.values[value_id] = value
+            else:
+                value_id = len(self.values)
+                self.values.append(value)
+            self._ids[value] = value_id
+        return value_id
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+    def release(self, value_id: int) -> None:
+        value = self.values[value_id]
+        if value is not None:
+            del self._ids[value]
+            self.values[value_id] = None
+            self._free.append(value_id)
+
+
+def _set_at(values: List[Any], index: int, value: Any) -> None:
+    if index == len(values):
+        values.append(value)
+    else:
+        values[index] = value
+
+
+class CandidateStore:
+    """
+    列式候选人存储：得分为NumPy结构化数组，技能为CSR格式的整数ID，简历原文从resume_store读取
+    相比保存完整的匹配结果字典，内存占用大幅减少，并支持向量化的筛选、排序和top-k
+    总行数和单个岗位的行数有上限，超过后淘汰最久未更新的记录，淘汰的行和技能片段会被复用或压缩
+    """
+
+    def __init__(self, capacity: int = 1024, max_rows: int = CANDIDATE_STORE_MAX_ROWS,
+                 max_per_job: int = CANDIDATE_STORE_MAX_PER_JOB):
+        self.max_rows = max_rows
+        self.max_per_job = max_per_job
+        self._rows = np.zeros(capacity, dtype=CANDIDATE_DTYPE)
+        self._size = 0
+        self._live = 0
+        self._free_rows: List[int] = []
+        self._updates = 0
+        self._skill_ids = np.zeros(capacity * 8, dtype=np.uint32)
+        self._skill_size = 0
+        # 技能数组中已失效（被覆盖或淘汰）的ID数量
+        self._skill_garbage = 0
+        self._jobs = Interner()
+        self._job_titles: List[Optional[str]] = []
+        self._job_counts: Dict[int, int] = {}
+        self._resumes = Interner()
+        self._names: List[Optional[str]] = []
+        self._resume_counts: Dict[int, int] = {}
+        self._skills = Interner()
+        self._row_index: Dict[Tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._live
+
+    def upsert(self, job_id: str, job_title: str, resume_data: Dict[str, Any],
+               overall_score: float, scores: Dict[str, Optional[float]],
+               skill_match: Dict[str, Any], experience_match: Dict[str, Any],
+               education_match: Dict[str, Any]) -> None:
+        """保存一次匹配结果中与排序、筛选相关的字段"""
+        resume_id = resume_data.get('resume_id')
+        if not resume_id:
+            return
+        skills = resume_data.get('skills') or []
+        if isinstance(skills, str):
+            skills = [skills]
+        personal_info = resume_data.get('personal_info') or {}
+
+        with self._lock:
+            job = self._jobs.intern(job_id)
+            _set_at(self._job_titles, job, job_title)
+            resume = self._resumes.intern(resume_id)
+            _set_at(self._names, resume, personal_info.get('name'))
+
+            skill_ids = sorted({self._skills.intern(str(skill).lower().strip()) for skill in skills if skill})
+
+            row_index = self._row_index.get((job, resume))
+            if row_index is None:
+                row_index = self._new_row()
+                self._row_index[(job, resume)] = row_index
+                self._job_counts[job] = self._job_counts.get(job, 0) + 1
+                self._resume_counts[resume] = self._resume_counts.get(resume, 0) + 1
+                skill_start = self._append_skills(skill_ids)
+            else:
+                # 重新匹配时技能数不超过原片段则原地覆盖，否则追加新片段，原片段记为失效
+                skill_start = int(self._rows['skill_start'][row_index])
+                old_count = int(self._rows['skill_count'][row_index])
+                if len(skill_ids) <= old_count:
+                    self._skill_ids[skill_start:skill_start + len(skill_ids)] = skill_ids
+                    self._skill_garbage += old_count - len(skill_ids)
+                else:
+                    self._skill_garbage += old_count
+                    skill_start = self._append_skills(skill_ids)
+
+            self._updates += 1
+            row = self._rows[row_index:row_index + 1]
+            row['job'] = job
+            row['resume'] = resume
+            row['overall_match_score'] = overall_score
+            for name in FEATURE_NAMES:
+                value = scores.get(name)
+                row[name] = np.nan if value is None else value
+            row['total_years'] = min(int(experience_match.get('total_years', 0) or 0), 65535)
+            row['degree_match'] = bool(education_match.get('degree_match', False))
+            row['matched_skill_count'] = min(len(skill_match.get('matched_skills', [])), 65535)
+            row['missing_skill_count'] = min(len(skill_match.get('missing_skills', [])), 65535)
+            row['skill_start'] = skill_start
+            row['skill_count'] = len(skill_ids)
+            row['updated'] = self._updates
+
+            if self._job_counts[job] > self.max_per_job:
+                self._evict(np.flatnonzero(self._rows['job'][:self._size] == job), self.max_per_job)
+            if self._live > self.max_rows:
+                self._evict(np.flatnonzero(self._rows['job'][:self._size] != FREE_JOB), self.max_rows)
+            if self._skill_garbage > max(SKILL_COMPACT_MIN, self._skill_size // 2):
+                self._compact_skills()
+
+            registry.set_gauge("candidate_store.rows", self._live)
+            registry.set_gauge("candidate_store.bytes", self.memory_bytes())
+
+    def _new_row(self) -> int:
+        """优先复用淘汰的行"""
+        self._live += 1
+        if self._free_rows:
+            return self._free_rows.pop()
+        if self._size == len(self._rows):
+            self._rows = np.resize(self._rows, len(self._rows) * 2)
+        self._size += 1
+        return self._size - 1
+
+    def _evict(self, rows: np.ndarray, limit: int) -> None:
+        """淘汰rows中最久未更新的记录，保留limit的九成左右，避免每次写入都触发淘汰"""
+        count = len(rows) - limit + limit // 10
+        if count <= 0:
+            return
+        if count < len(rows):
+            rows = rows[np.argpartition(self._rows['updated'][rows], count - 1)[:count]]
+        for row_index in rows:
+            self._free_row(int(row_index))
+        registry.inc("candidate_store.evicted", len(rows))
+
+    def _free_row(self, row_index: int) -> None:
+        row = self._rows[row_index]
+        job, resume = int(row['job']), int(row['resume'])
+        del self._row_index[(job, resume)]
+        self._skill_garbage += int(row['skill_count'])
+        self._rows[row_index:row_index + 1]['job'] = FREE_JOB
+        self._rows[row_index:row_index + 1]['skill_count'] = 0
+        self._free_rows.append(row_index)
+        self._live -= 1
+        # 没有记录引用的岗位和简历释放ID
+        self._job_counts[job] -= 1
+        if not self._job_counts[job]:
+            del self._job_counts[job]
+            self._jobs.release(job)
+            self._job_titles[job] = None
+        self._resume_counts[resume] -= 1
+        if not self._resume_counts[resume]:
+            del self._resume_counts[resume]
+            self._resumes.release(resume)
+            self._names[resume] = None
+
+    def _compact_skills(self) -> None:
+        """按行重新排列技能数组，去掉失效的片段"""
+        rows = np.flatnonzero(self._rows['job'][:self._size] != FREE_JOB)
+        counts = self._rows['skill_count'][rows].astype(np.int64)
+        starts = self._rows['skill_start'][rows].astype(np.int64)
+        offsets = np.cumsum(counts) - counts
+        total = int(counts.sum())
+        positions = np.repeat(starts - offsets, counts) + np.arange(total)
+        compacted = np.zeros(max(total * 2, 1024), dtype=np.uint32)
+        compacted[:total] = self._skill_ids[positions]
+        self._rows['skill_start'][rows] = offsets
+        self._skill_ids = compacted
+        self._skill_size = total
+        self._skill_garbage = 0
+        registry.inc("candidate_store.skill_compactions")
+
+    def _append_skills(self, skill_ids: List[int]) -> int:
+        start = self._skill_size
+        end = start + len(skill_ids)
+        if end > len(self._skill_ids):
+            self._skill_ids = np.resize(self._skill_ids, max(end, len(self._skill_ids) * 2))
+        self._skill_ids[start:end] = skill_ids
+        self._skill_size = end
+        return start
+
+    def get_text(self, resume_id: str) -> Optional[str]:
+        """取出简历原文（与简历分析结果一起保存在resume_store中，这里不重复保存）"""
+        with self._lock:
+            if self._resumes.lookup(resume_id) is None:
+                return None
+        return resume_store.get_text(resume_id)
+
+    def has_job(self, job_id: str) -> bool:
+        with self._lock:
+            return self._jobs.lookup(job_id) is not None
+
+    def count(self, job_id: str) -> int:
+        with self._lock:
+            job = self._jobs.lookup(job_id)
+            return 0 if job is None else self._job_counts.get(job, 0)
+
+    def _job_rows(self, job_id: str) -> Optional[np.ndarray]:
+        job = self._jobs.lookup(job_id)
+        if job is None:
+            return None
+        return np.flatnonzero(self._rows['job'][:self._size] == job)
+
+    def _rows_with_skill(self, rows: np.ndarray, skill_id: int) -> np.ndarray:
+        """在CSR技能列表中向量化查找包含某技能的行"""
+        starts = self._rows['skill_start'][rows].astype(np.int64)
+        counts = self._rows['skill_count'][rows].astype(np.int64)
+        total = int(counts.sum())
+        if total == 0:
+            return rows[:0]
+        entry_rows = np.repeat(rows, counts)
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        return np.unique(entry_rows[self._skill_ids[positions] == skill_id])
+
+    def query(self, job_id: str, min_score: Optional[float] = None, skills: Optional[List[str]] = None,
+              sort_by: str = 'overall_match_score', top_k: Optional[int] = None,
+              degree_match: Optional[bool] = None) -> Optional[List[Dict[str, Any]]]:
+        """按条件筛选岗位下的候选人并排序，岗位不存在返回None"""
+        with self._lock:
+            rows = self._job_rows(job_id)
+            if rows is None:
+                return None
+            data = self._rows
+            if min_score is not None:
+                rows = rows[data['overall_match_score'][rows] >= min_score]
+            if degree_match is not None:
+                rows = rows[data['degree_match'][rows] == degree_match]
+            for skill in skills or []:
+                skill_id = self._skills.lookup(skill.lower().strip())
+                if skill_id is None:
+                    return []
+                rows = self._rows_with_skill(rows, skill_id)
+            values = np.nan_to_num(data[sort_by][rows].astype(np.float64), nan=-1.0)
+            order = self._top_order(values, top_k)
+            return [self._row_summary(int(rows[i]), float(values[i]) if sort_by != 'overall_match_score' else None)
+                    for i in order]
+
+    def rank_with_weights(self, job_id: str, weights: np.ndarray,
+                          top_k: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """用新权重一次矩阵乘法重新计算岗位下所有候选人的分数并排序，岗位不存在返回None"""
+        with self._lock:
+            rows = self._job_rows(job_id)
+            if rows is None:
+                return None
+            selected = self._rows[rows]
+            matrix = np.column_stack([selected[name] for name in FEATURE_NAMES]).astype(np.float64)
+            present = ~np.isnan(matrix)
+            # 与 _calculate_final_score 一致：缺失维度不计入，其余权重重新归一化
+            weighted = np.where(present, matrix, 0.0) @ weights
+            used = present @ weights
+            scores = np.clip(
+                np.divide(weighted, used, out=np.zeros(len(rows), dtype=np.float64), where=used > 0), 0.0, 1.0
+            )
+            order = self._top_order(scores, top_k)
+            return [
+                {
+                    'rank': rank + 1,
+                    'resume_id': self._resumes.values[self._rows['resume'][rows[i]]],
+                    'name': self._names[self._rows['resume'][rows[i]]],
+                    'score': float(scores[i])
+                }
+                for rank, i in enumerate(order)
+            ]
+
+    def _top_order(self, values: np.ndarray, top_k: Optional[int]) -> np.ndarray:
+        """降序排序；只需要top-k时用argpartition避免全量排序"""
+        if top_k is not None and top_k < len(values):
+            order = np.argpartition(-values, top_k - 1)[:top_k]
+            return order[np.argsort(-values[order], kind='stable')]
+        return np.argsort(-values, kind='stable')
+
+    def _row_summary(self, row_index: int, sort_value: Optional[float] = None) -> Dict[str, Any]:
+        row = self._rows[row_index]
+        resume = int(row['resume'])
+        skill_start = int(row['skill_start'])
+        skill_ids = self._skill_ids[skill_start:skill_start + int(row['skill_count'])]
+        summary = {
+            'resume_id': self._resumes.values[resume],
+            'name': self._names[resume],
+            'overall_match_score': float(row['overall_match_score']),
+            'scores': {name: None if np.isnan(row[name]) else float(row[name]) for name in FEATURE_NAMES},
+            'total_years': int(row['total_years']),
+            'degree_match': bool(row['degree_match']),
+            'matched_skill_count': int(row['matched_skill_count']),
+            'missing_skill_count': int(row['missing_skill_count']),
+            'skills': [self._skills.values[i] for i in skill_ids]
+        }
+        if sort_value is not None:
+            summary['sort_value'] = sort_value
+        return summary
+
+    def memory_bytes(self) -> int:
+        """列式数据占用的字节数（不含字符串驻留表）"""
+        return int(self._rows[:self._size].nbytes + self._skill_ids[:self._skill_size].nbytes)
+
+
+candidate_store = CandidateStore()
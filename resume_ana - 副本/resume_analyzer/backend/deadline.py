@@ -0,0 +1,54 @@
+import os
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+# 未指定时每个请求的处理时限（秒），也是客户端可指定的上限
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "120"))
+# 客户端通过该请求头告知愿意等待的秒数
+DEADLINE_HEADER = "X-Request-Timeout"
+# 剩余时间少于该值时跳过LLM调用（简历AI解析、AI综合评估）
+DEADLINE_MIN_LLM_SECONDS = float(os.getenv("DEADLINE_MIN_LLM_SECONDS", "3"))
+# 剩余时间少于该值时跳过主题模型
+DEADLINE_MIN_TOPIC_SECONDS = float(os.getenv("DEADLINE_MIN_TOPIC_SECONDS", "1"))
+
+
+class Deadline:
+    """请求级时间预算，随请求传递到文本提取、LLM调用和各匹配阶段"""
+
+    def __init__(self, seconds: float = REQUEST_DEADLINE):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_headers(cls, headers: Mapping[str, str]) -> 'Deadline':
+        """从请求头读取时限，缺失或非法时使用默认值，且不超过REQUEST_DEADLINE"""
+        try:
+            seconds = float(headers.get(DEADLINE_HEADER, REQUEST_DEADLINE))
+        except (TypeError, ValueError):
+            seconds = REQUEST_DEADLINE
+        if not 0 < seconds <= REQUEST_DEADLINE:
+            seconds = REQUEST_DEADLINE
+        return cls(seconds)
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """剩余时间是否还够执行预计耗时seconds的阶段"""
+        return self.remaining() >= seconds
+
+    def limit(self, timeout: float) -> float:
+        """把阶段自身的超时缩短到剩余时间以内"""
+        return min(timeout, self.remaining())
+
+    def skip(self, stage: str, skipped_stages: List[Dict[str, Any]]) -> None:
+        """记录因时间不足而跳过的阶段"""
+        skipped_stages.append({'stage': stage, 'reason': f"剩余时间不足（{self.remaining():.1f}秒）"})
+
+
+def remaining_seconds(deadline: Optional[Deadline]) -> Optional[float]:
+    """传给LLM客户端的截止时间，未设置时由客户端使用默认值"""
+    return deadline.remaining() if deadline is not None else None
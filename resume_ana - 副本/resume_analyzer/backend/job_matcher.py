@@ -1,114 +1,32 @@
 import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from typing import Dict, Any, List, Tuple
-from sklearn.feature_extraction.text import TfidfVectorizer
+from typing import Dict, Any, List, Optional, Tuple
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import LatentDirichletAllocation
-import re
 import json
-from llama_index.core.llms import CustomLLM
-from llama_index.core.base.llms.types import ChatMessage, ChatResponse, CompletionResponse, LLMMetadata
-import requests
-from collections import Counter
+from resume_processor import DoubaoLLM
+from prompts import build_assessment_prompt
+from prompt_builder import build_prompt_text
+from json_stream import extract_json_object
+from candidate_store import candidate_store, make_job_id
+from text_analysis import AnalyzedDocument, analyze_job_description, tfidf_vectors, cosine
+from metrics import registry
+import profiling
+from tracing import span
+from memory_monitor import track_memory
+from deadline import Deadline, DEADLINE_MIN_LLM_SECONDS, DEADLINE_MIN_TOPIC_SECONDS, remaining_seconds
 
-class DoubaoLLM(CustomLLM):
-    api_key: str
-    model: str = "doubao-1-5-pro-32k-250115"
-    api_url: str = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
-    
-    @property
-    def metadata(self) -> LLMMetadata:
-        return LLMMetadata(
-            context_window=32000,
-            num_output=4000,
-            model_name=self.model
-        )
-    
-    def _complete(self, prompt: str, **kwargs) -> CompletionResponse:
-        try:
-            response = requests.post(
-                self.api_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                },
-                json={
-                    "model": self.model,
-                    "messages": [{"role": "user", "content": prompt}]
-                }
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                return CompletionResponse(text=content)
-            else:
-                return CompletionResponse(text="生成失败")
-        except Exception as e:
-            return CompletionResponse(text="生成失败")
-    
-    def _chat(self, messages, **kwargs) -> ChatResponse:
-        try:
-            api_messages = []
-            for msg in messages:
-                api_messages.append({
-                    "role": msg.role.value,
-                    "content": msg.content
-                })
-            
-            response = requests.post(
-                self.api_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                },
-                json={
-                    "model": self.model,
-                    "messages": api_messages
-                }
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                return ChatResponse(
-                    message=ChatMessage(role="assistant", content=content)
-                )
-            else:
-                return ChatResponse(
-                    message=ChatMessage(role="assistant", content="生成失败")
-                )
-        except Exception as e:
-            return ChatResponse(
-                message=ChatMessage(role="assistant", content="生成失败")
-            )
-    
-    async def acomplete(self, prompt: str, **kwargs) -> CompletionResponse:
-        return self._complete(prompt, **kwargs)
-    
-    async def achat(self, messages, **kwargs) -> ChatResponse:
-        return self._chat(messages, **kwargs)
-    
-    async def astream_complete(self, prompt: str, **kwargs):
-        raise NotImplementedError("astream_complete is not implemented")
-    
-    async def astream_chat(self, messages, **kwargs):
-        raise NotImplementedError("astream_chat is not implemented")
-    
-    def complete(self, prompt: str, **kwargs) -> CompletionResponse:
-        return self._complete(prompt, **kwargs)
-    
-    def chat(self, messages, **kwargs) -> ChatResponse:
-        return self._chat(messages, **kwargs)
-    
-    def stream_complete(self, prompt: str, **kwargs):
-        raise NotImplementedError("stream_complete is not implemented")
-    
-    def stream_chat(self, messages, **kwargs):
-        raise NotImplementedError("stream_chat is not implemented")
-    
-    def _as_query_component(self):
-        raise NotImplementedError("_as_query_component is not implemented")
+# 各CPU阶段（TF-IDF、技能、经验、学历、主题）的超时时间（秒）
+MATCH_STAGE_TIMEOUT = float(os.getenv("MATCH_STAGE_TIMEOUT", "10"))
+# AI综合评估阶段的超时时间（秒），LLM客户端自身另有截止时间和重试
+MATCH_AI_TIMEOUT = float(os.getenv("MATCH_AI_TIMEOUT", "70"))
+# 执行CPU阶段的线程池大小
+MATCH_STAGE_WORKERS = int(os.getenv("MATCH_STAGE_WORKERS", "4"))
+
+_stage_executor = ThreadPoolExecutor(max_workers=MATCH_STAGE_WORKERS, thread_name_prefix="match-stage")
 
 class JobMatcher:
     def __init__(self):
@@ -126,47 +44,122 @@ class JobMatcher:
             'soft_skills': 0.10,
             'domain_knowledge': 0.15
         }
+        
+        # 各维度在最终得分中的权重（键与 candidate_store.FEATURE_NAMES 一致）
+        self.score_weights = {
+            'tfidf_score': 0.15,
+            'skill_match': 0.30,
+            'experience_match': 0.25,
+            'education_match': 0.10,
+            'topic_match': 0.10,
+            'ai_score': 0.10
+        }
     
-    async def calculate_match(self, resume_data: Dict[str, Any], job_description: str, job_title: str) -> Dict[str, Any]:
+    async def calculate_match(self, resume_data: Dict[str, Any], job_description: str, job_title: str,
+                              ai_assessment: Dict[str, Any] = None,
+                              deadline: Optional[Deadline] = None,
+                              include_report: bool = True) -> Dict[str, Any]:
         """
         匹配度
+        ai_assessment: 合并模式下已由简历解析同一次调用得到的AI评估，传入则跳过评估调用；
+            resume_data的skipped_stages中已有ai_assessment时（fast模式）同样不调用LLM
+        deadline: 请求级时间预算，剩余时间不足时跳过AI评估和主题模型等可选阶段
+        include_report: 为False时不生成detailed_analysis和recommendations（只需要得分时）
         """
         try:
-            # 1.TF-IDF余弦相似度匹配
-            tfidf_score = self._calculate_tfidf_similarity(resume_data, job_description)
-            
-            # 2.技能匹配分析
-            skill_match = self._calculate_skill_match(resume_data, job_description)
-            
-            # 3.经验匹配分析
-            experience_match = self._calculate_experience_match(resume_data, job_description)
+            degraded_stages = []
+            # 简历解析阶段已跳过的步骤一并返回
+            skipped_stages = resume_data.pop('skipped_stages', [])
+            
+            # 5.综合评估：LLM调用最慢，最先发起，与下面的CPU阶段并行
+            ai_task = None
+            skipped_assessment = next((item for item in skipped_stages if item['stage'] == 'ai_assessment'), None)
+            if ai_assessment is None:
+                if skipped_assessment is not None:
+                    # fast模式：简历解析阶段已决定不调用LLM
+                    ai_assessment = self._degraded_assessment(skipped_assessment['reason'])
+                elif deadline is not None and not deadline.allows(DEADLINE_MIN_LLM_SECONDS):
+                    deadline.skip('ai_assessment', skipped_stages)
+                    ai_assessment = self._degraded_assessment("剩余时间不足，已跳过AI评估")
+                else:
+                    ai_task = asyncio.ensure_future(self._run_stage(
+                        'ai_assessment', self._ai_comprehensive_assessment(
+                            self._build_resume_parts(resume_data), job_description, job_title, deadline
+                        ),
+                        deadline.limit(MATCH_AI_TIMEOUT) if deadline is not None else MATCH_AI_TIMEOUT,
+                        None, degraded_stages
+                    ))
             
-            # 4.教育背景匹配
-            education_match = self._calculate_education_match(resume_data, job_description)
-            
-            # 5.综合评估
-            ai_assessment = await self._ai_comprehensive_assessment(resume_data, job_description, job_title)
-            
-            # 6.主题分析
-            topic_match = self._calculate_topic_similarity(resume_data, job_description)
-            
-            #最终匹配度
-            final_score = self._calculate_final_score({
+            try:
+                # 简历和岗位描述各分析一次（分词、n-gram、技能命中），各阶段共用
+                resume_doc, job_doc = await self._run_stage(
+                    'analyze', self._in_executor(self._analyze_documents, resume_data, job_description),
+                    MATCH_STAGE_TIMEOUT, (None, None), degraded_stages
+                )
+                
+                # 1-4、6：相互独立的CPU阶段在线程池中同时执行
+                if resume_doc is not None:
+                    tfidf_score, skill_match, experience_match, education_match, topic_match = await asyncio.gather(
+                        self._run_stage('tfidf_score', self._in_executor(self._calculate_tfidf_similarity, resume_doc, job_doc),
+                                        MATCH_STAGE_TIMEOUT, 0.0, degraded_stages),
+                        self._run_stage('skill_match', self._in_executor(self._calculate_skill_match, resume_data, job_doc),
+                                        MATCH_STAGE_TIMEOUT, {'match_rate': 0.0, 'matched_skills': [], 'missing_skills': []},
+                                        degraded_stages),
+                        self._run_stage('experience_match', self._in_executor(self._calculate_experience_match, resume_data, job_doc),
+                                        MATCH_STAGE_TIMEOUT, {'match_score': 0.0, 'relevant_experience': [], 'total_years': 0},
+                                        degraded_stages),
+                        self._run_stage('education_match', self._in_executor(self._calculate_education_match, resume_data, job_doc),
+                                        MATCH_STAGE_TIMEOUT, {'match_score': 0.0, 'degree_match': False, 'major_relevance': 0.0},
+                                        degraded_stages),
+                        self._run_optional_stage('topic_match', self._calculate_topic_similarity, (resume_doc, job_doc),
+                                                 DEADLINE_MIN_TOPIC_SECONDS, 0.0, degraded_stages,
+                                                 skipped_stages, deadline)
+                    )
+                else:
+                    tfidf_score, topic_match = 0.0, 0.0
+                    skill_match = {'match_rate': 0.0, 'matched_skills': [], 'missing_skills': []}
+                    experience_match = {'match_score': 0.0, 'relevant_experience': [], 'total_years': 0}
+                    education_match = {'match_score': 0.0, 'degree_match': False, 'major_relevance': 0.0}
+                    degraded_stages.extend(
+                        {'stage': stage, 'reason': 'analyze失败，已跳过'}
+                        for stage in ('tfidf_score', 'skill_match', 'experience_match', 'education_match', 'topic_match')
+                    )
+                
+                if ai_task is not None:
+                    ai_assessment = await ai_task
+                    if ai_assessment is None:
+                        ai_assessment = self._degraded_assessment(
+                            next(item['reason'] for item in degraded_stages if item['stage'] == 'ai_assessment')
+                        )
+                    elif ai_assessment.get('degraded'):
+                        degraded_stages.append({'stage': 'ai_assessment', 'reason': ai_assessment.get('degraded_reason', '')})
+            finally:
+                if ai_task is not None and not ai_task.done():
+                    ai_task.cancel()
+            
+            #最终匹配度（失败或超时的阶段记为缺失，不参与评分）
+            failed = {item['stage'] for item in degraded_stages + skipped_stages}
+            scores = {
                 'tfidf_score': tfidf_score,
                 'skill_match': skill_match,
                 'experience_match': experience_match,
                 'education_match': education_match,
                 'topic_match': topic_match,
-                'ai_score': ai_assessment.get('overall_score', 0.5)
-            })
-            
-            #报告
-            detailed_analysis = self._generate_detailed_analysis(
-                resume_data, job_description, job_title,
-                tfidf_score, skill_match, experience_match, education_match, topic_match, ai_assessment
+                'ai_score': None if ai_assessment.get('degraded') else ai_assessment.get('overall_score')
+            }
+            scores = {metric: None if metric in failed else score for metric, score in scores.items()}
+            final_score = self._calculate_final_score(scores)
+            
+            # 以列式紧凑格式保存各维度得分，用于筛选、排序和调整权重后重排
+            job_id = make_job_id(job_title, job_description)
+            candidate_store.upsert(
+                job_id, job_title, resume_data, final_score,
+                {metric: self._score_value(score) for metric, score in scores.items()},
+                skill_match, experience_match, education_match
             )
             
-            return {
+            result = {
+                'job_id': job_id,
                 'overall_match_score': final_score,
                 'tfidf_similarity': tfidf_score,
                 'skill_match': skill_match,
@@ -174,52 +167,95 @@ class JobMatcher:
                 'education_match': education_match,
                 'topic_similarity': topic_match,
                 'ai_assessment': ai_assessment,
-                'detailed_analysis': detailed_analysis,
-                'recommendations': self._generate_recommendations(skill_match, experience_match, ai_assessment)
+                'degraded_stages': degraded_stages,
+                'skipped_stages': skipped_stages
             }
             
+            #报告
+            if include_report:
+                result['detailed_analysis'] = self._generate_detailed_analysis(
+                    resume_data, job_description, job_title,
+                    tfidf_score, skill_match, experience_match, education_match, topic_match, ai_assessment
+                )
+                result['recommendations'] = self._generate_recommendations(skill_match, experience_match, ai_assessment)
+            
+            return result
+            
         except Exception as e:
             return {
                 'error': f"匹配计算失败: {str(e)}",
                 'overall_match_score': 0.0
             }
     
-    def _calculate_tfidf_similarity(self, resume_data: Dict[str, Any], job_description: str) -> float:
+    async def _run_stage(self, name: str, awaitable, timeout: float, fallback, degraded_stages: List[Dict[str, str]]):
+        """
+        执行单个阶段并限制耗时，超时或异常时返回fallback并记录到degraded_stages
+        注意：超时的线程池任务无法被中断，只是不再等待其结果
+        """
+        started = time.perf_counter()
+        with span(f"match.{name}") as trace_span, track_memory(f"match.{name}"):
+            try:
+                return await asyncio.wait_for(awaitable, timeout)
+            except asyncio.TimeoutError:
+                reason = f"{name}超时（>{timeout:g}秒）"
+                registry.inc(f"match.stage.{name}.timeout")
+            except Exception as e:
+                reason = f"{name}失败: {str(e)}"
+                registry.inc(f"match.stage.{name}.error")
+            finally:
+                registry.observe(f"match.stage.{name}.seconds", time.perf_counter() - started)
+            trace_span.set_attribute('degraded_reason', reason)
+        print(f"匹配阶段降级: {reason}")
+        degraded_stages.append({'stage': name, 'reason': reason})
+        return fallback
+    
+    async def _run_optional_stage(self, name: str, func, args: tuple, min_seconds: float, fallback,
+                                  degraded_stages: List[Dict[str, str]], skipped_stages: List[Dict[str, Any]],
+                                  deadline: Optional[Deadline]):
+        """剩余时间不足min_seconds时跳过可选阶段，否则在剩余时间内执行"""
+        if deadline is None:
+            return await self._run_stage(name, self._in_executor(func, *args), MATCH_STAGE_TIMEOUT,
+                                         fallback, degraded_stages)
+        if not deadline.allows(min_seconds):
+            deadline.skip(name, skipped_stages)
+            return fallback
+        return await self._run_stage(name, self._in_executor(func, *args), deadline.limit(MATCH_STAGE_TIMEOUT),
+                                     fallback, degraded_stages)
+    
+    def _in_executor(self, func, *args):
+        """把CPU密集的阶段放到线程池执行（请求在性能分析中时一并记录）"""
+        return asyncio.get_running_loop().run_in_executor(_stage_executor, profiling.bind(func), *args)
+    
+    def _analyze_documents(self, resume_data: Dict[str, Any], job_description: str) -> Tuple[AnalyzedDocument, AnalyzedDocument]:
+        """构建简历和岗位描述的分析结果"""
+        resume_doc = AnalyzedDocument(self._build_resume_text(resume_data), self._build_resume_parts(resume_data))
+        return resume_doc, analyze_job_description(job_description)
+    
+    def _calculate_tfidf_similarity(self, resume_doc: AnalyzedDocument, job_doc: AnalyzedDocument) -> float:
         """使用TF-IDF计算文本相似度"""
         try:
-            # 构建简历文本
-            resume_text = self._build_resume_text(resume_data)
-            
-            # TF-IDF向量化
-            vectorizer = TfidfVectorizer(
-                stop_words='english',
-                max_features=1000,
-                ngram_range=(1, 2),
-                min_df=1
-            )
-            
-            # 计算TF-IDF矩阵
-            tfidf_matrix = vectorizer.fit_transform([resume_text, job_description])
+            # 由已统计的1-2元词频计算TF-IDF矩阵（最多1000个特征）
+            tfidf_matrix = tfidf_vectors([resume_doc.ngram_counts, job_doc.ngram_counts], max_features=1000)
             
             # 计算余弦相似度
-            similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
-            
-            return float(similarity)
+            return cosine(tfidf_matrix[0], tfidf_matrix[1])
             
         except Exception as e:
             print(f"TF-IDF计算失败: {e}")
             return 0.0
     
-    def _calculate_skill_match(self, resume_data: Dict[str, Any], job_description: str) -> Dict[str, Any]:
+    def _calculate_skill_match(self, resume_data: Dict[str, Any], job_doc: AnalyzedDocument) -> Dict[str, Any]:
         """计算技能匹配度"""
         try:
-            # 提取岗位要求的技能
-            job_skills = self._extract_job_skills(job_description)
+            # 岗位要求的技能
+            job_skills = job_doc.skill_hits
             
             # 获取简历中的技能
             resume_skills = resume_data.get('skills', [])
             if isinstance(resume_skills, str):
                 resume_skills = [resume_skills]
+            # 复制一份，避免把关键词写回简历数据
+            resume_skills = list(resume_skills)
             
             # 添加关键词中的技能
             keywords = resume_data.get('keywords', [])
@@ -258,7 +294,7 @@ class JobMatcher:
             print(f"技能匹配计算失败: {e}")
             return {'match_rate': 0.0, 'matched_skills': [], 'missing_skills': []}
     
-    def _calculate_experience_match(self, resume_data: Dict[str, Any], job_description: str) -> Dict[str, Any]:
+    def _calculate_experience_match(self, resume_data: Dict[str, Any], job_doc: AnalyzedDocument) -> Dict[str, Any]:
         """计算工作经验匹配度"""
         try:
             work_experience = resume_data.get('work_experience', [])
@@ -266,12 +302,14 @@ class JobMatcher:
             if not work_experience:
                 return {'match_score': 0.0, 'relevant_experience': [], 'total_years': 0}
             
-            #总工作年限
-            total_years = len(work_experience)  # 每个工作经历约1年
+            #总工作年限：规则提取的经历带有按起止时间计算的years，否则每个工作经历约1年
+            total_years = sum(
+                exp['years'] if isinstance(exp.get('years'), (int, float)) else 1 for exp in work_experience
+            )
             
             #相关经验
             relevant_experience = []
-            job_keywords = self._extract_job_keywords(job_description)
+            job_keywords = job_doc.keywords(20)
             
             for exp in work_experience:
                 exp_text = f"{exp.get('position', '')} {exp.get('description', '')}"
@@ -302,7 +340,7 @@ class JobMatcher:
             print(f"经验匹配计算失败: {e}")
             return {'match_score': 0.0, 'relevant_experience': [], 'total_years': 0}
     
-    def _calculate_education_match(self, resume_data: Dict[str, Any], job_description: str) -> Dict[str, Any]:
+    def _calculate_education_match(self, resume_data: Dict[str, Any], job_doc: AnalyzedDocument) -> Dict[str, Any]:
         """计算教育背景匹配度"""
         try:
             education = resume_data.get('education', [])
@@ -323,7 +361,7 @@ class JobMatcher:
             major_relevance = 0.0
 
             # 岗位描述中学历要求
-            job_desc = job_description.lower()
+            job_desc = job_doc.normalized
             required_degree = None
             if '博士' in job_desc or 'phd' in job_desc:
                 required_degree = 3
@@ -363,21 +401,11 @@ class JobMatcher:
             print(f"教育背景匹配计算失败: {e}")
             return {'match_score': 0.0, 'degree_match': False, 'major_relevance': 0.0}
     
-    def _calculate_topic_similarity(self, resume_data: Dict[str, Any], job_description: str) -> float:
+    def _calculate_topic_similarity(self, resume_doc: AnalyzedDocument, job_doc: AnalyzedDocument) -> float:
         """使用主题模型计算相似度"""
         try:
-            # 构建文档
-            resume_text = self._build_resume_text(resume_data)
-            documents = [resume_text, job_description]
-            
-            # TF-IDF向量化
-            vectorizer = TfidfVectorizer(
-                max_features=100,
-                stop_words='english',
-                min_df=1
-            )
-            
-            tfidf_matrix = vectorizer.fit_transform(documents)
+            # 由已统计的词频计算TF-IDF矩阵（最多100个单词特征）
+            tfidf_matrix = tfidf_vectors([resume_doc.unigram_counts, job_doc.unigram_counts], max_features=100)
             
             # LDA主题建模
             lda = LatentDirichletAllocation(n_components=5, random_state=42)
@@ -395,101 +423,80 @@ class JobMatcher:
             print(f"主题相似度计算失败: {e}")
             return 0.0
     
-    async def _ai_comprehensive_assessment(self, resume_data: Dict[str, Any], job_description: str, job_title: str) -> Dict[str, Any]:
+    async def _ai_comprehensive_assessment(self, resume_parts: List[str], job_description: str, job_title: str,
+                                           deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """使用AI进行综合评估"""
         try:
-            resume_text = self._build_resume_text(resume_data)
+            # 原文与结构化字段去重后按岗位相关度裁剪到token预算内
+            resume_text, prompt_stats = build_prompt_text(resume_parts, job_description)
             
-            prompt = f"""
-            作为一名专业的HR和技术专家，请评估以下简历与目标岗位的匹配度：
-
-            目标岗位：{job_title}
-
-            岗位描述：
-            {job_description}
-
-            候选人简历：
-            {resume_text}
-
-            请从以下几个维度进行评估（0-1分）：
-            1. 技术技能匹配度
-            2. 工作经验相关性
-            3. 项目经验适配度
-            4. 学习能力和发展潜力
-            5. 整体适合度
-
-            请以JSON格式返回评估结果：
-            {{
-                "technical_skills": 0.8,
-                "work_experience": 0.7,
-                "project_experience": 0.6,
-                "learning_potential": 0.8,
-                "overall_score": 0.75,
-                "strengths": ["优势1", "优势2"],
-                "weaknesses": ["不足1", "不足2"],
-                "summary": "综合评估总结"
-            }}
-            """
-            
-            response = self.llm.complete(prompt)
+            prompt = build_assessment_prompt(resume_text, job_description, job_title)
+            
+            response = await self.llm.acomplete(prompt, deadline=remaining_seconds(deadline))
             result_text = response.text
             
+            # LLM超时/熔断等情况直接返回降级结果
+            if response.additional_kwargs.get('degraded'):
+                return self._degraded_assessment(response.additional_kwargs.get('reason', 'AI评估暂时不可用'))
+            
             # 尝试解析JSON
-            try:
-                json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group()
-                    return json.loads(json_str)
-            except json.JSONDecodeError:
-                pass
-            
-            # 如果解析失败，返回默认结构
-            return {
-                "technical_skills": 0.5,
-                "work_experience": 0.5,
-                "project_experience": 0.5,
-                "learning_potential": 0.5,
-                "overall_score": 0.5,
-                "strengths": ["需要进一步分析"],
-                "weaknesses": ["需要进一步分析"],
-                "summary": "AI评估暂时不可用"
-            }
+            assessment = extract_json_object(result_text)
+            if isinstance(assessment, dict):
+                assessment['prompt_stats'] = prompt_stats
+                return assessment
+            
+            # 如果解析失败，返回降级结构
+            return self._degraded_assessment("AI评估结果解析失败")
             
         except Exception as e:
             print(f"AI评估失败: {e}")
-            return {
-                "technical_skills": 0.5,
-                "work_experience": 0.5,
-                "project_experience": 0.5,
-                "learning_potential": 0.5,
-                "overall_score": 0.5,
-                "strengths": [],
-                "weaknesses": [],
-                "summary": f"评估失败: {str(e)}"
-            }
+            return self._degraded_assessment(f"评估失败: {str(e)}")
+    
+    def _degraded_assessment(self, reason: str) -> Dict[str, Any]:
+        """AI评估不可用时的降级结果，不参与最终评分"""
+        return {
+            "technical_skills": 0.0,
+            "work_experience": 0.0,
+            "project_experience": 0.0,
+            "learning_potential": 0.0,
+            "overall_score": 0.0,
+            "strengths": [],
+            "weaknesses": [],
+            "summary": f"AI评估暂时不可用（已降级）: {reason}",
+            "degraded": True,
+            "degraded_reason": reason
+        }
     
     def _calculate_final_score(self, scores: Dict[str, float]) -> float:
         """计算最终匹配分数"""
-        weights = {
-            'tfidf_score': 0.15,
-            'skill_match': 0.30,
-            'experience_match': 0.25,
-            'education_match': 0.10,
-            'topic_match': 0.10,
-            'ai_score': 0.10
-        }
+        weights = self.score_weights
         
         final_score = 0.0
+        used_weight = 0.0
         for metric, score in scores.items():
-            if metric in weights:
-                if isinstance(score, dict):
-                    score = score.get('match_rate', 0.0) if 'match_rate' in score else score.get('match_score', 0.0)
+            score = self._score_value(score)
+            # 缺失（如AI评估降级）的维度不参与计算，其余权重重新归一化
+            if metric in weights and score is not None:
                 final_score += weights[metric] * score
+                used_weight += weights[metric]
+        
+        if used_weight > 0:
+            final_score /= used_weight
         
         return min(max(final_score, 0.0), 1.0)  # 确保分数在0-1之间
     
+    def _score_value(self, score):
+        """各维度得分统一为数值，匹配结果字典取match_rate或match_score"""
+        if isinstance(score, dict):
+            return score.get('match_rate', 0.0) if 'match_rate' in score else score.get('match_score', 0.0)
+        return score
+    
     def _build_resume_text(self, resume_data: Dict[str, Any]) -> str:
         """构建简历文本"""
+        return ' '.join(self._build_resume_parts(resume_data))
+    
+    def _build_resume_parts(self, resume_data: Dict[str, Any]) -> List[str]:
+        """简历文本片段：原文、技能、工作经验、项目经验"""
         text_parts = []
         
         # 添加原始文本
@@ -513,51 +520,7 @@ class JobMatcher:
             if isinstance(project, dict):
                 text_parts.append(f"{project.get('name', '')} {project.get('description', '')}")
         
-        return ' '.join(text_parts)
-    
-    def _extract_job_skills(self, job_description: str) -> List[str]:
-        """从岗位描述中提取技能要求"""
-        # 常见技术技能关键词
-        tech_skills = [
-            'python', 'java', 'javascript', 'react', 'vue', 'angular', 'node.js',
-            'django', 'flask', 'spring', 'mysql', 'postgresql', 'mongodb',
-            'docker', 'kubernetes', 'aws', 'azure', 'git', 'linux',
-            'machine learning', 'deep learning', 'ai', 'data analysis',
-            'html', 'css', 'sql', 'redis', 'elasticsearch', 'microservices',
-            'agile', 'scrum', 'devops', 'ci/cd', 'api', 'graphql',
-            'testing', 'unit testing', 'integration testing', 'selenium', 'junit', 'testng',
-            '人工智能', '大数据', '数据分析', '深度学习', '机器学习', '前端', '后端', '全栈', '小程序',
-            '算法', '架构', '测试', '自动化测试', '项目管理', '产品经理', '运维', '云计算', '区块链',
-            '移动开发', '安卓', 'iOS', '嵌入式', '网络安全', '数据挖掘', '爬虫', '数据库', '分布式',
-            '高并发', '高可用', '微服务', '接口', '中台', 'ERP', 'CRM', 'OA', 'CMS', 'B2B', 'B2C',
-            'SaaS', 'PaaS', 'IaaS', '物联网', '边缘计算', '智能硬件', '虚拟现实', '增强现实', '5G',
-            '区块链', '智能合约', '数字货币', 'NFT', '云原生', '边缘计算', '容器化', '服务网格',
-            '持续集成', '持续部署', '自动化运维', '基础设施即代码', '监控', '日志分析', '性能优化',
-            '安全', '加密', '身份认证', '访问控制', '漏洞扫描', '渗透测试', '安全审计',
-            '数据可视化', 'BI', '报表', '数据仓库', 'ETL', '数据治理', '数据质量',
-            '数据建模', '数据挖掘', '数据科学', '统计分析', '自然语言处理',
-        ]
-        
-        job_desc_lower = job_description.lower()
-        found_skills = []
-        
-        for skill in tech_skills:
-            if skill in job_desc_lower:
-                found_skills.append(skill)
-        
-        return found_skills
-    
-    def _extract_job_keywords(self, job_description: str) -> List[str]:
-        """提取岗位关键词"""
-        # 简单的关键词提取
-        words = re.findall(r'\b\w+\b', job_description.lower())
-        # 过滤常见停用词
-        stopwords = {'的', '了', '和', '是', '在', '与', '及', '为', '对', '等', '也', '就', '都', '而', '及其', '并', '或', '被', '由', '于'}
-        keywords = [word for word in words if len(word) > 1 and word not in stopwords]
-
-        # 返回最常见的关键词
-        word_counts = Counter(keywords)
-        return [word for word, count in word_counts.most_common(20)]
+        return text_parts
     
     def _calculate_text_relevance(self, text: str, keywords: List[str]) -> float:
         """计算文本与关键词的相关性"""
@@ -0,0 +1,134 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class _Frame:
+    """解析栈中的一层对象或数组"""
+
+    __slots__ = ('is_object', 'path', 'key', 'expect_key', 'value_start', 'scalar_pending')
+
+    def __init__(self, is_object: bool, path: Optional[Tuple[str, ...]]):
+        self.is_object = is_object
+        # 数组内部的字段不单独输出，path为None
+        self.path = path
+        self.key = None
+        self.expect_key = is_object
+        self.value_start = None
+        self.scalar_pending = False
+
+
+class IncrementalJSONParser:
+    """
+    增量JSON解析器：逐段输入LLM输出，字段值一旦完整即返回
+    会跳过JSON之前的说明文字或```json标记，返回字段路径用"."连接，如 "assessment.overall_score"
+    """
+
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self.buffer = ''
+        self.result = None
+        self.done = False
+        self._pos = 0
+        self._start = None
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._string_is_key = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """输入一段文本，返回本次新完成的 (字段路径, 值) 列表"""
+        if self.done or not chunk:
+            return []
+        self.buffer += chunk
+        events = []
+        buffer = self.buffer
+        i = self._pos
+        while i < len(buffer) and not self.done:
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string(i, events)
+            elif self._start is None:
+                if ch == '{':
+                    self._start = i
+                    self._stack.append(_Frame(True, ()))
+            else:
+                self._step(ch, i, events)
+            i += 1
+        self._pos = i
+        return events
+
+    def _step(self, ch: str, i: int, events: List[Tuple[str, Any]]) -> None:
+        frame = self._stack[-1]
+        if frame.scalar_pending and (ch in ',}]' or ch.isspace()):
+            self._complete_value(frame, i, events)
+        if ch == '"':
+            self._in_string = True
+            self._string_start = i
+            self._string_is_key = frame.is_object and frame.expect_key
+            if not self._string_is_key and frame.value_start is None:
+                frame.value_start = i
+        elif ch in '{[':
+            if frame.value_start is None:
+                frame.value_start = i
+            child_path = None
+            if frame.is_object and frame.path is not None:
+                child_path = frame.path + (frame.key,)
+            self._stack.append(_Frame(ch == '{', child_path))
+        elif ch in '}]':
+            self._stack.pop()
+            if not self._stack:
+                self.done = True
+                self.result = json.loads(self.buffer[self._start:i + 1])
+                return
+            self._complete_value(self._stack[-1], i + 1, events)
+        elif ch == ',':
+            if frame.is_object:
+                frame.expect_key = True
+        elif ch == ':':
+            pass
+        elif not ch.isspace():
+            if frame.value_start is None:
+                frame.value_start = i
+                frame.scalar_pending = True
+
+    def _close_string(self, i: int, events: List[Tuple[str, Any]]) -> None:
+        frame = self._stack[-1] if self._stack else None
+        if frame is None:
+            return
+        if self._string_is_key:
+            frame.key = json.loads(self.buffer[self._string_start:i + 1])
+            frame.expect_key = False
+        elif frame.value_start == self._string_start:
+            self._complete_value(frame, i + 1, events)
+
+    def _complete_value(self, frame: _Frame, end: int, events: List[Tuple[str, Any]]) -> None:
+        start = frame.value_start
+        frame.value_start = None
+        frame.scalar_pending = False
+        if start is None or not frame.is_object or frame.path is None:
+            return
+        path = frame.path + (frame.key,)
+        if len(path) > self.max_depth:
+            return
+        try:
+            value = json.loads(self.buffer[start:end])
+        except ValueError:
+            return
+        events.append(('.'.join(path), value))
+
+
+def extract_json_object(text: str) -> Optional[Any]:
+    """提取文本中第一个完整的JSON对象，解析失败返回None"""
+    parser = IncrementalJSONParser(max_depth=0)
+    try:
+        parser.feed(text)
+    except ValueError:
+        return None
+    return parser.result
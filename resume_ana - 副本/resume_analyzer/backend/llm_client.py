@@ -0,0 +1,547 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, Iterator, AsyncIterator
+import aiohttp
+import requests
+from metrics import registry
+import tracing
+from tracing import span
+from rate_limiter import (
+    TokenBucketLimiter, RateLimitTimeout, doubao_chat_limiter,
+    estimate_tokens, estimate_request_tokens, estimate_output_tokens
+)
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class LLMCallError(Exception):
+    """LLM调用失败"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(LLMCallError):
+    """熔断器打开，请求被快速拒绝"""
+
+
+class LLMCallConfig:
+    """LLM调用的超时、重试、对冲和熔断配置（通过环境变量调整）"""
+
+    def __init__(self):
+        # 单次逻辑调用（含重试）的总截止时间
+        self.deadline = _env_float("DOUBAO_DEADLINE", 60.0)
+        # 单次HTTP尝试的超时
+        self.attempt_timeout = _env_float("DOUBAO_ATTEMPT_TIMEOUT", 30.0)
+        self.connect_timeout = _env_float("DOUBAO_CONNECT_TIMEOUT", 5.0)
+        # 指数退避重试
+        self.max_retries = _env_int("DOUBAO_MAX_RETRIES", 2)
+        self.backoff_base = _env_float("DOUBAO_BACKOFF_BASE", 0.5)
+        self.backoff_max = _env_float("DOUBAO_BACKOFF_MAX", 8.0)
+        # 对冲请求：超过历史p95延迟仍未返回时再发一份
+        self.hedge_enabled = os.getenv("DOUBAO_HEDGE", "0") == "1"
+        self.hedge_quantile = _env_float("DOUBAO_HEDGE_QUANTILE", 0.95)
+        self.hedge_min_samples = _env_int("DOUBAO_HEDGE_MIN_SAMPLES", 20)
+        # 熔断器
+        self.breaker_failure_threshold = _env_int("DOUBAO_BREAKER_FAILURES", 5)
+        self.breaker_reset_timeout = _env_float("DOUBAO_BREAKER_RESET", 30.0)
+
+
+class CircuitBreaker:
+    """
+    连续失败达到阈值后打开，冷却后放行一个探测请求
+    acquire返回的凭证在调用结束时交给release：探测请求未记录成功或失败就结束时（调用方放弃、
+    不计入熔断的错误、意外异常）释放探测名额，否则熔断器会一直停在半开状态
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        # 进行中的探测请求凭证，None为没有
+        self._probe: Optional[int] = None
+        self._probe_seq = 0
+        self._lock = threading.Lock()
+        self._publish()
+
+    def acquire(self) -> Optional[int]:
+        """放行时返回凭证（关闭状态为0，半开状态下的探测请求为正数），拒绝时返回None"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe = None
+                self._publish()
+            if self.state == self.HALF_OPEN and self._probe is None:
+                self._probe_seq += 1
+                self._probe = self._probe_seq
+                return self._probe
+            return None
+
+    def release(self, ticket: Optional[int]) -> None:
+        """调用结束；若该调用是仍未记录结果的探测请求，释放探测名额"""
+        with self._lock:
+            if ticket and self._probe == ticket:
+                self._probe = None
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probe = None
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                self._publish()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe = None
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    registry.inc(f"{self.name}.breaker_opened")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._publish()
+
+    def _publish(self) -> None:
+        # 0=关闭 1=半开 2=打开
+        value = {self.CLOSED: 0, self.HALF_OPEN: 1, self.OPEN: 2}[self.state]
+        registry.set_gauge(f"{self.name}.breaker_state", value)
+
+
+class LatencyTracker:
+    """记录最近成功请求的延迟，用于估计对冲触发时间"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(int(q * len(ordered)), len(ordered) - 1)
+        return ordered[index]
+
+
+class ResilientLLMClient:
+    """带截止时间、配额限流、抖动重试、对冲请求和熔断的HTTP JSON调用"""
+
+    def __init__(self, name: str = "llm", config: Optional[LLMCallConfig] = None,
+                 rate_limiter: Optional[TokenBucketLimiter] = None):
+        self.name = name
+        self.config = config or LLMCallConfig()
+        self.rate_limiter = rate_limiter
+        self.breaker = CircuitBreaker(
+            name, self.config.breaker_failure_threshold, self.config.breaker_reset_timeout
+        )
+        self.latency = LatencyTracker()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix=f"{name}-hedge")
+
+    def post_json(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                  deadline: Optional[float] = None) -> Dict[str, Any]:
+        """发送POST请求并返回JSON，失败时抛出LLMCallError"""
+        ticket = self._acquire()
+        try:
+            return self._post_json(url, headers, payload, deadline)
+        finally:
+            self.breaker.release(ticket)
+
+    def _acquire(self) -> int:
+        """熔断器放行时返回凭证，否则抛出CircuitOpenError"""
+        ticket = self.breaker.acquire()
+        if ticket is None:
+            registry.inc(f"{self.name}.breaker_rejected")
+            raise CircuitOpenError("熔断器已打开，LLM请求被快速拒绝")
+        return ticket
+
+    def _post_json(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                   deadline: Optional[float]) -> Dict[str, Any]:
+        registry.inc(f"{self.name}.calls")
+        started = time.monotonic()
+        deadline_at = started + self._budget(deadline)
+        attempt = 0
+        with span("llm.call", {'llm.client': self.name, 'llm.model': payload.get('model')}) as trace_span:
+            while True:
+                trace_span.set_attribute('llm.attempts', attempt + 1)
+                remaining = deadline_at - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise LLMCallError("LLM调用超过截止时间", retryable=False)
+                    result = self._attempt(url, headers, payload, min(self.config.attempt_timeout, remaining))
+                    self.breaker.record_success()
+                    registry.observe(f"{self.name}.call_seconds", time.monotonic() - started)
+                    trace_span.set_attributes(_usage_attributes(result))
+                    return result
+                except LLMCallError as e:
+                    delay = self._retry_delay(e, attempt, deadline_at)
+                    attempt += 1
+                    time.sleep(delay)
+
+    def _budget(self, deadline: Optional[float]) -> float:
+        """本次调用的总时限：调用方传入的截止时间（如请求剩余时间）不超过配置的DOUBAO_DEADLINE"""
+        return self.config.deadline if deadline is None else min(deadline, self.config.deadline)
+
+    def _quota_error(self, error: RateLimitTimeout) -> LLMCallError:
+        registry.inc(f"{self.name}.rate_limited")
+        # 客户端限流不是上游故障，不计入熔断
+        return LLMCallError(f"{error}，超过截止时间", status_code=429, retryable=False)
+
+    def _wait_for_quota(self, cost: int, max_wait: float) -> float:
+        """每次HTTP请求（含重试和对冲）发出前等待配额，返回等待的秒数"""
+        if self.rate_limiter is None:
+            return 0.0
+        try:
+            return self.rate_limiter.acquire(cost, max_wait)
+        except RateLimitTimeout as e:
+            raise self._quota_error(e)
+
+    async def _await_quota(self, cost: int, max_wait: float) -> float:
+        if self.rate_limiter is None:
+            return 0.0
+        try:
+            return await self.rate_limiter.acquire_async(cost, max_wait)
+        except RateLimitTimeout as e:
+            raise self._quota_error(e)
+
+    def _settle_quota(self, tokens: int) -> None:
+        """按实际用量修正预约的token（tokens为实际与预估之差）"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.adjust(tokens)
+
+    def _retry_delay(self, error: LLMCallError, attempt: int, deadline_at: float) -> float:
+        """返回下次重试前的等待时间；不可重试时记录失败并重新抛出异常"""
+        delay = self._backoff_delay(attempt, error.retry_after)
+        can_retry = (
+            error.retryable
+            and attempt < self.config.max_retries
+            and time.monotonic() + delay < deadline_at
+        )
+        if not can_retry:
+            registry.inc(f"{self.name}.failures")
+            if error.status_code is None or error.retryable:
+                # 只有上游不可用类错误才计入熔断
+                self.breaker.record_failure()
+            raise error
+        registry.inc(f"{self.name}.retries")
+        return delay
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """带抖动的指数退避"""
+        cap = min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt))
+        delay = random.uniform(cap / 2, cap)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.config.backoff_max))
+        return delay
+
+    def _attempt(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                 timeout: float) -> Dict[str, Any]:
+        hedge_delay = None
+        if self.config.hedge_enabled:
+            hedge_delay = self.latency.quantile(self.config.hedge_quantile, self.config.hedge_min_samples)
+        if hedge_delay is None or hedge_delay >= timeout:
+            return self._send(url, headers, payload, timeout)
+
+        # 对冲：主请求超过p95仍未返回时再发一份，取先成功者
+        attempt_started = time.monotonic()
+        primary = self._hedge_executor.submit(tracing.bind(self._send), url, headers, payload, timeout)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        registry.inc(f"{self.name}.hedges")
+        tracing.current_span().set_attribute('llm.hedged', True)
+        hedge_timeout = max(timeout - (time.monotonic() - attempt_started), 0.001)
+        hedge = self._hedge_executor.submit(tracing.bind(self._send), url, headers, payload, hedge_timeout)
+        pending = {primary, hedge}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                    if future is hedge:
+                        registry.inc(f"{self.name}.hedge_wins")
+                    # 落后的请求无法中断，由其自身超时结束
+                    return result
+                except LLMCallError as e:
+                    last_error = e
+        raise last_error
+
+    def _send(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+              timeout: float) -> Dict[str, Any]:
+        with span("llm.attempt") as trace_span:
+            return self._send_once(url, headers, payload, timeout, trace_span)
+
+    def _send_once(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                   timeout: float, trace_span) -> Dict[str, Any]:
+        cost = estimate_request_tokens(payload)
+        quota_wait = self._wait_for_quota(cost, timeout)
+        trace_span.set_attributes({'llm.estimated_tokens': cost, 'llm.quota_wait_seconds': round(quota_wait, 3)})
+        timeout = max(timeout - quota_wait, 0.001)
+        started = time.monotonic()
+        try:
+            response = self.session.post(
+                url, headers=headers, json=payload,
+                timeout=(min(self.config.connect_timeout, timeout), timeout)
+            )
+        except requests.Timeout:
+            registry.inc(f"{self.name}.timeouts")
+            raise LLMCallError("LLM请求超时", retryable=True)
+        except requests.RequestException as e:
+            raise LLMCallError(f"LLM请求异常: {e}", retryable=True)
+
+        trace_span.set_attribute('http.status_code', response.status_code)
+        if response.status_code == 200:
+            self.latency.record(time.monotonic() - started)
+            registry.observe(f"{self.name}.attempt_seconds", time.monotonic() - started)
+            try:
+                result = response.json()
+            except ValueError as e:
+                # 200但响应体不是JSON（如网关错误页），按上游故障重试
+                raise LLMCallError(f"LLM接口返回的内容无法解析: {e}", status_code=response.status_code, retryable=True)
+            usage = result.get("usage") or {}
+            if usage.get("total_tokens") is not None:
+                self._settle_quota(usage["total_tokens"] - cost)
+            return result
+
+        # 被拒绝的请求不消耗token
+        self._settle_quota(-cost)
+        registry.inc(f"{self.name}.status_{response.status_code}")
+        retry_after = None
+        if response.headers.get("Retry-After"):
+            try:
+                retry_after = float(response.headers["Retry-After"])
+            except ValueError:
+                retry_after = None
+        raise LLMCallError(
+            f"LLM接口返回错误: {response.status_code}",
+            status_code=response.status_code,
+            retryable=response.status_code in RETRYABLE_STATUS_CODES,
+            retry_after=retry_after
+        )
+
+    def stream_post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                    deadline: Optional[float] = None) -> Iterator[str]:
+        """流式调用（SSE），逐段返回增量文本；仅在收到首个数据前重试"""
+        ticket = self._acquire()
+        try:
+            # 生成器跨越yield，span不作为调用方后续span的父级
+            with span("llm.stream", {'llm.client': self.name, 'llm.model': payload.get('model')}, current=False) as trace_span:
+                yield from self._stream_post(url, headers, payload, deadline, trace_span)
+        finally:
+            # 调用方提前关闭生成器（如客户端断开）时同样释放
+            self.breaker.release(ticket)
+
+    def _stream_post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                     deadline: Optional[float], trace_span) -> Iterator[str]:
+        registry.inc(f"{self.name}.stream_calls")
+        payload = dict(payload, stream=True)
+        cost = estimate_request_tokens(payload)
+        deadline_at = time.monotonic() + self._budget(deadline)
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise LLMCallError("LLM调用超过截止时间", retryable=False)
+                self._wait_for_quota(cost, remaining)
+                remaining = max(deadline_at - time.monotonic(), 0.001)
+                try:
+                    response = self.session.post(
+                        url, headers=headers, json=payload, stream=True,
+                        timeout=(min(self.config.connect_timeout, remaining), min(self.config.attempt_timeout, remaining))
+                    )
+                except requests.Timeout:
+                    registry.inc(f"{self.name}.timeouts")
+                    raise LLMCallError("LLM请求超时", retryable=True)
+                except requests.RequestException as e:
+                    raise LLMCallError(f"LLM请求异常: {e}", retryable=True)
+                if response.status_code != 200:
+                    response.close()
+                    self._settle_quota(-cost)
+                    registry.inc(f"{self.name}.status_{response.status_code}")
+                    raise LLMCallError(
+                        f"LLM接口返回错误: {response.status_code}",
+                        status_code=response.status_code,
+                        retryable=response.status_code in RETRYABLE_STATUS_CODES
+                    )
+                break
+            except LLMCallError as e:
+                delay = self._retry_delay(e, attempt, deadline_at)
+                attempt += 1
+                time.sleep(delay)
+
+        trace_span.set_attributes({'llm.attempts': attempt + 1, 'llm.estimated_tokens': cost})
+        started = time.monotonic()
+        output_tokens = 0
+        try:
+            with response:
+                for line in response.iter_lines(decode_unicode=False):
+                    if time.monotonic() > deadline_at:
+                        raise LLMCallError("LLM流式输出超过截止时间")
+                    delta = parse_sse_line(line.decode('utf-8') if line else '')
+                    if delta is STREAM_DONE:
+                        break
+                    if delta:
+                        output_tokens += estimate_tokens(delta)
+                        yield delta
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise LLMCallError(f"LLM流式读取失败: {e}")
+        except LLMCallError:
+            self.breaker.record_failure()
+            raise
+        finally:
+            # 流式响应没有usage，按实际输出估算
+            trace_span.set_attribute('llm.completion_tokens_estimate', output_tokens)
+            self._settle_quota(output_tokens - estimate_output_tokens(payload))
+        self.breaker.record_success()
+        registry.observe(f"{self.name}.stream_seconds", time.monotonic() - started)
+
+    async def astream_post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                           deadline: Optional[float] = None) -> AsyncIterator[str]:
+        """异步流式调用（SSE），逐段返回增量文本；仅在收到首个数据前重试"""
+        ticket = self._acquire()
+        try:
+            with span("llm.stream", {'llm.client': self.name, 'llm.model': payload.get('model')}, current=False) as trace_span:
+                async for delta in self._astream_post(url, headers, payload, deadline, trace_span):
+                    yield delta
+        finally:
+            self.breaker.release(ticket)
+
+    async def _astream_post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                            deadline: Optional[float], trace_span) -> AsyncIterator[str]:
+        registry.inc(f"{self.name}.stream_calls")
+        payload = dict(payload, stream=True)
+        cost = estimate_request_tokens(payload)
+        total = self._budget(deadline)
+        deadline_at = time.monotonic() + total
+        timeout = aiohttp.ClientTimeout(
+            total=total, sock_connect=self.config.connect_timeout, sock_read=self.config.attempt_timeout
+        )
+        attempt = 0
+        started = time.monotonic()
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            while True:
+                try:
+                    await self._await_quota(cost, max(deadline_at - time.monotonic(), 0.0))
+                    try:
+                        response = await session.post(url, headers=headers, json=payload)
+                    except asyncio.TimeoutError:
+                        registry.inc(f"{self.name}.timeouts")
+                        raise LLMCallError("LLM请求超时", retryable=True)
+                    except aiohttp.ClientError as e:
+                        raise LLMCallError(f"LLM请求异常: {e}", retryable=True)
+                    if response.status != 200:
+                        response.release()
+                        self._settle_quota(-cost)
+                        registry.inc(f"{self.name}.status_{response.status}")
+                        raise LLMCallError(
+                            f"LLM接口返回错误: {response.status}",
+                            status_code=response.status,
+                            retryable=response.status in RETRYABLE_STATUS_CODES
+                        )
+                    break
+                except LLMCallError as e:
+                    delay = self._retry_delay(e, attempt, deadline_at)
+                    attempt += 1
+                    await asyncio.sleep(delay)
+
+            trace_span.set_attributes({'llm.attempts': attempt + 1, 'llm.estimated_tokens': cost})
+            output_tokens = 0
+            try:
+                async with response:
+                    async for line in response.content:
+                        delta = parse_sse_line(line.decode('utf-8'))
+                        if delta is STREAM_DONE:
+                            break
+                        if delta:
+                            output_tokens += estimate_tokens(delta)
+                            yield delta
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.breaker.record_failure()
+                raise LLMCallError(f"LLM流式读取失败: {e}")
+            finally:
+                trace_span.set_attribute('llm.completion_tokens_estimate', output_tokens)
+                self._settle_quota(output_tokens - estimate_output_tokens(payload))
+        self.breaker.record_success()
+        registry.observe(f"{self.name}.stream_seconds", time.monotonic() - started)
+
+
+def _usage_attributes(result: Dict[str, Any]) -> Dict[str, Any]:
+    """接口返回的token用量，记录到span属性"""
+    usage = result.get("usage") or {}
+    return {
+        'llm.prompt_tokens': usage.get('prompt_tokens'),
+        'llm.completion_tokens': usage.get('completion_tokens'),
+        'llm.total_tokens': usage.get('total_tokens')
+    }
+
+
+# SSE流结束标记
+STREAM_DONE = object()
+
+
+def parse_sse_line(line: str):
+    """解析一行SSE数据，返回增量文本、STREAM_DONE或None"""
+    line = line.strip()
+    if not line.startswith("data:"):
+        return None
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return STREAM_DONE
+    try:
+        chunk = json.loads(data)
+        choices = chunk.get("choices") or []
+        if not choices:
+            return None
+        return (choices[0].get("delta") or {}).get("content")
+    except (ValueError, AttributeError):
+        return None
+
+
+# 进程内共享的豆包对话接口客户端
+doubao_chat_client = ResilientLLMClient(name="doubao_chat", rate_limiter=doubao_chat_limiter)
@@ -1,15 +1,44 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse, Response, PlainTextResponse
+import asyncio
 import uvicorn
 import os
+import hashlib
 import tempfile
-from typing import List, Optional
+from typing import Any, List, Optional, Dict
 import json
+import time
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from resume_processor import ResumeProcessor
 from job_matcher import JobMatcher
+from metrics import registry
+from prompts import ANALYSIS_MODES, ANALYSIS_MODE_TWO_STEP, ANALYSIS_MODE_FAST
+from candidate_store import candidate_store, make_job_id, FEATURE_NAMES, SORTABLE_COLUMNS
+from resume_store import resume_store, make_resume_id
+from url_fetcher import url_fetcher
+from pdf_extraction import pdf_extractor
+from deadline import Deadline
+from admission import admission, AdmissionRejected, ADMISSION_QUEUE_TIMEOUT, LANE_INTERACTIVE, LANE_BATCH
+from serialization import FastJSONResponse, CompressionMiddleware, dumps_json
+from response_view import ResponseView, VIEW_FULL
+import profiling
+from profiling import ProfileSession, OUTPUT_INLINE, PROFILE_HEADER
+from tracing import TracingMiddleware, span
+from memory_monitor import memory_monitor
+from single_flight import SingleFlight, deadline_bucket
 
-app = FastAPI(title="智能简历分析系统", version="1.0.0")
+# 批量URL分析时同时处理的网页数量
+URL_BATCH_CONCURRENCY = int(os.getenv("URL_BATCH_CONCURRENCY", "8"))
+# 流式批量分析时同时处理的文件数量
+BATCH_FILE_CONCURRENCY = int(os.getenv("BATCH_FILE_CONCURRENCY", "4"))
+# 批量评分时同时计算的候选人数量
+SCORE_BATCH_CONCURRENCY = int(os.getenv("SCORE_BATCH_CONCURRENCY", "8"))
+# 检查客户端是否断开连接的间隔（秒）
+DISCONNECT_POLL_SECONDS = 0.5
+
+app = FastAPI(title="智能简历分析系统", version="1.0.0", default_response_class=FastJSONResponse)
 
 # 配置CORS
 app.add_middleware(
@@ -20,9 +49,122 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求级追踪：导出span，X-Debug-Trace（管理令牌）请求在响应中附带瀑布图
+app.add_middleware(TracingMiddleware, authorize_debug=profiling.check_token)
+
+# 按Accept-Encoding协商br/gzip压缩较大的响应
+app.add_middleware(CompressionMiddleware)
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    携带管理令牌（X-Profile请求头或profile查询参数）的请求在性能分析器下执行，
+    分析结果保存到PROFILE_DIR（X-Profile-File响应头为路径）或代替响应体直接返回
+    """
+    # 常驻采样接口用同一令牌鉴权，本身不做分析
+    if request.url.path.startswith("/profiling/"):
+        return await call_next(request)
+    try:
+        options = profiling.requested_profile(request.headers, request.query_params)
+    except PermissionError as e:
+        return FastJSONResponse(status_code=403, content={"detail": str(e)})
+    except ValueError as e:
+        return FastJSONResponse(status_code=400, content={"detail": str(e)})
+    if options is None:
+        return await call_next(request)
+    
+    profile_format, output = options
+    session = ProfileSession(profile_format)
+    if not session.begin():
+        return FastJSONResponse(status_code=409, content={"detail": "已有请求正在进行性能分析，请稍后重试"})
+    try:
+        response = await call_next(request)
+        # 流式响应也在分析期间读完，覆盖整个响应的生成过程
+        body = b"".join([chunk async for chunk in response.body_iterator])
+    finally:
+        session.end()
+    registry.inc(f"profiling.{profile_format}.requests")
+    
+    headers = {
+        "X-Profile-Format": profile_format,
+        "X-Profile-Seconds": f"{session.seconds:.3f}"
+    }
+    if session.samples:
+        headers["X-Profile-Samples"] = str(session.samples)
+    if output == OUTPUT_INLINE:
+        headers["X-Profiled-Status"] = str(response.status_code)
+        return PlainTextResponse(session.report(), headers=headers)
+    
+    path = await asyncio.to_thread(session.save, request.url.path)
+    print(f"性能分析结果已保存: {path}")
+    headers["X-Profile-File"] = path
+    for name, value in response.headers.items():
+        if name.lower() != "content-length":
+            headers.setdefault(name, value)
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
 # 初始化处理器
 resume_processor = ResumeProcessor()
 job_matcher = JobMatcher()
+# 相同文件、相同岗位的并发上传只分析一次
+upload_flight = SingleFlight("upload")
+
+@app.on_event("startup")
+async def start_background_profiler():
+    """开启常驻低频采样（PROFILE_BACKGROUND_INTERVAL大于0时）和内存监控"""
+    if profiling.background_sampler is not None:
+        profiling.background_sampler.start()
+    memory_monitor.start()
+
+@app.on_event("shutdown")
+async def close_shared_resources():
+    """关闭抓取网页使用的共享连接池和PDF提取进程池"""
+    await url_fetcher.close()
+    pdf_extractor.shutdown()
+    if profiling.background_sampler is not None:
+        profiling.background_sampler.stop()
+    memory_monitor.stop()
+
+def _check_analysis_mode(analysis_mode: str):
+    """校验分析模式参数"""
+    if analysis_mode not in ANALYSIS_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的分析模式。支持的模式: {', '.join(sorted(ANALYSIS_MODES))}"
+        )
+
+async def _run_until_disconnected(request: Request, coro):
+    """执行分析任务，客户端断开连接时取消，不再为无人接收的响应继续计算"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                registry.inc("requests.cancelled_on_disconnect")
+                raise HTTPException(status_code=499, detail="客户端已断开连接，分析已取消")
+    finally:
+        if not task.done():
+            task.cancel()
+
+def _response_view(view: str, fields: Optional[str]) -> ResponseView:
+    """校验并构建响应字段投影"""
+    try:
+        return ResponseView(view, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _service_busy(e: AdmissionRejected) -> HTTPException:
+    """系统繁忙时的503响应，Retry-After提示客户端多久后重试"""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def _check_admission(lane: str):
+    """排队已满时在读取和分析之前直接返回503"""
+    try:
+        admission.check(lane)
+    except AdmissionRejected as e:
+        raise _service_busy(e)
 
 @app.get("/")
 async def root():
@@ -30,14 +172,25 @@ async def root():
 
 @app.post("/upload/file")
 async def upload_file(
+    request: Request,
     file: UploadFile = File(...),
     job_description: str = Form(...),
-    job_title: str = Form(...)
+    job_title: str = Form(...),
+    analysis_mode: str = Form(ANALYSIS_MODE_TWO_STEP),
+    view: str = Form(VIEW_FULL),
+    fields: Optional[str] = Form(None)
 ):
     """
     上传文件并分析简历与岗位匹配度
     支持格式：PDF、Word、Markdown
+    请求头 X-Request-Timeout 指定时间预算（秒），时间不足时跳过可选阶段
+    系统繁忙时返回503和Retry-After
+    view=summary 只返回得分；fields 指定逗号分隔的字段路径
     """
+    _check_analysis_mode(analysis_mode)
+    response_view = _response_view(view, fields)
+    _check_admission(LANE_INTERACTIVE)
+    deadline = Deadline.from_headers(request.headers)
     try:
         # 检查文件格式
         allowed_extensions = {'.pdf', '.docx', '.doc', '.md', '.txt'}
@@ -49,22 +202,109 @@ async def upload_file(
                 detail=f"不支持的文件格式。支持的格式: {', '.join(allowed_extensions)}"
             )
         
-        # 保存临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
+        with span("file.read", {'file.name': file.filename}):
             content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
         
+        async def analyze():
+            # 保存临时文件（由共享的分析任务负责清理，发起请求的客户端断开时不影响其他等待者）
+            with span("file.write_temp", {'file.bytes': len(content)}):
+                with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
+                    temp_file.write(content)
+                    temp_file_path = temp_file.name
+            try:
+                # 排队等待执行名额，交互请求优先于批量任务
+                async with admission.admit(LANE_INTERACTIVE, timeout=deadline.limit(ADMISSION_QUEUE_TIMEOUT)):
+                    # 处理简历
+                    resume_data = await resume_processor.process_file(
+                        temp_file_path, file_extension, job_description, job_title, analysis_mode,
+                        deadline=deadline
+                    )
+                    
+                    # 计算匹配度
+                    match_result = await job_matcher.calculate_match(
+                        resume_data, job_description, job_title,
+                        ai_assessment=resume_data.pop('ai_assessment', None), deadline=deadline,
+                        include_report=response_view.include_report
+                    )
+                    return resume_data, match_result
+            finally:
+                # 清理临时文件
+                if os.path.exists(temp_file_path):
+                    os.unlink(temp_file_path)
+        
+        # 重复点击或多人同时打开同一候选人时，进行中的相同分析只执行一次，结果共享
+        # 截止时间相近的请求才合并，避免时间预算更长的请求拿到因首个请求时间不足而跳过阶段的结果
+        flight_key = (
+            hashlib.sha256(content).hexdigest(), make_job_id(job_title, job_description), file_extension,
+            analysis_mode, response_view.include_report, deadline_bucket(deadline)
+        )
+        resume_data, match_result = await _run_until_disconnected(request, upload_flight.do(flight_key, analyze))
+        
+        result = {
+            "status": "success",
+            "resume_data": resume_data,
+            "match_result": match_result,
+            "file_info": {
+                "filename": file.filename,
+                "size": len(content),
+                "type": file_extension
+            }
+        }
+        
+        return FastJSONResponse(content=response_view.apply(result))
+        
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise _service_busy(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"处理失败: {str(e)}")
+
+@app.post("/upload/file/stream")
+async def upload_file_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    job_description: str = Form(...),
+    job_title: str = Form(...),
+    analysis_mode: str = Form(ANALYSIS_MODE_TWO_STEP)
+):
+    """
+    流式分析：以NDJSON逐行返回AI解析出的字段，最后一行为完整结果
+    事件格式：{"event": "field", "path": "skills", "value": [...]} / {"event": "result", ...} / {"event": "error", ...}
+    """
+    _check_analysis_mode(analysis_mode)
+    allowed_extensions = {'.pdf', '.docx', '.doc', '.md', '.txt'}
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    if file_extension not in allowed_extensions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的文件格式。支持的格式: {', '.join(allowed_extensions)}"
+        )
+    _check_admission(LANE_INTERACTIVE)
+    
+    deadline = Deadline.from_headers(request.headers)
+    with span("file.read", {'file.name': file.filename}):
+        content = await file.read()
+    queue = asyncio.Queue()
+    
+    async def run():
+        with span("file.write_temp", {'file.bytes': len(content)}):
+            with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
+                temp_file.write(content)
+                temp_file_path = temp_file.name
         try:
-            # 处理简历
-            resume_data = await resume_processor.process_file(temp_file_path, file_extension)
-            
-            # 计算匹配度
-            match_result = await job_matcher.calculate_match(
-                resume_data, job_description, job_title
-            )
-            
-            result = {
+            async with admission.admit(LANE_INTERACTIVE, timeout=deadline.limit(ADMISSION_QUEUE_TIMEOUT)):
+                resume_data = await resume_processor.process_file(
+                    temp_file_path, file_extension, job_description, job_title, analysis_mode,
+                    on_field=lambda path, value: queue.put_nowait({"event": "field", "path": path, "value": value}),
+                    deadline=deadline
+                )
+                match_result = await job_matcher.calculate_match(
+                    resume_data, job_description, job_title,
+                    ai_assessment=resume_data.pop('ai_assessment', None), deadline=deadline
+                )
+            queue.put_nowait({
+                "event": "result",
                 "status": "success",
                 "resume_data": resume_data,
                 "match_result": match_result,
@@ -73,35 +313,64 @@ async def upload_file(
                     "size": len(content),
                     "type": file_extension
                 }
-            }
-            
-            return JSONResponse(content=result)
-            
+            })
+        except Exception as e:
+            queue.put_nowait({"event": "error", "detail": f"处理失败: {str(e)}"})
         finally:
-            # 清理临时文件
             if os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)
-                
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"处理失败: {str(e)}")
+            queue.put_nowait(None)
+    
+    async def events():
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield dumps_json(item) + b"\n"
+        finally:
+            # 客户端断开时取消分析
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
 @app.post("/upload/url")
 async def upload_url(
+    request: Request,
     url: str = Form(...),
     job_description: str = Form(...),
-    job_title: str = Form(...)
+    job_title: str = Form(...),
+    analysis_mode: str = Form(ANALYSIS_MODE_TWO_STEP),
+    view: str = Form(VIEW_FULL),
+    fields: Optional[str] = Form(None)
 ):
     """
     通过URL分析网页简历与岗位匹配度
+    view/fields 与 /upload/file 相同
     """
+    _check_analysis_mode(analysis_mode)
+    response_view = _response_view(view, fields)
+    _check_admission(LANE_INTERACTIVE)
+    deadline = Deadline.from_headers(request.headers)
     try:
-        # 处理网页简历
-        resume_data = await resume_processor.process_url(url)
+        async def analyze():
+            async with admission.admit(LANE_INTERACTIVE, timeout=deadline.limit(ADMISSION_QUEUE_TIMEOUT)):
+                # 处理网页简历
+                resume_data = await resume_processor.process_url(
+                    url, job_description, job_title, analysis_mode, deadline=deadline
+                )
+                
+                # 计算匹配度
+                match_result = await job_matcher.calculate_match(
+                    resume_data, job_description, job_title,
+                    ai_assessment=resume_data.pop('ai_assessment', None), deadline=deadline,
+                    include_report=response_view.include_report
+                )
+                return resume_data, match_result
         
-        # 计算匹配度
-        match_result = await job_matcher.calculate_match(
-            resume_data, job_description, job_title
-        )
+        resume_data, match_result = await _run_until_disconnected(request, analyze())
         
         result = {
             "status": "success",
@@ -113,83 +382,528 @@ async def upload_url(
             }
         }
         
-        return JSONResponse(content=result)
+        return FastJSONResponse(content=response_view.apply(result))
         
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise _service_busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理失败: {str(e)}")
 
-@app.post("/analyze/batch")
-async def analyze_batch(
-    files: List[UploadFile] = File(...),
+@app.post("/upload/urls")
+async def upload_urls(
+    request: Request,
+    urls: List[str] = Form(...),
     job_description: str = Form(...),
-    job_title: str = Form(...)
+    job_title: str = Form(...),
+    analysis_mode: str = Form(ANALYSIS_MODE_TWO_STEP),
+    view: str = Form(VIEW_FULL),
+    fields: Optional[str] = Form(None)
 ):
     """
-    批量分析多个简历文件
+    批量分析多个网页简历，网页并发抓取和分析（共享连接池，单主机连接数受限）
+    每个网页作为一项批量任务排队，空闲名额优先分配给交互请求
+    view/fields 作用于每个网页的结果项
     """
-    try:
-        results = []
-        
-        for file in files:
-            # 检查文件格式
-            allowed_extensions = {'.pdf', '.docx', '.doc', '.md', '.txt'}
-            file_extension = os.path.splitext(file.filename)[1].lower()
-            
-            if file_extension not in allowed_extensions:
-                results.append({
-                    "filename": file.filename,
+    _check_analysis_mode(analysis_mode)
+    response_view = _response_view(view, fields)
+    _check_admission(LANE_BATCH)
+    # 每个表单字段也可以包含多行URL
+    urls = [line.strip() for value in urls for line in value.splitlines() if line.strip()]
+    if not urls:
+        raise HTTPException(status_code=400, detail="请至少提供一个URL")
+    
+    deadline = Deadline.from_headers(request.headers)
+    semaphore = asyncio.Semaphore(URL_BATCH_CONCURRENCY)
+    
+    async def analyze_url(url: str):
+        async with semaphore:
+            try:
+                async with admission.admit(
+                    LANE_BATCH, timeout=deadline.limit(ADMISSION_QUEUE_TIMEOUT), enforce_queue_limit=False
+                ):
+                    resume_data = await resume_processor.process_url(
+                        url, job_description, job_title, analysis_mode, deadline=deadline
+                    )
+                    match_result = await job_matcher.calculate_match(
+                        resume_data, job_description, job_title,
+                        ai_assessment=resume_data.pop('ai_assessment', None), deadline=deadline,
+                        include_report=response_view.include_report
+                    )
+                return {
+                    "url": url,
+                    "status": "success",
+                    "resume_data": resume_data,
+                    "match_result": match_result
+                }
+            except Exception as e:
+                return {
+                    "url": url,
                     "status": "error",
-                    "error": f"不支持的文件格式: {file_extension}"
-                })
-                continue
-            
-            # 保存临时文件
+                    "error": str(e)
+                }
+    
+    async def analyze_all():
+        return await asyncio.gather(*(analyze_url(url) for url in urls))
+    
+    results = await _run_until_disconnected(request, analyze_all())
+    
+    return FastJSONResponse(content={
+        "status": "success",
+        "total_urls": len(urls),
+        "failed_urls": sum(1 for item in results if item["status"] == "error"),
+        "results": [response_view.apply(item) for item in results]
+    })
+
+async def _analyze_batch_file(file: UploadFile, job_description: str, job_title: str, analysis_mode: str,
+                              deadline: Deadline, analyzed: Dict[str, tuple], include_report: bool = True) -> Dict:
+    """
+    批量分析中的单个文件，返回该文件的结果项（失败时为错误项）
+    analyzed为批次内已分析的简历：resume_id -> (文件名, 匹配结果)，近似重复的文件直接复用
+    """
+    # 检查文件格式
+    allowed_extensions = {'.pdf', '.docx', '.doc', '.md', '.txt'}
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    
+    if file_extension not in allowed_extensions:
+        return {
+            "filename": file.filename,
+            "status": "error",
+            "error": f"不支持的文件格式: {file_extension}"
+        }
+    
+    temp_file_path = None
+    try:
+        # 保存临时文件
+        with span("file.read", {'file.name': file.filename}):
+            content = await file.read()
+        with span("file.write_temp", {'file.bytes': len(content)}):
             with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-                content = await file.read()
                 temp_file.write(content)
                 temp_file_path = temp_file.name
+        
+        async with admission.admit(
+            LANE_BATCH, timeout=deadline.limit(ADMISSION_QUEUE_TIMEOUT), enforce_queue_limit=False
+        ):
+            # 处理简历
+            resume_data = await resume_processor.process_file(
+                temp_file_path, file_extension, job_description, job_title, analysis_mode,
+                deadline=deadline
+            )
             
-            try:
-                # 处理简历
-                resume_data = await resume_processor.process_file(temp_file_path, file_extension)
-                
-                # 计算匹配度
-                match_result = await job_matcher.calculate_match(
-                    resume_data, job_description, job_title
-                )
-                
-                results.append({
+            duplicate_id = resume_data.get('duplicate_of')
+            if duplicate_id in analyzed:
+                original_filename, match_result = analyzed[duplicate_id]
+                return {
                     "filename": file.filename,
                     "status": "success",
+                    "duplicate_of": original_filename,
                     "resume_data": resume_data,
                     "match_result": match_result
-                })
-                
+                }
+            
+            # 计算匹配度
+            match_result = await job_matcher.calculate_match(
+                resume_data, job_description, job_title,
+                ai_assessment=resume_data.pop('ai_assessment', None), deadline=deadline,
+                include_report=include_report
+            )
+            analyzed[resume_data['resume_id']] = (file.filename, match_result)
+            
+            return {
+                "filename": file.filename,
+                "status": "success",
+                "resume_data": resume_data,
+                "match_result": match_result
+            }
+            
+    except Exception as e:
+        return {
+            "filename": file.filename,
+            "status": "error",
+            "error": str(e)
+        }
+    finally:
+        # 清理临时文件
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
+
+async def _stream_batch(files: List[UploadFile], job_description: str, job_title: str, analysis_mode: str,
+                        deadline: Deadline, response_view: ResponseView):
+    """
+    并发分析批次中的文件，每完成一个就输出一行NDJSON（带原始序号），最后输出汇总行
+    队列有界：客户端读取慢时暂停分析，内存占用不随批次大小增长
+    """
+    queue = asyncio.Queue(maxsize=BATCH_FILE_CONCURRENCY)
+    indexes = iter(range(len(files)))
+    analyzed = {}
+    
+    async def worker():
+        # 各协程共享同一个序号迭代器，依次领取下一个文件
+        for index in indexes:
+            try:
+                with span("batch.item", {'file.name': files[index].filename, 'batch.index': index}):
+                    item = await _analyze_batch_file(
+                        files[index], job_description, job_title, analysis_mode, deadline, analyzed,
+                        include_report=response_view.include_report
+                    )
             except Exception as e:
-                results.append({
-                    "filename": file.filename,
-                    "status": "error",
-                    "error": str(e)
-                })
-            finally:
-                # 清理临时文件
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+                # 意外异常也要输出该文件的结果行，否则下面按文件数读取队列会一直等待
+                item = {"filename": files[index].filename, "status": "error", "error": str(e)}
+            await queue.put({"event": "result", "index": index, **item})
+    
+    tasks = [asyncio.create_task(worker()) for _ in range(min(BATCH_FILE_CONCURRENCY, len(files)))]
+    failed_files = 0
+    duplicate_files = 0
+    try:
+        for _ in range(len(files)):
+            item = await queue.get()
+            failed_files += item["status"] == "error"
+            duplicate_files += bool(item.get("duplicate_of"))
+            yield dumps_json(response_view.apply(item)) + b"\n"
+        yield dumps_json({
+            "event": "summary",
+            "status": "success",
+            "total_files": len(files),
+            "failed_files": failed_files,
+            "duplicate_files": duplicate_files
+        }) + b"\n"
+    finally:
+        # 客户端断开时取消未完成的分析
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    job_description: str = Form(...),
+    job_title: str = Form(...),
+    analysis_mode: str = Form(ANALYSIS_MODE_TWO_STEP),
+    stream: bool = Form(False),
+    view: str = Form(VIEW_FULL),
+    fields: Optional[str] = Form(None)
+):
+    """
+    批量分析多个简历文件
+    每个文件作为一项批量任务排队，空闲名额优先分配给交互请求
+    stream=true 时以NDJSON流式返回：每完成一个文件输出一行（按完成顺序，index为文件序号），最后一行为汇总
+    view/fields 作用于每个文件的结果项
+    """
+    _check_analysis_mode(analysis_mode)
+    response_view = _response_view(view, fields)
+    _check_admission(LANE_BATCH)
+    deadline = Deadline.from_headers(request.headers)
+    if stream:
+        return StreamingResponse(
+            _stream_batch(files, job_description, job_title, analysis_mode, deadline, response_view),
+            media_type="application/x-ndjson"
+        )
+    
+    try:
+        results = []
+        analyzed = {}
+        
+        async def analyze_all():
+            for index, file in enumerate(files):
+                with span("batch.item", {'file.name': file.filename, 'batch.index': index}):
+                    results.append(await _analyze_batch_file(
+                        file, job_description, job_title, analysis_mode, deadline, analyzed,
+                        include_report=response_view.include_report
+                    ))
+        
+        await _run_until_disconnected(request, analyze_all())
         
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "status": "success",
             "total_files": len(files),
-            "results": results
+            "duplicate_files": sum(1 for item in results if item.get("duplicate_of")),
+            "results": [response_view.apply(item) for item in results]
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"批量处理失败: {str(e)}")
 
+class ResumeData(BaseModel):
+    """已解析的简历，结构与分析接口返回的resume_data一致，其他字段原样保留"""
+    model_config = ConfigDict(extra='allow')
+    
+    resume_id: Optional[str] = None
+    personal_info: Dict[str, Any] = Field(default_factory=dict)
+    education: List[Dict[str, Any]] = Field(default_factory=list)
+    work_experience: List[Dict[str, Any]] = Field(default_factory=list)
+    skills: List[str] = Field(default_factory=list)
+    projects: List[Dict[str, Any]] = Field(default_factory=list)
+    certificates: List[Any] = Field(default_factory=list)
+    raw_text: Optional[str] = None
+
+class ScoreCandidate(BaseModel):
+    """待评分的候选人：已解析的简历，或之前分析过的简历ID（二选一）"""
+    resume_data: Optional[ResumeData] = None
+    resume_id: Optional[str] = None
+    
+    @model_validator(mode='after')
+    def check_source(self):
+        if (self.resume_data is None) == (self.resume_id is None):
+            raise ValueError("resume_data和resume_id必须且只能提供一个")
+        return self
+
+class ScoreOptions(BaseModel):
+    """评分的岗位和选项；analysis_mode=fast时不调用LLM进行AI评估"""
+    job_description: str = Field(min_length=1)
+    job_title: str = Field(min_length=1)
+    analysis_mode: str = ANALYSIS_MODE_TWO_STEP
+    view: str = VIEW_FULL
+    fields: Optional[str] = None
+
+class ScoreRequest(ScoreOptions, ScoreCandidate):
+    pass
+
+class ScoreBatchRequest(ScoreOptions):
+    candidates: List[ScoreCandidate] = Field(min_length=1)
+
+class ResumeNotFound(Exception):
+    """按简历ID评分时简历不存在或已过期"""
+
+def _resolve_resume(candidate: ScoreCandidate, analysis_mode: str) -> Dict[str, Any]:
+    """取出候选人的简历数据，按简历ID查找时不存在抛出ResumeNotFound"""
+    if candidate.resume_id is not None:
+        resume_data = resume_store.get(candidate.resume_id)
+        if resume_data is None:
+            raise ResumeNotFound(candidate.resume_id)
+        resume_data.setdefault('resume_id', candidate.resume_id)
+    else:
+        resume_data = candidate.resume_data.model_dump()
+        if resume_data.get('raw_text') is None:
+            resume_data.pop('raw_text')
+        # 未带ID时按内容生成，用于保存到候选人列表
+        if not resume_data.get('resume_id'):
+            resume_data['resume_id'] = make_resume_id(
+                resume_data.get('raw_text') or json.dumps(resume_data, sort_keys=True, ensure_ascii=False, default=str)
+            )
+    # 之前分析时的岗位评估和跳过记录不适用于新岗位
+    resume_data.pop('ai_assessment', None)
+    resume_data['skipped_stages'] = []
+    if analysis_mode == ANALYSIS_MODE_FAST:
+        resume_data['skipped_stages'].append({'stage': 'ai_assessment', 'reason': "fast模式，不调用LLM"})
+    return resume_data
+
+async def _score_candidate(candidate: ScoreCandidate, options: ScoreOptions, lane: str, deadline: Deadline,
+                           response_view: ResponseView) -> Dict[str, Any]:
+    """只计算匹配度（不重新提取和解析简历）"""
+    resume_data = _resolve_resume(candidate, options.analysis_mode)
+    async with admission.admit(
+        lane, timeout=deadline.limit(ADMISSION_QUEUE_TIMEOUT), enforce_queue_limit=lane == LANE_INTERACTIVE
+    ):
+        match_result = await job_matcher.calculate_match(
+            resume_data, options.job_description, options.job_title, deadline=deadline,
+            include_report=response_view.include_report
+        )
+    return {
+        "resume_id": resume_data['resume_id'],
+        "status": "success",
+        "match_result": match_result
+    }
+
+@app.post("/score")
+async def score_resume(request: Request, score_request: ScoreRequest):
+    """
+    对已解析的简历（resume_data）或已分析过的简历ID重新计算与岗位的匹配度，
+    不重新上传文件，也不调用LLM解析简历；analysis_mode=fast时同样跳过AI评估
+    """
+    _check_analysis_mode(score_request.analysis_mode)
+    response_view = _response_view(score_request.view, score_request.fields)
+    _check_admission(LANE_INTERACTIVE)
+    deadline = Deadline.from_headers(request.headers)
+    try:
+        result = await _run_until_disconnected(
+            request, _score_candidate(score_request, score_request, LANE_INTERACTIVE, deadline, response_view)
+        )
+    except ResumeNotFound as e:
+        raise HTTPException(status_code=404, detail=f"简历不存在或已过期: {e.args[0]}")
+    except AdmissionRejected as e:
+        raise _service_busy(e)
+    return FastJSONResponse(content=response_view.apply(result))
+
+@app.post("/score/batch")
+async def score_batch(request: Request, score_request: ScoreBatchRequest):
+    """
+    批量评分：同一岗位下的多个候选人并发计算匹配度，每个候选人作为一项批量任务排队
+    单个候选人失败（如简历ID不存在）时该项返回错误，不影响其他候选人
+    """
+    _check_analysis_mode(score_request.analysis_mode)
+    response_view = _response_view(score_request.view, score_request.fields)
+    _check_admission(LANE_BATCH)
+    deadline = Deadline.from_headers(request.headers)
+    semaphore = asyncio.Semaphore(SCORE_BATCH_CONCURRENCY)
+    
+    async def score(index: int, candidate: ScoreCandidate):
+        async with semaphore:
+            try:
+                with span("batch.item", {'batch.index': index}):
+                    item = await _score_candidate(candidate, score_request, LANE_BATCH, deadline, response_view)
+            except ResumeNotFound as e:
+                item = {"resume_id": e.args[0], "status": "error", "error": f"简历不存在或已过期: {e.args[0]}"}
+            except Exception as e:
+                item = {"resume_id": candidate.resume_id, "status": "error", "error": str(e)}
+            item["index"] = index
+            return item
+    
+    async def score_all():
+        return await asyncio.gather(*(score(index, candidate) for index, candidate in enumerate(score_request.candidates)))
+    
+    results = await _run_until_disconnected(request, score_all())
+    
+    return FastJSONResponse(content={
+        "status": "success",
+        "total_candidates": len(results),
+        "failed_candidates": sum(1 for item in results if item["status"] == "error"),
+        "results": [response_view.apply(item) for item in results]
+    })
+
+class RerankRequest(BaseModel):
+    weights: Dict[str, float]
+    top_k: Optional[int] = None
+
+@app.post("/jobs/{job_id}/rerank")
+async def rerank_job(job_id: str, request: RerankRequest):
+    """
+    使用新的评分权重对岗位下已分析的候选人重新排序（不重新调用分析流程）
+    未提供的维度沿用默认权重
+    """
+    unknown = set(request.weights) - set(FEATURE_NAMES)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"未知的评分维度: {', '.join(sorted(unknown))}。支持的维度: {', '.join(FEATURE_NAMES)}"
+        )
+    weights = dict(job_matcher.score_weights)
+    weights.update(request.weights)
+    if any(value < 0 for value in weights.values()) or sum(weights.values()) <= 0:
+        raise HTTPException(status_code=400, detail="权重必须为非负数且不能全为0")
+    if request.top_k is not None and request.top_k <= 0:
+        raise HTTPException(status_code=400, detail="top_k必须为正整数")
+    
+    started = time.perf_counter()
+    ranking = candidate_store.rank_with_weights(
+        job_id, np.array([weights[name] for name in FEATURE_NAMES], dtype=np.float64), request.top_k
+    )
+    if ranking is None:
+        raise HTTPException(status_code=404, detail=f"岗位不存在或尚无候选人: {job_id}")
+    
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "weights": weights,
+        "total_candidates": candidate_store.count(job_id),
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+        "results": ranking
+    }
+
+@app.get("/jobs/{job_id}/candidates")
+async def list_candidates(
+    job_id: str,
+    min_score: Optional[float] = None,
+    skills: Optional[str] = None,
+    degree_match: Optional[bool] = None,
+    sort_by: str = "overall_match_score",
+    top_k: Optional[int] = None
+):
+    """
+    按条件筛选、排序岗位下已分析的候选人
+    skills: 逗号分隔，候选人需具备全部技能
+    """
+    if sort_by not in SORTABLE_COLUMNS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的排序字段。支持的字段: {', '.join(SORTABLE_COLUMNS)}"
+        )
+    if top_k is not None and top_k <= 0:
+        raise HTTPException(status_code=400, detail="top_k必须为正整数")
+    
+    skill_list = [skill for skill in (skills or '').split(',') if skill.strip()]
+    started = time.perf_counter()
+    results = candidate_store.query(job_id, min_score, skill_list, sort_by, top_k, degree_match)
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"岗位不存在或尚无候选人: {job_id}")
+    
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "total_candidates": candidate_store.count(job_id),
+        "matched_candidates": len(results),
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+        "results": results
+    }
+
 @app.get("/health")
 async def health_check():
-    """健康检查接口"""
+    """健康检查接口；内存超过上限、等待重启时返回503"""
+    if memory_monitor.recycling:
+        return FastJSONResponse(status_code=503, content={"status": "recycling", "service": "智能简历分析系统"})
     return {"status": "healthy", "service": "智能简历分析系统"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """运行指标（LLM调用、重试、熔断、内存等）"""
+    memory_monitor.update_gauges()
+    return registry.snapshot()
+
+def _check_admin(request: Request):
+    """性能分析类接口需要管理令牌"""
+    if not profiling.check_token(request.headers.get(PROFILE_HEADER) or request.query_params.get("profile")):
+        raise HTTPException(status_code=403, detail="性能分析令牌无效或未启用")
+
+def _background_sampler(request: Request):
+    """常驻采样接口需要管理令牌"""
+    _check_admin(request)
+    if profiling.background_sampler is None:
+        raise HTTPException(status_code=404, detail="未开启常驻采样，请设置PROFILE_BACKGROUND_INTERVAL")
+    return profiling.background_sampler
+
+@app.get("/profiling/hot")
+async def get_hot_functions(request: Request, top: int = 30):
+    """常驻采样统计的热点函数"""
+    return _background_sampler(request).hot_functions(top)
+
+@app.get("/profiling/collapsed")
+async def get_collapsed_stacks(request: Request):
+    """常驻采样的折叠调用栈，可直接用于生成火焰图"""
+    return PlainTextResponse(_background_sampler(request).collapsed())
+
+@app.get("/profiling/memory")
+async def get_memory_report(request: Request, top: int = 20, object_types: bool = False):
+    """
+    内存概况：RSS/峰值、tracemalloc开启时存活内存最多及相对基线增长最多的分配位置
+    object_types=true 时附带按类型统计的对象数量（需遍历所有对象）
+    """
+    _check_admin(request)
+    report = {
+        "memory": memory_monitor.update_gauges(),
+        "allocations": await asyncio.to_thread(memory_monitor.allocation_report, top)
+    }
+    if object_types:
+        report["object_types"] = await asyncio.to_thread(memory_monitor.object_types, top)
+    return report
+
+@app.post("/profiling/memory/tracemalloc")
+async def control_tracemalloc(request: Request, action: str = "start", frames: int = 1):
+    """开启（start，同时记录基线）、关闭（stop）tracemalloc，或重新记录基线（baseline）"""
+    _check_admin(request)
+    if action == "start":
+        await asyncio.to_thread(memory_monitor.start_tracing, frames)
+    elif action == "stop":
+        memory_monitor.stop_tracing()
+    elif action == "baseline":
+        await asyncio.to_thread(memory_monitor.reset_baseline)
+    else:
+        raise HTTPException(status_code=400, detail="action 只能是 start、stop 或 baseline")
+    return memory_monitor.update_gauges()
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
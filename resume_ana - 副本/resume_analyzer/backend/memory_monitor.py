@@ -0,0 +1,180 @@
+import os
+import gc
+import sys
+import signal
+import asyncio
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from metrics import registry
+from tracing import current_span
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块，不统计峰值RSS
+    resource = None
+
+# 定期更新内存指标并检查上限的间隔（秒），0为关闭
+MEMORY_CHECK_INTERVAL = float(os.getenv("MEMORY_CHECK_INTERVAL", "30"))
+# 工作进程RSS上限（MB），超过后停止接收请求并退出，由进程管理器（gunicorn/uvicorn --workers）重启；0为不限制
+MEMORY_MAX_RSS_MB = float(os.getenv("MEMORY_MAX_RSS_MB", "0"))
+# 达到上限后退出前等待负载均衡摘除本进程的秒数
+MEMORY_RECYCLE_DRAIN_SECONDS = float(os.getenv("MEMORY_RECYCLE_DRAIN_SECONDS", "5"))
+# 启动时即开启tracemalloc（有一定开销，也可以通过管理接口按需开启），值为记录的调用栈帧数，0为不开启
+MEMORY_TRACEMALLOC_FRAMES = int(os.getenv("MEMORY_TRACEMALLOC_FRAMES", "0"))
+
+# 统计分配位置时忽略的文件
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+def rss_bytes() -> Optional[int]:
+    """当前常驻内存（Linux读取/proc，其他平台返回None）"""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """进程启动以来的峰值常驻内存"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS单位为字节，Linux为KB
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryMonitor:
+    """进程内存观测：RSS/峰值指标、按需tracemalloc快照、对象类型统计和超过上限后的进程回收"""
+
+    def __init__(self, max_rss_mb: float = MEMORY_MAX_RSS_MB):
+        self.max_rss_bytes = int(max_rss_mb * 1024 * 1024)
+        self.recycling = False
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def update_gauges(self) -> Dict[str, Any]:
+        """更新并返回内存指标"""
+        stats = {
+            'rss_bytes': rss_bytes(),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'gc_counts': list(gc.get_count()),
+            'tracemalloc': tracemalloc.is_tracing()
+        }
+        if tracemalloc.is_tracing():
+            stats['traced_bytes'], stats['traced_peak_bytes'] = tracemalloc.get_traced_memory()
+        for name in ('rss_bytes', 'peak_rss_bytes', 'traced_bytes', 'traced_peak_bytes'):
+            if stats.get(name) is not None:
+                registry.set_gauge(f"memory.{name}", stats[name])
+        return stats
+
+    def start_tracing(self, frames: int = 1) -> None:
+        """开启tracemalloc，并以当前快照作为之后比较增长的基线"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        tracemalloc.start(max(frames, 1))
+        self._baseline = self._snapshot()
+
+    def stop_tracing(self) -> None:
+        tracemalloc.stop()
+        self._baseline = None
+
+    def reset_baseline(self) -> None:
+        if tracemalloc.is_tracing():
+            self._baseline = self._snapshot()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+        )
+
+    def allocation_report(self, top: int = 20) -> Dict[str, Any]:
+        """当前存活内存最多的分配位置，以及相对基线增长最多的位置（泄漏通常表现为持续增长）"""
+        if not tracemalloc.is_tracing():
+            return {'tracing': False}
+        snapshot = self._snapshot()
+
+        def site(traceback) -> str:
+            return ' <- '.join(f"{frame.filename}:{frame.lineno}" for frame in reversed(traceback))
+
+        largest = [
+            {'site': site(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+            for stat in snapshot.statistics('traceback')[:top]
+        ]
+        growth = []
+        if self._baseline is not None:
+            growth = [
+                {'site': site(stat.traceback), 'size_diff_bytes': stat.size_diff, 'count_diff': stat.count_diff,
+                 'size_bytes': stat.size}
+                for stat in snapshot.compare_to(self._baseline, 'traceback')[:top]
+                if stat.size_diff > 0
+            ]
+        return {
+            'tracing': True,
+            'frames': tracemalloc.get_traceback_limit(),
+            'largest': largest,
+            'growth_since_baseline': growth
+        }
+
+    def object_types(self, top: int = 20) -> List[Dict[str, Any]]:
+        """gc跟踪的对象按类型计数（遍历所有对象，只在排查时调用）"""
+        counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+        return [{'type': name, 'count': count} for name, count in counts.most_common(top)]
+
+    def over_limit(self) -> bool:
+        """RSS超过上限时先做一次完整回收再确认"""
+        if not self.max_rss_bytes:
+            return False
+        current = rss_bytes()
+        if current is None or current <= self.max_rss_bytes:
+            return False
+        gc.collect()
+        current = rss_bytes()
+        return current is not None and current > self.max_rss_bytes
+
+    async def run(self, interval: float = MEMORY_CHECK_INTERVAL) -> None:
+        """定期更新指标；超过上限时标记为回收中（健康检查返回503），等待摘除后向自身发送SIGTERM平滑退出"""
+        while True:
+            await asyncio.sleep(interval)
+            self.update_gauges()
+            if self.recycling or not self.over_limit():
+                continue
+            self.recycling = True
+            registry.inc("memory.recycles")
+            print(f"工作进程内存超过上限（{self.max_rss_bytes // 1024 // 1024}MB），{MEMORY_RECYCLE_DRAIN_SECONDS:g}秒后退出等待重启")
+            await asyncio.sleep(MEMORY_RECYCLE_DRAIN_SECONDS)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    def start(self) -> None:
+        if MEMORY_TRACEMALLOC_FRAMES > 0 and not tracemalloc.is_tracing():
+            self.start_tracing(MEMORY_TRACEMALLOC_FRAMES)
+        if MEMORY_CHECK_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+@contextmanager
+def track_memory(name: str):
+    """
+    tracemalloc开启时记录代码块前后的已分配内存差值（留存的内存，持续为正说明可能泄漏）
+    注意：并发执行的阶段之间会相互计入
+    """
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    before = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        delta = tracemalloc.get_traced_memory()[0] - before
+        registry.observe(f"memory.stage.{name}.delta_bytes", delta)
+        current_span().set_attribute('memory.delta_bytes', delta)
+
+
+memory_monitor = MemoryMonitor()
@@ -0,0 +1,52 @@
+import threading
+import time
+from typing import Dict, Any
+
+
+class MetricsRegistry:
+    """进程内指标注册表（计数器、仪表、耗时统计）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+        self._started_at = time.time()
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """计数器累加"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """设置仪表值"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """记录一次观测值（如耗时）"""
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = {'count': 0, 'sum': 0.0, 'max': float('-inf')}
+                self._summaries[name] = summary
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['max'] = max(summary['max'], value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出当前所有指标"""
+        with self._lock:
+            summaries = {}
+            for name, summary in self._summaries.items():
+                summaries[name] = dict(summary)
+                summaries[name]['avg'] = summary['sum'] / summary['count'] if summary['count'] else 0.0
+            return {
+                'uptime_seconds': time.time() - self._started_at,
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'summaries': summaries
+            }
+
+
+registry = MetricsRegistry()
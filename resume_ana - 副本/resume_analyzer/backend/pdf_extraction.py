@@ -0,0 +1,277 @@
+import os
+import time
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import PyPDF2
+from metrics import registry
+from tracing import current_span
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+# 指定PDF解析后端（auto为按速度优先选择已安装的后端）
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto")
+# 页数达到该值时把页面分给多个进程并行提取
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+# 进程池的启动方式：服务进程中有事件循环和多个线程，fork可能复制到被其他线程持有的锁，默认spawn
+PDF_START_METHOD = os.getenv("PDF_START_METHOD", "spawn")
+# 按页面内容哈希缓存的提取结果数量
+PDF_PAGE_CACHE_MAX = int(os.getenv("PDF_PAGE_CACHE_MAX", "5000"))
+
+
+def _file_digest(file_path: str) -> str:
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PDFBackend:
+    """PDF解析后端接口：打开文档、页数、每页的缓存键和页面文本"""
+
+    name = ''
+
+    def available(self) -> bool:
+        return True
+
+    def open(self, file_path: str):
+        raise NotImplementedError
+
+    def page_count(self, document) -> int:
+        raise NotImplementedError
+
+    def page_keys(self, document, file_path: str) -> List[str]:
+        """每页提取结果的缓存键；默认为文件哈希加页码，只有完全相同的文件才能命中"""
+        file_digest = _file_digest(file_path)
+        return [f"{file_digest}:{index}" for index in range(self.page_count(document))]
+
+    def page_text(self, document, index: int) -> str:
+        raise NotImplementedError
+
+    def close(self, document) -> None:
+        pass
+
+
+class PyPDF2Backend(PDFBackend):
+    """纯Python实现，始终可用，作为兜底后端"""
+
+    name = 'pypdf2'
+    module = PyPDF2
+
+    def available(self) -> bool:
+        return self.module is not None
+
+    def open(self, file_path: str):
+        return self.module.PdfReader(file_path)
+
+    def page_count(self, document) -> int:
+        return len(document.pages)
+
+    def page_keys(self, document, file_path: str) -> List[str]:
+        """
+        页面内容流连同其引用的字体、图片、表单等资源一起哈希：
+        只有内容流和资源都相同的页面才共用缓存，不同文件中相同模板的页面也能命中
+        """
+        digests = {}
+        keys = []
+        for page in document.pages:
+            digest = hashlib.sha1(self._object_digest(page.raw_get('/Contents'), digests)
+                                  if '/Contents' in page else b'')
+            digest.update(self._object_digest(page.raw_get('/Resources'), digests)
+                          if '/Resources' in page else b'')
+            keys.append(digest.hexdigest())
+        return keys
+
+    def _object_digest(self, obj, digests: Dict[tuple, bytes]) -> bytes:
+        """递归哈希PDF对象；间接对象在文档内只计算一次，/Parent指回页面树，不计入"""
+        generic = self.module.generic
+        if isinstance(obj, generic.IndirectObject):
+            key = (obj.idnum, obj.generation)
+            digest = digests.get(key)
+            if digest is None:
+                digests[key] = b''  # 循环引用时按空对象处理
+                digest = digests[key] = self._object_digest(obj.get_object(), digests)
+            return digest
+        digest = hashlib.sha1(type(obj).__name__.encode())
+        if isinstance(obj, generic.DictionaryObject):
+            for key in sorted(obj):
+                if key != '/Parent':
+                    digest.update(key.encode())
+                    digest.update(self._object_digest(obj.raw_get(key), digests))
+            if isinstance(obj, generic.StreamObject):
+                # 未解码的原始数据，避免为哈希解压字体和图片
+                digest.update(obj._data or b'')
+        elif isinstance(obj, generic.ArrayObject):
+            for item in obj:
+                digest.update(self._object_digest(item, digests))
+        else:
+            digest.update(repr(obj).encode())
+        return digest.digest()
+
+    def page_text(self, document, index: int) -> str:
+        return document.pages[index].extract_text() or ''
+
+
+class PyPDFBackend(PyPDF2Backend):
+    """PyPDF2的后续版本，接口相同，文本提取更快"""
+
+    name = 'pypdf'
+    module = pypdf
+
+
+class PyMuPDFBackend(PDFBackend):
+    """基于MuPDF的C实现，速度最快"""
+
+    name = 'pymupdf'
+
+    def available(self) -> bool:
+        return fitz is not None
+
+    def open(self, file_path: str):
+        return fitz.open(file_path)
+
+    def page_count(self, document) -> int:
+        return document.page_count
+
+    def page_text(self, document, index: int) -> str:
+        return document[index].get_text()
+
+    def close(self, document) -> None:
+        document.close()
+
+
+# 按优先级排列，auto时选择第一个可用的后端
+PDF_BACKENDS: Dict[str, PDFBackend] = OrderedDict()
+
+
+def register_backend(backend: PDFBackend) -> None:
+    """注册PDF解析后端（后注册的优先级更低）"""
+    PDF_BACKENDS[backend.name] = backend
+
+
+for _backend in (PyMuPDFBackend(), PyPDFBackend(), PyPDF2Backend()):
+    register_backend(_backend)
+
+
+def get_backend(name: str = PDF_BACKEND) -> PDFBackend:
+    if name == 'auto':
+        for backend in PDF_BACKENDS.values():
+            if backend.available():
+                return backend
+    backend = PDF_BACKENDS.get(name)
+    if backend is None or not backend.available():
+        raise Exception(f"PDF解析后端不可用: {name}")
+    return backend
+
+
+def _extract_pages(backend_name: str, file_path: str, indexes: List[int]) -> List[str]:
+    """工作进程中执行：打开文档并按顺序提取指定页的文本"""
+    backend = get_backend(backend_name)
+    document = backend.open(file_path)
+    try:
+        return [backend.page_text(document, index) for index in indexes]
+    finally:
+        backend.close(document)
+
+
+class PDFExtractor:
+    """
+    PDF文本提取：页数较多时按连续页段分给进程池并行提取，
+    每页结果按 (后端, 页面缓存键) 缓存；无论后端和进程数如何，输出都按页码顺序拼接
+    """
+
+    def __init__(self, backend: Optional[PDFBackend] = None, workers: int = PDF_WORKERS,
+                 parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES, cache_max: int = PDF_PAGE_CACHE_MAX):
+        self.backend = backend or get_backend()
+        self.workers = max(workers, 1)
+        self.parallel_min_pages = parallel_min_pages
+        self.cache_max = cache_max
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(PDF_START_METHOD)
+                )
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+            return text
+
+    def _cache_put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._cache[key] = text
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max:
+                self._cache.popitem(last=False)
+
+    def extract_text(self, file_path: str) -> str:
+        """提取整份PDF的文本，页与页之间换行"""
+        started = time.perf_counter()
+        backend = self.backend
+        document = backend.open(file_path)
+        try:
+            page_count = backend.page_count(document)
+            # 相同模板/重复上传的页面无需重新提取
+            keys = [f"{backend.name}:{key}" for key in backend.page_keys(document, file_path)]
+            texts: List[Optional[str]] = [self._cache_get(key) for key in keys]
+            missing = [index for index, text in enumerate(texts) if text is None]
+            registry.inc("pdf.pages", page_count)
+            registry.inc("pdf.page_cache_hits", page_count - len(missing))
+            current_span().set_attributes({
+                'pdf.backend': backend.name,
+                'pdf.pages': page_count,
+                'pdf.page_cache_hits': page_count - len(missing),
+                'pdf.parallel': len(missing) >= self.parallel_min_pages and self.workers > 1
+            })
+
+            if len(missing) >= self.parallel_min_pages and self.workers > 1:
+                registry.inc("pdf.parallel_documents")
+                # 连续页段分给各进程，结果按提交顺序取回，保证页码顺序
+                chunk_size = -(-len(missing) // self.workers)
+                chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+                pool = self._get_pool()
+                futures = [pool.submit(_extract_pages, backend.name, file_path, chunk) for chunk in chunks]
+                for chunk, future in zip(chunks, futures):
+                    for index, text in zip(chunk, future.result()):
+                        texts[index] = text
+            else:
+                for index in missing:
+                    texts[index] = backend.page_text(document, index)
+
+            for index in missing:
+                self._cache_put(keys[index], texts[index])
+        finally:
+            backend.close(document)
+            registry.observe("pdf.extract_seconds", time.perf_counter() - started)
+
+        return ''.join(text + "\n" for text in texts).strip()
+
+
+pdf_extractor = PDFExtractor()
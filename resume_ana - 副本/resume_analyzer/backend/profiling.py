@@ -0,0 +1,267 @@
+import os
+import io
+import re
+import sys
+import time
+import hmac
+import uuid
+import pstats
+import cProfile
+import tempfile
+import threading
+import contextvars
+from collections import Counter
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+# 管理令牌：请求携带相同的令牌才会开启性能分析，未设置时禁用
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_HEADER = "X-Profile"
+PROFILE_FORMAT_HEADER = "X-Profile-Format"
+PROFILE_OUTPUT_HEADER = "X-Profile-Output"
+# 分析结果保存目录
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "resume_analyzer_profiles"))
+# 单个请求采样的间隔（秒）
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+# 常驻低频采样的间隔（秒），0为关闭
+PROFILE_BACKGROUND_INTERVAL = float(os.getenv("PROFILE_BACKGROUND_INTERVAL", "0"))
+# 聚合的不同调用栈数量上限，超出后新出现的栈只计入dropped
+PROFILE_MAX_STACKS = int(os.getenv("PROFILE_MAX_STACKS", "10000"))
+PROFILE_MAX_DEPTH = 64
+# 内联返回pstats报告时列出的函数数
+PROFILE_INLINE_TOP = 60
+
+FORMAT_COLLAPSED = "collapsed"
+FORMAT_PSTATS = "pstats"
+PROFILE_FORMATS = {FORMAT_COLLAPSED, FORMAT_PSTATS}
+OUTPUT_FILE = "file"
+OUTPUT_INLINE = "inline"
+PROFILE_OUTPUTS = {OUTPUT_FILE, OUTPUT_INLINE}
+
+# 线程空闲（等待事件、任务或网络数据）时所在的函数，采样时忽略
+_IDLE_FRAMES = {
+    ('selectors.py', 'select'),
+    ('threading.py', 'wait'),
+    ('thread.py', '_worker'),
+    ('queue.py', 'get'),
+    ('socket.py', 'readinto'),
+    ('ssl.py', 'read'),
+}
+_THREAD_SUFFIX = re.compile(r'[-_]\d+(_\d+)?$')
+
+_current_session: contextvars.ContextVar = contextvars.ContextVar("profile_session", default=None)
+# 同一时间只分析一个请求
+_session_lock = threading.Lock()
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """定时采样所有线程的调用栈，按折叠栈（collapsed stacks，可直接用于火焰图）聚合"""
+
+    def __init__(self, interval: float, max_stacks: int = PROFILE_MAX_STACKS):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: _THREAD_SUFFIX.sub('', thread.name) for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            code = frame.f_code
+            # 跳过所有采样线程自身
+            if ident == own or names.get(ident) == 'stack-sampler' or (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            # 同一线程池的线程合并为一个根节点
+            stack.append(names.get(ident, 'thread'))
+            key = ';'.join(reversed(stack))
+            with self._lock:
+                self.samples += 1
+                if key in self.stacks or len(self.stacks) < self.max_stacks:
+                    self.stacks[key] += 1
+                else:
+                    self.dropped += 1
+
+    def collapsed(self) -> str:
+        """每行一个调用栈及其采样次数：thread;outer;...;inner count"""
+        with self._lock:
+            return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def hot_functions(self, top: int = 30) -> Dict[str, Any]:
+        """自身耗时（栈顶）和累计耗时（出现在栈中）最多的函数"""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        with self._lock:
+            for stack, count in self.stacks.items():
+                frames = stack.split(';')[1:]
+                self_counts[frames[-1]] += count
+                for frame in set(frames):
+                    total_counts[frame] += count
+            samples, dropped = self.samples, self.dropped
+
+        def ranked(counter: Counter):
+            return [
+                {'function': name, 'samples': count, 'ratio': count / samples if samples else 0.0}
+                for name, count in counter.most_common(top)
+            ]
+
+        return {
+            'interval_seconds': self.interval,
+            'samples': samples,
+            'dropped': dropped,
+            'top_self': ranked(self_counts),
+            'top_total': ranked(total_counts)
+        }
+
+
+class ProfileSession:
+    """
+    单个请求的性能分析：collapsed为所有线程的调用栈采样，pstats为确定性分析（cProfile），
+    pstats模式下事件循环线程和经bind提交到线程池的任务都会被记录
+    """
+
+    def __init__(self, profile_format: str = FORMAT_COLLAPSED):
+        self.format = profile_format
+        self.seconds = 0.0
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+        self._token = None
+        self._started = 0.0
+
+    def begin(self) -> bool:
+        """开始分析；已有请求在分析时返回False"""
+        if not _session_lock.acquire(blocking=False):
+            return False
+        self._token = _current_session.set(self)
+        self._started = time.perf_counter()
+        if self.format == FORMAT_PSTATS:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = StackSampler(PROFILE_SAMPLE_INTERVAL)
+            self._sampler.start()
+        return True
+
+    def end(self) -> None:
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+            if self._sampler is not None:
+                self._sampler.stop()
+            self.seconds = time.perf_counter() - self._started
+            _current_session.reset(self._token)
+        finally:
+            _session_lock.release()
+
+    def add_thread_profile(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            self._thread_profiles.append(profile)
+
+    def _stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self._profile)
+        for profile in self._thread_profiles:
+            stats.add(profile)
+        return stats
+
+    @property
+    def samples(self) -> int:
+        return self._sampler.samples if self._sampler is not None else 0
+
+    def report(self) -> str:
+        """文本形式：折叠栈，或按累计耗时排序的pstats报告"""
+        if self._sampler is not None:
+            return self._sampler.collapsed()
+        output = io.StringIO()
+        stats = self._stats()
+        stats.stream = output
+        stats.sort_stats('cumulative').print_stats(PROFILE_INLINE_TOP)
+        return output.getvalue()
+
+    def save(self, name: str) -> str:
+        """保存到PROFILE_DIR：折叠栈为.folded文本，pstats为可用pstats/snakeviz打开的.prof文件"""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = re.sub(r'[^0-9A-Za-z]+', '_', name).strip('_') or 'request'
+        extension = '.folded' if self._sampler is not None else '.prof'
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:6]}{extension}")
+        if self._sampler is not None:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(self._sampler.collapsed())
+        else:
+            self._stats().dump_stats(path)
+        return path
+
+
+def bind(func):
+    """
+    提交到线程池的任务：当前请求在pstats分析中时，在工作线程里同样用cProfile记录
+    （run_in_executor不会传递contextvars，需要在提交时绑定）
+    """
+    session = _current_session.get()
+    if session is None or session.format != FORMAT_PSTATS:
+        return func
+
+    def profiled(*args, **kwargs):
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            session.add_thread_profile(profile)
+
+    return profiled
+
+
+def check_token(token: Optional[str]) -> bool:
+    """校验管理令牌，未设置PROFILE_TOKEN时总是失败"""
+    return bool(PROFILE_TOKEN and token) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+def requested_profile(headers: Mapping[str, str], query: Mapping[str, str]) -> Optional[Tuple[str, str]]:
+    """
+    从请求头（X-Profile: 令牌）或查询参数（?profile=令牌）读取分析选项，返回 (格式, 输出方式)
+    令牌不正确时抛出PermissionError，选项不合法时抛出ValueError
+    """
+    token = headers.get(PROFILE_HEADER) or query.get('profile')
+    if not token:
+        return None
+    if not check_token(token):
+        raise PermissionError("性能分析令牌无效或未启用")
+    profile_format = headers.get(PROFILE_FORMAT_HEADER) or query.get('profile_format') or FORMAT_COLLAPSED
+    output = headers.get(PROFILE_OUTPUT_HEADER) or query.get('profile_output') or OUTPUT_FILE
+    if profile_format not in PROFILE_FORMATS:
+        raise ValueError(f"不支持的分析格式。支持的格式: {', '.join(sorted(PROFILE_FORMATS))}")
+    if output not in PROFILE_OUTPUTS:
+        raise ValueError(f"不支持的输出方式。支持的方式: {', '.join(sorted(PROFILE_OUTPUTS))}")
+    return profile_format, output
+
+
+# 常驻低频采样：聚合所有流量中的热点函数
+background_sampler = StackSampler(PROFILE_BACKGROUND_INTERVAL) if PROFILE_BACKGROUND_INTERVAL > 0 else None
@@ -0,0 +1,115 @@
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+from llama_index.core import Settings
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from metrics import registry
+
+# 提示词中简历内容的默认token预算（豆包上下文为32k，需为岗位描述和输出留出空间）
+DEFAULT_PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+
+
+def count_tokens(text: str) -> int:
+    """使用LlamaIndex配置的分词器估算token数"""
+    if not text:
+        return 0
+    return len(Settings.tokenizer(text))
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'\s+', '', text).lower()
+
+
+def _dedupe_lines(chunk: str, seen: set) -> str:
+    """去掉已出现过的行（包括分块重叠部分和重复段落）"""
+    kept = []
+    for line in chunk.split('\n'):
+        key = _normalize(line)
+        if not key:
+            continue
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(line.strip())
+    return '\n'.join(kept)
+
+
+def _rank_chunks(chunks: List[str], job_description: str) -> List[float]:
+    """按与岗位描述的字符n-gram TF-IDF相似度给分块打分"""
+    try:
+        vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 3), min_df=1)
+        matrix = vectorizer.fit_transform(chunks + [job_description])
+        return cosine_similarity(matrix[:-1], matrix[-1]).ravel().tolist()
+    except ValueError:
+        return [0.0] * len(chunks)
+
+
+def build_prompt_text(segments: List[str], job_description: Optional[str] = None,
+                      token_budget: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    构建符合token预算的简历文本
+    segments: 简历文本片段（原文、技能、经历等），按优先级排列
+    返回 (提示词用文本, 统计信息)
+    """
+    budget = token_budget if token_budget is not None else DEFAULT_PROMPT_TOKEN_BUDGET
+    splitter = Settings.node_parser
+
+    original_text = '\n'.join(segment for segment in segments if segment)
+    original_tokens = count_tokens(original_text)
+
+    # 1. 分块并去重：与前面片段完全相同的片段直接丢弃，部分重复由逐行去重处理
+    chunks = []
+    seen_lines = set()
+    seen_segments = set()
+    duplicates_removed = 0
+    for segment in segments:
+        if not segment or not segment.strip():
+            continue
+        normalized = _normalize(segment)
+        if normalized in seen_segments:
+            duplicates_removed += 1
+            continue
+        seen_segments.add(normalized)
+        for chunk in splitter.split_text(segment):
+            deduped = _dedupe_lines(chunk, seen_lines)
+            if deduped:
+                chunks.append(deduped)
+            else:
+                duplicates_removed += 1
+
+    chunk_tokens = [count_tokens(chunk) for chunk in chunks]
+    selected = list(range(len(chunks)))
+
+    # 2. 超出预算时按与岗位的相关度选取分块，输出时保持原文顺序
+    if sum(chunk_tokens) > budget:
+        if job_description:
+            scores = _rank_chunks(chunks, job_description)
+            order = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+        else:
+            order = list(range(len(chunks)))
+        selected = []
+        used = 0
+        for i in order:
+            if used + chunk_tokens[i] <= budget:
+                selected.append(i)
+                used += chunk_tokens[i]
+        selected.sort()
+
+    prompt_text = '\n'.join(chunks[i] for i in selected)
+    prompt_tokens = sum(chunk_tokens[i] for i in selected)
+    tokens_saved = max(original_tokens - prompt_tokens, 0)
+
+    registry.inc("prompt.tokens_original", original_tokens)
+    registry.inc("prompt.tokens_sent", prompt_tokens)
+    registry.inc("prompt.tokens_saved", tokens_saved)
+
+    return prompt_text, {
+        'original_tokens': original_tokens,
+        'prompt_tokens': prompt_tokens,
+        'tokens_saved': tokens_saved,
+        'token_budget': budget,
+        'chunks_total': len(chunks),
+        'chunks_kept': len(selected),
+        'duplicates_removed': duplicates_removed
+    }
@@ -0,0 +1,121 @@
+# LLM提示词中使用的JSON结构，简历解析、岗位评估和合并模式共用
+
+RESUME_JSON_SCHEMA = """{
+                "personal_info": {
+                    "name": "姓名",
+                    "contact": "联系方式",
+                    "email": "邮箱"
+                },
+                "education": [
+                    {
+                        "school": "学校名称",
+                        "major": "专业",
+                        "degree": "学历",
+                        "graduation_year": "毕业年份"
+                    }
+                ],
+                "work_experience": [
+                    {
+                        "company": "公司名称",
+                        "position": "职位",
+                        "duration": "工作时间",
+                        "description": "工作描述"
+                    }
+                ],
+                "skills": ["技能1", "技能2", "技能3"],
+                "projects": [
+                    {
+                        "name": "项目名称",
+                        "description": "项目描述",
+                        "technologies": ["技术1", "技术2"]
+                    }
+                ],
+                "certificates": ["证书1", "证书2"]
+            }"""
+
+ASSESSMENT_JSON_SCHEMA = """{
+                "technical_skills": 0.8,
+                "work_experience": 0.7,
+                "project_experience": 0.6,
+                "learning_potential": 0.8,
+                "overall_score": 0.75,
+                "strengths": ["优势1", "优势2"],
+                "weaknesses": ["不足1", "不足2"],
+                "summary": "综合评估总结"
+            }"""
+
+# 分析模式：two_step 为解析、评估两次调用；combined 为单次调用同时完成；
+# fast 为本地规则提取，不调用LLM（two_step和combined为深度分析）
+ANALYSIS_MODE_TWO_STEP = "two_step"
+ANALYSIS_MODE_COMBINED = "combined"
+ANALYSIS_MODE_FAST = "fast"
+ANALYSIS_MODES = {ANALYSIS_MODE_TWO_STEP, ANALYSIS_MODE_COMBINED, ANALYSIS_MODE_FAST}
+
+
+def build_resume_prompt(text: str) -> str:
+    """简历结构化解析提示词"""
+    return f"""
+            请分析以下简历内容，提取关键信息并以JSON格式返回：
+
+            简历内容：
+            {text}
+
+            请提取以下信息（如果没有相关信息，请设置为null）：
+            1. 个人信息：姓名、联系方式、邮箱等
+            2. 教育背景：学校、专业、学历、毕业时间等
+            3. 工作经验：公司、职位、工作时间、职责描述等
+            4. 技能：专业技能、编程语言、工具等
+            5. 项目经验：项目名称、描述、技术栈等
+            6. 证书/奖项：相关认证和获奖情况
+
+            请以以下JSON格式返回：
+            {RESUME_JSON_SCHEMA}
+            """
+
+
+def build_assessment_prompt(resume_text: str, job_description: str, job_title: str) -> str:
+    """岗位匹配评估提示词"""
+    return f"""
+            作为一名专业的HR和技术专家，请评估以下简历与目标岗位的匹配度：
+
+            目标岗位：{job_title}
+
+            岗位描述：
+            {job_description}
+
+            候选人简历：
+            {resume_text}
+
+            请从以下几个维度进行评估（0-1分）：
+            1. 技术技能匹配度
+            2. 工作经验相关性
+            3. 项目经验适配度
+            4. 学习能力和发展潜力
+            5. 整体适合度
+
+            请以JSON格式返回评估结果：
+            {ASSESSMENT_JSON_SCHEMA}
+            """
+
+
+def build_combined_prompt(text: str, job_description: str, job_title: str) -> str:
+    """单次调用同时完成简历解析与岗位评估的提示词"""
+    return f"""
+            作为一名专业的HR和技术专家，请完成两项任务：
+            一、从简历中提取结构化信息（没有的信息设置为null）；
+            二、评估该简历与目标岗位的匹配度（各维度0-1分）。
+
+            目标岗位：{job_title}
+
+            岗位描述：
+            {job_description}
+
+            简历内容：
+            {text}
+
+            请只返回一个JSON对象，格式如下：
+            {{
+                "resume": {RESUME_JSON_SCHEMA},
+                "assessment": {ASSESSMENT_JSON_SCHEMA}
+            }}
+            """
@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import struct
+import asyncio
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List
+from metrics import registry
+
+try:
+    import fcntl
+except ImportError:  # Windows：只在进程内共享配额
+    fcntl = None
+
+# 豆包账号的每分钟请求数、token数配额（0表示不限制）
+DOUBAO_RPM = int(os.getenv("DOUBAO_RPM", "0"))
+DOUBAO_TPM = int(os.getenv("DOUBAO_TPM", "0"))
+DOUBAO_EMBEDDING_RPM = int(os.getenv("DOUBAO_EMBEDDING_RPM", "0"))
+DOUBAO_EMBEDDING_TPM = int(os.getenv("DOUBAO_EMBEDDING_TPM", "0"))
+# 允许的突发量（按秒数计的配额），配额空闲一段时间后可以一次性用掉
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "6"))
+# 同一主机的工作进程通过该目录下的状态文件共享配额
+RATE_LIMIT_DIR = os.getenv("RATE_LIMIT_DIR", tempfile.gettempdir())
+# 嵌入等不带截止时间的调用最多等待配额的秒数
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "60"))
+# 调用方未指定max_tokens时，预估的输出token数（调用结束后按实际用量修正）
+DOUBAO_OUTPUT_TOKENS_ESTIMATE = int(os.getenv("DOUBAO_OUTPUT_TOKENS_ESTIMATE", "1000"))
+
+_CJK_PATTERN = re.compile(r'[　-〿㐀-鿿＀-￯]')
+# 状态：请求桶余量、token桶余量、更新时间
+_STATE = struct.Struct('ddd')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中文约每字一个token，其余约每4个字符一个token"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def estimate_output_tokens(payload: Dict[str, Any]) -> int:
+    """预计输出token数：对话调用按max_tokens或默认值，嵌入调用没有输出"""
+    if 'messages' not in payload:
+        return 0
+    return int(payload.get('max_tokens') or DOUBAO_OUTPUT_TOKENS_ESTIMATE)
+
+
+def estimate_request_tokens(payload: Dict[str, Any]) -> int:
+    """预估一次调用消耗的token：输入（对话消息或嵌入文本）加预计输出"""
+    if 'messages' in payload:
+        prompt = ''.join(str(message.get('content', '')) for message in payload['messages'])
+        return estimate_tokens(prompt) + estimate_output_tokens(payload)
+    texts = payload.get('input', '')
+    if isinstance(texts, list):
+        texts = ''.join(texts)
+    return estimate_tokens(str(texts))
+
+
+class RateLimitTimeout(Exception):
+    """等待配额的时间超过调用方允许的上限"""
+
+    def __init__(self, message: str, wait: float):
+        super().__init__(message)
+        self.wait = wait
+
+
+class TokenBucketLimiter:
+    """
+    按每分钟请求数和token数限流的令牌桶，状态保存在共享文件中并用文件锁保护，
+    同一主机上的所有工作进程共用一份配额
+    调用先预约配额（余量可以为负），再等待余量恢复后发出，等待者按预约顺序依次放行；
+    补充速率为 配额/(60+突发秒数)，任意一分钟内的用量不超过配额
+    """
+
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int,
+                 burst_seconds: float = RATE_LIMIT_BURST_SECONDS, state_dir: str = RATE_LIMIT_DIR):
+        self.name = name
+        self.enabled = requests_per_minute > 0 or tokens_per_minute > 0
+        window = 60.0 + burst_seconds
+        # 每秒补充量与桶容量，配额为0的维度不限制
+        self.request_rate = requests_per_minute / window
+        self.token_rate = tokens_per_minute / window
+        self.request_capacity = max(self.request_rate * burst_seconds, 1.0) if requests_per_minute else 0.0
+        self.token_capacity = self.token_rate * burst_seconds
+        self.path = os.path.join(state_dir, f"resume_analyzer_{name}.bucket")
+        self._lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+        self._state: List[float] = []
+
+    def _open(self) -> int:
+        # 文件锁属于打开的文件描述，fork出的子进程需要重新打开
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    @contextmanager
+    def _locked_state(self):
+        """读取并在退出时写回共享状态：[请求余量, token余量, 更新时间]"""
+        with self._lock:
+            if fcntl is None:
+                if not self._state:
+                    self._state = [self.request_capacity, self.token_capacity, time.time()]
+                yield self._state
+                return
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(fd, _STATE.size, 0)
+                if len(raw) == _STATE.size:
+                    state = list(_STATE.unpack(raw))
+                else:
+                    state = [self.request_capacity, self.token_capacity, time.time()]
+                yield state
+                os.pwrite(fd, _STATE.pack(*state), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _refill(self, state: List[float]) -> None:
+        now = time.time()
+        elapsed = max(now - state[2], 0.0)
+        state[0] = min(state[0] + elapsed * self.request_rate, self.request_capacity)
+        state[1] = min(state[1] + elapsed * self.token_rate, self.token_capacity)
+        state[2] = now
+
+    def _consume(self, state: List[float], requests: float, tokens: float) -> None:
+        # 只扣减有配额限制的维度
+        if self.request_rate:
+            state[0] = min(state[0] - requests, self.request_capacity)
+        if self.token_rate:
+            state[1] = min(state[1] - tokens, self.token_capacity)
+
+    def _deficit_seconds(self, requests: float, tokens: float) -> float:
+        wait = 0.0
+        if self.request_rate and requests < 0:
+            wait = max(wait, -requests / self.request_rate)
+        if self.token_rate and tokens < 0:
+            wait = max(wait, -tokens / self.token_rate)
+        return wait
+
+    def reserve(self, tokens: int, max_wait: float) -> float:
+        """预约一次请求和tokens个token，返回发出前需等待的秒数；超过max_wait时不预约并抛出RateLimitTimeout"""
+        if not self.enabled:
+            return 0.0
+        with self._locked_state() as state:
+            self._refill(state)
+            wait = self._deficit_seconds(state[0] - 1, state[1] - tokens)
+            if wait > max_wait:
+                registry.inc(f"rate_limit.{self.name}.timeouts")
+                raise RateLimitTimeout(f"超出调用配额，需等待{wait:.1f}秒", wait)
+            self._consume(state, 1, tokens)
+        registry.inc(f"rate_limit.{self.name}.requests")
+        registry.inc(f"rate_limit.{self.name}.tokens", tokens)
+        if wait > 0:
+            registry.inc(f"rate_limit.{self.name}.throttled")
+            registry.observe(f"rate_limit.{self.name}.wait_seconds", wait)
+        return wait
+
+    def acquire(self, tokens: int, max_wait: float) -> float:
+        """预约配额并阻塞等待，返回等待的秒数"""
+        wait = self.reserve(tokens, max_wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int, max_wait: float) -> float:
+        """异步版本；等待中被取消时归还预约的配额"""
+        wait = self.reserve(tokens, max_wait)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.adjust(-tokens, requests=-1)
+                raise
+        return wait
+
+    def adjust(self, tokens: int, requests: int = 0) -> None:
+        """按实际用量修正：tokens为实际与预估之差（为负时归还）"""
+        if not self.enabled or (tokens == 0 and requests == 0):
+            return
+        with self._locked_state() as state:
+            self._refill(state)
+            self._consume(state, requests, tokens)
+
+
+doubao_chat_limiter = TokenBucketLimiter("doubao_chat", DOUBAO_RPM, DOUBAO_TPM)
+doubao_embedding_limiter = TokenBucketLimiter("doubao_embedding", DOUBAO_EMBEDDING_RPM, DOUBAO_EMBEDDING_TPM)
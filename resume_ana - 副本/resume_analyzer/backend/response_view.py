@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+VIEW_FULL = "full"
+VIEW_SUMMARY = "summary"
+VIEWS = {VIEW_FULL, VIEW_SUMMARY}
+
+# 摘要视图保留的字段：列表页只需要得分和少量标识信息
+SUMMARY_FIELDS = (
+    'event', 'index', 'status', 'error', 'filename', 'url', 'duplicate_of', 'file_info', 'url_info', 'resume_id',
+    'resume_data.resume_id',
+    'resume_data.personal_info.name',
+    'match_result.job_id',
+    'match_result.error',
+    'match_result.overall_match_score',
+    'match_result.tfidf_similarity',
+    'match_result.skill_match.match_rate',
+    'match_result.skill_match.matched_skills',
+    'match_result.skill_match.missing_skills',
+    'match_result.experience_match.match_score',
+    'match_result.education_match.match_score',
+    'match_result.topic_similarity',
+    'match_result.ai_assessment.overall_score',
+    'match_result.degraded_stages',
+    'match_result.skipped_stages',
+)
+# 需要生成文字报告（Markdown分析和建议）的字段
+REPORT_FIELDS = ('match_result.detailed_analysis', 'match_result.recommendations')
+
+
+def _split(path: str) -> Tuple[str, ...]:
+    return tuple(part for part in path.strip().split('.') if part)
+
+
+class ResponseView:
+    """
+    响应字段投影：view=summary只返回得分，fields可指定逗号分隔的字段路径（如 match_result.overall_match_score），
+    指定fields时忽略view；未请求的文字报告不会生成
+    """
+
+    def __init__(self, view: str = VIEW_FULL, fields: Optional[str] = None):
+        if view not in VIEWS:
+            raise ValueError(f"不支持的视图。支持的视图: {', '.join(sorted(VIEWS))}")
+        self.paths: Optional[List[Tuple[str, ...]]] = None
+        if fields:
+            self.paths = [path for path in map(_split, fields.split(',')) if path]
+        elif view == VIEW_SUMMARY:
+            self.paths = [_split(path) for path in SUMMARY_FIELDS]
+
+    @property
+    def include_report(self) -> bool:
+        """是否需要生成detailed_analysis和recommendations"""
+        if self.paths is None:
+            return True
+        # 请求了报告字段本身或其上级（如整个match_result）
+        return any(report[:len(path)] == path for path in self.paths for report in map(_split, REPORT_FIELDS))
+
+    def apply(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """按字段路径从结果中取出需要的部分，保持原有的嵌套结构"""
+        if self.paths is None:
+            return item
+        projected: Dict[str, Any] = {}
+        for path in self.paths:
+            value = item
+            for key in path:
+                if not isinstance(value, dict) or key not in value:
+                    break
+                value = value[key]
+            else:
+                target = projected
+                for key in path[:-1]:
+                    target = target.setdefault(key, {})
+                target[path[-1]] = value
+        return projected
@@ -1,11 +1,7 @@
 import os
+import time
 import asyncio
-from typing import Dict, Any, Optional
-import aiohttp
-from bs4 import BeautifulSoup
-import PyPDF2
-import docx
-import markdown
+from typing import Dict, Any, Optional, Callable
 from llama_index.core import Document, VectorStoreIndex, Settings
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.base.embeddings.base import BaseEmbedding
@@ -13,23 +9,60 @@ from llama_index.core.llms import CustomLLM
 from llama_index.core.base.llms.types import ChatMessage, ChatResponse, CompletionResponse, LLMMetadata
 import requests
 from pydantic import BaseModel
-import re
 import json
 from sklearn.feature_extraction.text import TfidfVectorizer
 import numpy as np
+from llm_client import doubao_chat_client, LLMCallError, CircuitOpenError
+from rate_limiter import doubao_embedding_limiter, estimate_request_tokens, RATE_LIMIT_MAX_WAIT
+from prompt_builder import build_prompt_text
+from json_stream import IncrementalJSONParser, extract_json_object
+from fingerprint import simhash
+from resume_store import resume_store, make_resume_id, DEDUP_ENABLED
+from metrics import registry
+from tracing import span
+from memory_monitor import track_memory
+from text_analysis import AnalyzedDocument
+from url_fetcher import url_fetcher
+from text_extraction import html_to_text, markdown_to_text, docx_to_text
+from pdf_extraction import pdf_extractor
+from deadline import Deadline, DEADLINE_MIN_LLM_SECONDS, remaining_seconds
+from prompts import build_resume_prompt, build_combined_prompt, ANALYSIS_MODE_TWO_STEP, ANALYSIS_MODE_COMBINED, ANALYSIS_MODE_FAST
+from rule_extractor import extract_resume
 
 class DoubaoEmbedding(BaseEmbedding, BaseModel):
     api_key: str
     model: str = "doubao-embedding-text-240715"
     api_url: str = "https://ark.cn-beijing.volces.com/api/v3/embeddings"
 
-    def _get_query_embedding(self, query: str):
-        return self._get_text_embedding(query)
+    def _wait_for_quota(self, payload: Dict[str, Any]) -> int:
+        """按嵌入接口配额限流，返回预估的token数；等待超过RATE_LIMIT_MAX_WAIT时抛出RateLimitTimeout"""
+        cost = estimate_request_tokens(payload)
+        doubao_embedding_limiter.acquire(cost, RATE_LIMIT_MAX_WAIT)
+        return cost
     
-    async def _aget_query_embedding(self, query: str):
-        return self._get_text_embedding(query)
+    async def _await_quota(self, payload: Dict[str, Any]) -> int:
+        """异步等待配额，不阻塞事件循环"""
+        cost = estimate_request_tokens(payload)
+        await doubao_embedding_limiter.acquire_async(cost, RATE_LIMIT_MAX_WAIT)
+        return cost
     
-    def _get_text_embedding(self, text: str):
+    def _settle_quota(self, cost: int, result: Dict[str, Any]):
+        usage = result.get("usage") or {}
+        if usage.get("total_tokens") is not None:
+            doubao_embedding_limiter.adjust(usage["total_tokens"] - cost)
+    
+    def _payload(self, texts) -> Dict[str, Any]:
+        return {
+            "encoding_format": "float",
+            "input": texts,
+            "model": self.model
+        }
+    
+    def _post(self, payload: Dict[str, Any], cost: int):
+        """
+        发送嵌入请求，返回向量列表
+        配额用尽（429）时抛出LLMCallError，不能当作零向量；其他失败记录指标后返回None，由调用方使用零向量
+        """
         try:
             response = requests.post(
                 self.api_url,
@@ -37,51 +70,52 @@ class DoubaoEmbedding(BaseEmbedding, BaseModel):
                     "Content-Type": "application/json",
                     "Authorization": f"Bearer {self.api_key}"
                 },
-                json={
-                    "encoding_format": "float",
-                    "input": [text],
-                    "model": self.model
-                }
+                json=payload
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result["data"][0]["embedding"]
-            else:
-                print(f"豆包嵌入API错误: {response.status_code}")
-                return [0.0] * 768
-        except Exception as e:
+        except requests.RequestException as e:
+            registry.inc("doubao_embedding.errors")
             print(f"嵌入请求失败: {e}")
-            return [0.0] * 768
+            return None
+        
+        if response.status_code != 200:
+            # 被拒绝的请求不消耗token
+            doubao_embedding_limiter.adjust(-cost)
+            registry.inc(f"doubao_embedding.status_{response.status_code}")
+            if response.status_code == 429:
+                raise LLMCallError("豆包嵌入API超出调用配额", status_code=429, retryable=True)
+            print(f"豆包嵌入API错误: {response.status_code}")
+            return None
+        try:
+            result = response.json()
+            self._settle_quota(cost, result)
+            return [item["embedding"] for item in result["data"]]
+        except (ValueError, KeyError, TypeError) as e:
+            registry.inc("doubao_embedding.errors")
+            print(f"嵌入结果解析失败: {e}")
+            return None
+    
+    def _get_query_embedding(self, query: str):
+        return self._get_text_embedding(query)
+    
+    async def _aget_query_embedding(self, query: str):
+        return await self._aget_text_embedding(query)
+    
+    def _get_text_embedding(self, text: str):
+        return self._get_text_embeddings([text])[0]
     
     async def _aget_text_embedding(self, text: str):
-        return self._get_text_embedding(text)
+        return (await self._aget_text_embeddings([text]))[0]
     
     def _get_text_embeddings(self, texts):
-        try:
-            response = requests.post(
-                self.api_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                },
-                json={
-                    "encoding_format": "float",
-                    "input": texts,
-                    "model": self.model
-                }
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return [item["embedding"] for item in result["data"]]
-            else:
-                return [[0.0] * 768 for _ in texts]
-        except Exception as e:
-            return [[0.0] * 768 for _ in texts]
+        payload = self._payload(texts)
+        embeddings = self._post(payload, self._wait_for_quota(payload))
+        return embeddings if embeddings is not None else [[0.0] * 768 for _ in texts]
     
     async def _aget_text_embeddings(self, texts):
-        return self._get_text_embeddings(texts)
+        payload = self._payload(texts)
+        cost = await self._await_quota(payload)
+        embeddings = await asyncio.to_thread(self._post, payload, cost)
+        return embeddings if embeddings is not None else [[0.0] * 768 for _ in texts]
 
 class DoubaoLLM(CustomLLM):
     api_key: str
@@ -96,76 +130,118 @@ class DoubaoLLM(CustomLLM):
             model_name=self.model
         )
     
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+    
     def _complete(self, prompt: str, **kwargs) -> CompletionResponse:
         try:
-            response = requests.post(
+            result = doubao_chat_client.post_json(
                 self.api_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                },
-                json={
+                self._headers(),
+                {
                     "model": self.model,
                     "messages": [{"role": "user", "content": prompt}]
-                }
+                },
+                deadline=kwargs.get("deadline")
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                return CompletionResponse(text=content)
-            else:
-                return CompletionResponse(text="生成失败")
-        except Exception as e:
-            return CompletionResponse(text="生成失败")
+            content = result["choices"][0]["message"]["content"]
+            return CompletionResponse(text=content)
+        except LLMCallError as e:
+            print(f"豆包LLM调用失败: {e}")
+            return CompletionResponse(text="生成失败", additional_kwargs=self._degraded_info(e))
+        except (KeyError, IndexError, ValueError) as e:
+            print(f"豆包LLM响应格式异常: {e}")
+            return CompletionResponse(text="生成失败", additional_kwargs={"degraded": True, "reason": "响应格式异常"})
+    
+    def _api_messages(self, messages) -> list:
+        api_messages = []
+        for msg in messages:
+            api_messages.append({
+                "role": msg.role.value,
+                "content": msg.content
+            })
+        return api_messages
     
     def _chat(self, messages, **kwargs) -> ChatResponse:
+        api_messages = self._api_messages(messages)
         try:
-            api_messages = []
-            for msg in messages:
-                api_messages.append({
-                    "role": msg.role.value,
-                    "content": msg.content
-                })
-            
-            response = requests.post(
+            result = doubao_chat_client.post_json(
                 self.api_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                },
-                json={
+                self._headers(),
+                {
                     "model": self.model,
                     "messages": api_messages
-                }
+                },
+                deadline=kwargs.get("deadline")
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                return ChatResponse(
-                    message=ChatMessage(role="assistant", content=content)
-                )
-            else:
-                return ChatResponse(
-                    message=ChatMessage(role="assistant", content="生成失败")
-                )
-        except Exception as e:
+            content = result["choices"][0]["message"]["content"]
+            return ChatResponse(
+                message=ChatMessage(role="assistant", content=content)
+            )
+        except (LLMCallError, KeyError, IndexError, ValueError) as e:
+            print(f"豆包LLM调用失败: {e}")
             return ChatResponse(
-                message=ChatMessage(role="assistant", content="生成失败")
+                message=ChatMessage(role="assistant", content="生成失败"),
+                additional_kwargs=self._degraded_info(e)
             )
     
+    def _degraded_info(self, error: Exception) -> Dict[str, Any]:
+        """降级结果标记"""
+        return {
+            "degraded": True,
+            "reason": str(error),
+            "circuit_open": isinstance(error, CircuitOpenError)
+        }
+    
     async def acomplete(self, prompt: str, **kwargs) -> CompletionResponse:
-        return self._complete(prompt, **kwargs)
+        # 同步HTTP调用放到线程中执行，避免阻塞事件循环
+        return await asyncio.to_thread(self._complete, prompt, **kwargs)
     
     async def achat(self, messages, **kwargs) -> ChatResponse:
-        return self._chat(messages, **kwargs)
+        return await asyncio.to_thread(self._chat, messages, **kwargs)
     
     async def astream_complete(self, prompt: str, **kwargs):
-        raise NotImplementedError("astream_complete is not implemented")
+        stream = doubao_chat_client.astream_post(
+            self.api_url,
+            self._headers(),
+            {
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}]
+            },
+            deadline=kwargs.get("deadline")
+        )
+        
+        async def gen():
+            text = ""
+            async for delta in stream:
+                text += delta
+                yield CompletionResponse(text=text, delta=delta)
+        
+        return gen()
     
     async def astream_chat(self, messages, **kwargs):
-        raise NotImplementedError("astream_chat is not implemented")
+        stream = doubao_chat_client.astream_post(
+            self.api_url,
+            self._headers(),
+            {
+                "model": self.model,
+                "messages": self._api_messages(messages)
+            },
+            deadline=kwargs.get("deadline")
+        )
+        
+        async def gen():
+            content = ""
+            async for delta in stream:
+                content += delta
+                yield ChatResponse(
+                    message=ChatMessage(role="assistant", content=content), delta=delta
+                )
+        
+        return gen()
     
     def complete(self, prompt: str, **kwargs) -> CompletionResponse:
         return self._complete(prompt, **kwargs)
@@ -174,10 +250,34 @@ class DoubaoLLM(CustomLLM):
         return self._chat(messages, **kwargs)
     
     def stream_complete(self, prompt: str, **kwargs):
-        raise NotImplementedError("stream_complete is not implemented")
+        text = ""
+        for delta in doubao_chat_client.stream_post(
+            self.api_url,
+            self._headers(),
+            {
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}]
+            },
+            deadline=kwargs.get("deadline")
+        ):
+            text += delta
+            yield CompletionResponse(text=text, delta=delta)
     
     def stream_chat(self, messages, **kwargs):
-        raise NotImplementedError("stream_chat is not implemented")
+        content = ""
+        for delta in doubao_chat_client.stream_post(
+            self.api_url,
+            self._headers(),
+            {
+                "model": self.model,
+                "messages": self._api_messages(messages)
+            },
+            deadline=kwargs.get("deadline")
+        ):
+            content += delta
+            yield ChatResponse(
+                message=ChatMessage(role="assistant", content=content), delta=delta
+            )
     
     def _as_query_component(self):
         raise NotImplementedError("_as_query_component is not implemented")
@@ -194,87 +294,155 @@ class ResumeProcessor:
         Settings.llm = DoubaoLLM(api_key=self.api_key)
         Settings.node_parser = SentenceSplitter(chunk_size=512, chunk_overlap=50)
     
-    async def process_file(self, file_path: str, file_extension: str) -> Dict[str, Any]:
-        """处理上传的文件"""
+    async def process_file(self, file_path: str, file_extension: str,
+                           job_description: Optional[str] = None, job_title: Optional[str] = None,
+                           analysis_mode: str = ANALYSIS_MODE_TWO_STEP,
+                           on_field: Optional[Callable[[str, Any], None]] = None,
+                           deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """处理上传的文件，deadline为请求级时间预算"""
         try:
-            # 根据文件类型提取文本
-            if file_extension == '.pdf':
-                text = self._extract_pdf_text(file_path)
-            elif file_extension in ['.docx', '.doc']:
-                text = self._extract_word_text(file_path)
-            elif file_extension == '.md':
-                text = self._extract_markdown_text(file_path)
-            elif file_extension == '.txt':
-                text = self._extract_txt_text(file_path)
-            else:
-                raise ValueError(f"不支持的文件格式: {file_extension}")
+            # 文本提取是阻塞的文件读取和解析（PDF还会等待进程池），放到线程中执行，不阻塞事件循环
+            with span("extract", {'file.type': file_extension}) as trace_span, track_memory("extract"):
+                text = await asyncio.to_thread(self._extract_file_text, file_path, file_extension)
+                trace_span.set_attribute('text.length', len(text))
             
-            #分析简历
-            resume_data = await self._analyze_resume_with_ai(text)
-            
-            #关键词
-            keywords = self._extract_keywords(text)
-            
-            resume_data.update({
-                'raw_text': text,
-                'keywords': keywords,
-                'text_length': len(text)
-            })
-            
-            return resume_data
+            return await self._analyze_text(text, job_description, job_title, analysis_mode, on_field, deadline)
             
         except Exception as e:
             raise Exception(f"文件处理失败: {str(e)}")
     
-    async def process_url(self, url: str) -> Dict[str, Any]:
+    async def process_url(self, url: str, job_description: Optional[str] = None, job_title: Optional[str] = None,
+                          analysis_mode: str = ANALYSIS_MODE_TWO_STEP,
+                          deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """处理网页URL"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        html_content = await response.text()
-                        text = self._extract_html_text(html_content)
-                    else:
-                        raise Exception(f"无法访问URL: {response.status}")
-            
-            # 使用AI分析简历
-            resume_data = await self._analyze_resume_with_ai(text)
+            # 共享连接池抓取，网页未变化时由缓存返回（304）
+            with span("url.fetch", {'url': url}):
+                html_content, fetch_info = await url_fetcher.fetch_text(url)
+            with span("extract", {'file.type': '.html'}) as trace_span, track_memory("extract"):
+                text = self._extract_html_text(html_content)
+                trace_span.set_attribute('text.length', len(text))
             
-            # 提取关键词
-            keywords = self._extract_keywords(text)
-            
-            resume_data.update({
-                'raw_text': text,
-                'keywords': keywords,
-                'text_length': len(text),
-                'source_url': url
-            })
+            resume_data = await self._analyze_text(text, job_description, job_title, analysis_mode, deadline=deadline)
+            resume_data['source_url'] = url
+            resume_data['fetch_info'] = fetch_info
             
             return resume_data
             
         except Exception as e:
             raise Exception(f"URL处理失败: {str(e)}")
     
+    async def _analyze_text(self, text: str, job_description: Optional[str], job_title: Optional[str],
+                            analysis_mode: str,
+                            on_field: Optional[Callable[[str, Any], None]] = None,
+                            deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        分析提取出的简历文本，on_field用于流式接收已解析完成的字段
+        剩余时间不足以完成LLM调用时跳过AI解析，只返回基本结构，并记录在skipped_stages中
+        fast模式只用本地规则提取，AI解析和AI评估都记录为跳过
+        """
+        fast = analysis_mode == ANALYSIS_MODE_FAST
+        # 指纹去重：与已分析过的简历近似重复时直接复用之前的分析结果（fast模式本地提取更快，不查找）
+        fingerprint_started = time.perf_counter()
+        fingerprint = simhash(text)
+        resume_id = make_resume_id(text)
+        dedup = DEDUP_ENABLED and not fast
+        # 同一份文本再次上传属于缓存命中，不算作自身的重复
+        cached = resume_store.get(resume_id) if dedup else None
+        duplicate = resume_store.find_near_duplicate(fingerprint) if dedup and cached is None else None
+        registry.observe("dedup.fingerprint_seconds", time.perf_counter() - fingerprint_started)
+        if cached is not None:
+            registry.inc("dedup.cache_hits")
+            cached['raw_text'] = text
+            return cached
+        if duplicate is not None:
+            duplicate_id, distance = duplicate
+            resume_data = resume_store.get(duplicate_id)
+            if resume_data is not None:
+                registry.inc("dedup.hits")
+                # 复用已有的分析结果，但原文和关键词使用本次上传的文本
+                resume_data.update({
+                    'raw_text': text,
+                    'keywords': self._extract_keywords(text),
+                    'text_length': len(text),
+                    'resume_id': resume_id,
+                    'fingerprint': f"{fingerprint:016x}",
+                    'duplicate_of': duplicate_id,
+                    'duplicate_distance': distance
+                })
+                return resume_data
+        
+        # 按token预算分块、去重并按岗位相关度裁剪后再送入LLM（fast模式不需要）
+        prompt_text, prompt_stats = build_prompt_text([text], job_description) if not fast else (None, None)
+        
+        skipped_stages = []
+        if fast:
+            with span("resume.rule_extraction"):
+                resume_data = extract_resume(text)
+            skipped_stages.extend([
+                {'stage': 'ai_resume_analysis', 'reason': "fast模式，使用本地规则提取"},
+                {'stage': 'ai_assessment', 'reason': "fast模式，不调用LLM"}
+            ])
+        elif deadline is not None and not deadline.allows(DEADLINE_MIN_LLM_SECONDS):
+            deadline.skip('ai_resume_analysis', skipped_stages)
+            resume_data = self._create_basic_structure(text)
+            resume_data['analysis_degraded'] = True
+        # 合并模式下一次LLM调用同时返回结构化简历和岗位评估（ai_assessment字段）
+        elif analysis_mode == ANALYSIS_MODE_COMBINED and job_description:
+            with span("resume.ai_analysis", {'analysis_mode': analysis_mode}):
+                resume_data = await self._analyze_and_assess_with_ai(
+                    text, job_description, job_title or '', prompt_text, on_field, deadline
+                )
+        else:
+            with span("resume.ai_analysis", {'analysis_mode': analysis_mode}):
+                resume_data = await self._analyze_resume_with_ai(text, prompt_text, on_field, deadline)
+        if skipped_stages:
+            resume_data['skipped_stages'] = skipped_stages
+        
+        # 提取关键词
+        keywords = self._extract_keywords(text)
+        
+        resume_data.update({
+            'raw_text': text,
+            'keywords': keywords,
+            'text_length': len(text),
+            'prompt_stats': prompt_stats,
+            'resume_id': resume_id,
+            'fingerprint': f"{fingerprint:016x}"
+        })
+        
+        # AI分析降级和fast模式的结果不保存，避免后续重复简历复用不完整的分析
+        if not resume_data.get('analysis_degraded') and not fast:
+            resume_store.put(resume_id, resume_data, fingerprint)
+        
+        return resume_data
+    
+    def _extract_file_text(self, file_path: str, file_extension: str) -> str:
+        """根据文件类型提取文本"""
+        if file_extension == '.pdf':
+            return self._extract_pdf_text(file_path)
+        elif file_extension in ['.docx', '.doc']:
+            return self._extract_word_text(file_path)
+        elif file_extension == '.md':
+            return self._extract_markdown_text(file_path)
+        elif file_extension == '.txt':
+            return self._extract_txt_text(file_path)
+        else:
+            raise ValueError(f"不支持的文件格式: {file_extension}")
+    
     def _extract_pdf_text(self, file_path: str) -> str:
         """提取PDF文本"""
         try:
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-                return text.strip()
+            # 多页文档并行提取，按页面内容哈希缓存
+            return pdf_extractor.extract_text(file_path)
         except Exception as e:
             raise Exception(f"PDF解析失败: {str(e)}")
     
     def _extract_word_text(self, file_path: str) -> str:
         """提取Word文档文本"""
         try:
-            doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
+            # 增量解析document.xml，包含表格和文本框中的文字
+            return docx_to_text(file_path)
         except Exception as e:
             raise Exception(f"Word文档解析失败: {str(e)}")
     
@@ -282,11 +450,8 @@ class ResumeProcessor:
         """提取Markdown文本"""
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
-                md_content = file.read()
-                # 转换为HTML然后提取纯文本
-                html = markdown.markdown(md_content)
-                soup = BeautifulSoup(html, 'html.parser')
-                return soup.get_text()
+                # 直接转换为纯文本，不经过HTML渲染
+                return markdown_to_text(file.read())
         except Exception as e:
             raise Exception(f"Markdown解析失败: {str(e)}")
     
@@ -299,159 +464,110 @@ class ResumeProcessor:
             raise Exception(f"文本文件解析失败: {str(e)}")
     
     def _extract_html_text(self, html_content: str) -> str:
-        """提取HTML文本"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # 移除脚本和样式
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # 获取文本
-        text = soup.get_text()
-        
-        # 清理文本
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        return text
+        """提取HTML文本（流式解析，跳过脚本、样式和导航栏）"""
+        return html_to_text(html_content)
     
-    async def _analyze_resume_with_ai(self, text: str) -> Dict[str, Any]:
-        """使用AI分析简历内容"""
+    async def _analyze_resume_with_ai(self, text: str, prompt_text: Optional[str] = None,
+                                      on_field: Optional[Callable[[str, Any], None]] = None,
+                                      deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """使用AI分析简历内容，prompt_text为按token预算裁剪后的文本"""
         try:
             llm = DoubaoLLM(api_key=self.api_key)
             
-            prompt = f"""
-            请分析以下简历内容，提取关键信息并以JSON格式返回：
-
-            简历内容：
-            {text}
-
-            请提取以下信息（如果没有相关信息，请设置为null）：
-            1. 个人信息：姓名、联系方式、邮箱等
-            2. 教育背景：学校、专业、学历、毕业时间等
-            3. 工作经验：公司、职位、工作时间、职责描述等
-            4. 技能：专业技能、编程语言、工具等
-            5. 项目经验：项目名称、描述、技术栈等
-            6. 证书/奖项：相关认证和获奖情况
-
-            请以以下JSON格式返回：
-            {{
-                "personal_info": {{
-                    "name": "姓名",
-                    "contact": "联系方式",
-                    "email": "邮箱"
-                }},
-                "education": [
-                    {{
-                        "school": "学校名称",
-                        "major": "专业",
-                        "degree": "学历",
-                        "graduation_year": "毕业年份"
-                    }}
-                ],
-                "work_experience": [
-                    {{
-                        "company": "公司名称",
-                        "position": "职位",
-                        "duration": "工作时间",
-                        "description": "工作描述"
-                    }}
-                ],
-                "skills": ["技能1", "技能2", "技能3"],
-                "projects": [
-                    {{
-                        "name": "项目名称",
-                        "description": "项目描述",
-                        "technologies": ["技术1", "技术2"]
-                    }}
-                ],
-                "certificates": ["证书1", "证书2"]
-            }}
-            """
+            prompt = build_resume_prompt(prompt_text or text)
+            
+            result, degraded = await self._run_json_prompt(llm, prompt, on_field, deadline)
             
-            response = llm.complete(prompt)
-            result_text = response.text
+            if degraded:
+                resume_data = self._create_basic_structure(text)
+                resume_data['analysis_degraded'] = True
+                return resume_data
             
-            # 尝试解析JSON
-            try:
-                # 提取JSON部分
-                json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group()
-                    return json.loads(json_str)
-                else:
-                    # 如果没有找到JSON，返回基本结构
-                    return self._create_basic_structure(text)
-            except json.JSONDecodeError:
+            # 如果没有找到JSON，返回基本结构
+            if not isinstance(result, dict):
                 return self._create_basic_structure(text)
+            return result
                 
         except Exception as e:
             print(f"AI分析失败: {e}")
             return self._create_basic_structure(text)
     
-    def _create_basic_structure(self, text: str) -> Dict[str, Any]:
-        """创建基本的简历结构"""
-        return {
-            "personal_info": {
-                "name": self._extract_name(text),
-                "contact": None,
-                "email": self._extract_email(text)
-            },
-            "education": [],
-            "work_experience": [],
-            "skills": self._extract_basic_skills(text),
-            "projects": [],
-            "certificates": []
-        }
+    async def _analyze_and_assess_with_ai(self, text: str, job_description: str, job_title: str,
+                                          prompt_text: Optional[str] = None,
+                                          on_field: Optional[Callable[[str, Any], None]] = None,
+                                          deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """单次AI调用完成简历解析和岗位匹配评估"""
+        try:
+            llm = DoubaoLLM(api_key=self.api_key)
+            prompt = build_combined_prompt(prompt_text or text, job_description, job_title)
+            
+            result, degraded = await self._run_json_prompt(llm, prompt, on_field, deadline)
+            
+            if degraded:
+                resume_data = self._create_basic_structure(text)
+                resume_data['analysis_degraded'] = True
+                return resume_data
+            
+            if not isinstance(result, dict):
+                result = {}
+            
+            resume_data = result.get('resume')
+            if not isinstance(resume_data, dict):
+                resume_data = self._create_basic_structure(text)
+            
+            # 评估结果缺少总分时不返回，由JobMatcher单独调用AI评估
+            assessment = result.get('assessment')
+            if isinstance(assessment, dict) and isinstance(assessment.get('overall_score'), (int, float)):
+                resume_data['ai_assessment'] = assessment
+            
+            return resume_data
+            
+        except Exception as e:
+            print(f"AI合并分析失败: {e}")
+            return self._create_basic_structure(text)
     
-    def _extract_name(self, text: str) -> Optional[str]:
-        """简单的姓名提取"""
-        lines = text.split('\n')
-        for line in lines[:5]:  # 检查前5行
-            line = line.strip()
-            if len(line) > 0 and len(line) < 20 and not '@' in line:
-                return line
-        return None
-    
-    def _extract_email(self, text: str) -> Optional[str]:
-        """提取邮箱"""
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        matches = re.findall(email_pattern, text)
-        return matches[0] if matches else None
-    
-    def _extract_basic_skills(self, text: str) -> list:
-        """提取基本技能关键词"""
-        skill_keywords = [
-            'python', 'java', 'javascript', 'react', 'vue', 'angular', 'node.js',
-            'django', 'flask', 'spring', 'mysql', 'postgresql', 'mongodb',
-            'docker', 'kubernetes', 'aws', 'azure', 'gcp', 'git', 'linux',
-            'machine learning', 'deep learning', 'ai', 'data analysis'
-        ]
-        
-        found_skills = []
-        text_lower = text.lower()
-        for skill in skill_keywords:
-            if skill in text_lower:
-                found_skills.append(skill)
+    async def _run_json_prompt(self, llm: DoubaoLLM, prompt: str,
+                               on_field: Optional[Callable[[str, Any], None]] = None,
+                               deadline: Optional[Deadline] = None):
+        """
+        调用LLM并解析返回的JSON对象，返回 (结果, 是否降级)
+        传入on_field时使用流式输出，每个字段解析完成立即回调；LLM截止时间不超过请求剩余时间
+        """
+        if on_field is None:
+            response = await llm.acomplete(prompt, deadline=remaining_seconds(deadline))
+            if response.additional_kwargs.get('degraded'):
+                return None, True
+            return extract_json_object(response.text), False
         
-        return found_skills
+        parser = IncrementalJSONParser()
+        try:
+            async for chunk in await llm.astream_complete(prompt, deadline=remaining_seconds(deadline)):
+                for path, value in parser.feed(chunk.delta or ''):
+                    on_field(path, value)
+        except LLMCallError as e:
+            print(f"豆包LLM流式调用失败: {e}")
+            return None, True
+        except ValueError:
+            return None, False
+        return parser.result, False
+    
+    def _create_basic_structure(self, text: str) -> Dict[str, Any]:
+        """创建基本的简历结构（本地规则提取，AI解析失败或跳过时使用）"""
+        return extract_resume(text)
     
-    def _extract_keywords(self, text: str) -> list:
+    def _extract_keywords(self, text: str, document: Optional[AnalyzedDocument] = None) -> list:
         """使用TF-IDF提取关键词"""
         try:
-            # 分句
-            sentences = re.split(r'[.!?。！？\n]', text)
-            sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
+            # 分句（复用文档分析中的分词结果，每句为去停用词后的1-2元词）
+            sentences = (document or AnalyzedDocument(text)).sentence_ngrams(min_length=10)
             
             if len(sentences) < 2:
                 return []
             
             # TF-IDF向量化
             vectorizer = TfidfVectorizer(
+                analyzer=lambda ngrams: ngrams,
                 max_features=20,
-                stop_words='english',
-                ngram_range=(1, 2),
                 min_df=1,
                 max_df=0.8
             )
@@ -0,0 +1,106 @@
+import os
+import copy
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from fingerprint import SimHashIndex, NUM_BANDS
+from metrics import registry
+
+# 最多保存的简历分析结果数量（超过后淘汰最久未使用的）
+RESUME_STORE_MAX = int(os.getenv("RESUME_STORE_MAX", "100000"))
+# 判定为近似重复的最大汉明距离（64位SimHash）
+# 指纹分NUM_BANDS段建索引，只有距离不超过NUM_BANDS-1时才保证能查到，更大的配置按上限处理
+DEDUP_MAX_DISTANCE = min(int(os.getenv("DEDUP_MAX_DISTANCE", "3")), NUM_BANDS - 1)
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+
+
+def make_resume_id(text: str) -> str:
+    """根据简历文本生成稳定的ID"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class TextHeap:
+    """大段文本（如raw_text）压缩后集中存放，记录中只保存引用"""
+
+    def __init__(self):
+        self._blobs: List[Optional[bytes]] = []
+        self.nbytes = 0
+
+    def put(self, text: str) -> int:
+        blob = zlib.compress(text.encode('utf-8'), 1)
+        self._blobs.append(blob)
+        self.nbytes += len(blob)
+        return len(self._blobs) - 1
+
+    def get(self, ref: int) -> Optional[str]:
+        blob = self._blobs[ref] if 0 <= ref < len(self._blobs) else None
+        return zlib.decompress(blob).decode('utf-8') if blob is not None else None
+
+    def free(self, ref: int) -> None:
+        blob = self._blobs[ref]
+        if blob is not None:
+            self.nbytes -= len(blob)
+            self._blobs[ref] = None
+
+
+class ResumeStore:
+    """进程内简历分析结果存储，带SimHash近似重复索引"""
+
+    def __init__(self, max_size: int = RESUME_STORE_MAX):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._index = SimHashIndex()
+        # raw_text压缩后单独存放，_items中只保留结构化字段
+        self._texts = TextHeap()
+        self._text_refs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, resume_id: str, resume_data: Dict[str, Any], fingerprint: int) -> None:
+        """保存分析结果（岗位相关的ai_assessment不保存）"""
+        stored = copy.deepcopy({k: v for k, v in resume_data.items() if k not in ('ai_assessment', 'raw_text')})
+        with self._lock:
+            if resume_id in self._text_refs:
+                self._texts.free(self._text_refs.pop(resume_id))
+            self._text_refs[resume_id] = self._texts.put(resume_data.get('raw_text') or '')
+            self._items[resume_id] = stored
+            self._items.move_to_end(resume_id)
+            self._index.add(resume_id, fingerprint)
+            while len(self._items) > self.max_size:
+                evicted_id, _ = self._items.popitem(last=False)
+                self._index.remove(evicted_id)
+                self._texts.free(self._text_refs.pop(evicted_id))
+            registry.set_gauge("resume_store.size", len(self._items))
+            registry.set_gauge("resume_store.text_bytes", self._texts.nbytes)
+
+    def get(self, resume_id: str) -> Optional[Dict[str, Any]]:
+        """按ID取出分析结果的副本"""
+        with self._lock:
+            stored = self._items.get(resume_id)
+            if stored is None:
+                return None
+            self._items.move_to_end(resume_id)
+            raw_text = self._texts.get(self._text_refs[resume_id])
+        resume_data = copy.deepcopy(stored)
+        resume_data['raw_text'] = raw_text
+        return resume_data
+
+    def get_text(self, resume_id: str) -> Optional[str]:
+        """只取出简历原文"""
+        with self._lock:
+            ref = self._text_refs.get(resume_id)
+            return None if ref is None else self._texts.get(ref)
+
+    def find_near_duplicate(self, fingerprint: int,
+                            max_distance: int = DEDUP_MAX_DISTANCE) -> Optional[Tuple[str, int]]:
+        """查找最相近的已存储简历，返回 (简历ID, 汉明距离)"""
+        with self._lock:
+            matches = self._index.query(fingerprint, max_distance)
+        return matches[0] if matches else None
+
+
+resume_store = ResumeStore()
@@ -0,0 +1,340 @@
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from text_analysis import TECH_SKILLS
+
+# 本地规则提取简历结构（不调用LLM）：先按标题切分段落，再在各段内按模式提取
+
+# 段落标题 -> 段落类型（英文标题比较时忽略大小写）
+SECTION_HEADINGS = {
+    'personal': ['个人信息', '基本信息', '基本资料', '联系方式', 'personal information', 'contact', 'contact information'],
+    'education': ['教育背景', '教育经历', '学历背景', '教育', '学历', 'education', 'education background', 'academic background'],
+    'work': ['工作经历', '工作经验', '实习经历', '实习经验', '职业经历', '工作履历', 'work experience', 'experience',
+             'employment', 'employment history', 'professional experience', 'internship', 'internships'],
+    'projects': ['项目经验', '项目经历', '项目', 'projects', 'project experience', 'personal projects'],
+    'skills': ['专业技能', '技能', '技能特长', '个人技能', '技术能力', 'skills', 'technical skills', 'skill set'],
+    'certificates': ['证书', '资格证书', '证书资质', '荣誉证书', '获奖情况', '荣誉奖项', 'certificates', 'certifications',
+                     'awards', 'honors'],
+    'summary': ['自我评价', '个人简介', '个人总结', '求职意向', 'summary', 'profile', 'objective', 'about me'],
+}
+_HEADING_INDEX = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+# 标题行前后的装饰符号和编号
+_HEADING_STRIP = re.compile(r'^[\s#*>■□●○◆◇▶►•·\-=【\[（(一二三四五六七八九十\d.、]+|[\s#*■□●○◆◇:：】\]）)\-=]+$')
+_INLINE_HEADING = re.compile(r'^\s*([^:：]{2,20})[:：]\s*(.+)$')
+
+# 规则提取额外识别的技能（岗位技能词表之外）
+EXTRA_SKILLS = [
+    'c++', 'c#', 'go', 'golang', 'rust', 'typescript', 'php', 'ruby', 'swift', 'kotlin', 'scala', 'matlab',
+    'spring boot', 'mybatis', 'fastapi', 'express', 'next.js', 'jquery', 'webpack', 'flutter', 'react native',
+    'tensorflow', 'pytorch', 'keras', 'scikit-learn', 'pandas', 'numpy', 'opencv', 'nlp', 'llm',
+    'spark', 'hadoop', 'hive', 'flink', 'kafka', 'rabbitmq', 'nginx', 'oracle', 'sql server', 'sqlite',
+    'jenkins', 'gitlab', 'ansible', 'terraform', 'prometheus', 'grafana', 'shell', 'bash', 'tableau',
+    'excel', 'photoshop', 'figma', 'unity', 'office',
+]
+_SKILL_LEXICON = list(dict.fromkeys(TECH_SKILLS + EXTRA_SKILLS))
+_ASCII_SKILL = re.compile(r'^[\x00-\x7f]+$')
+# 英文技能按词边界匹配（避免 email 命中 ai、going 命中 go）
+_SKILL_PATTERNS = [
+    (skill, re.compile(rf'(?<![a-z0-9+#.]){re.escape(skill.lower())}(?![a-z0-9+#])') if _ASCII_SKILL.match(skill) else None)
+    for skill in _SKILL_LEXICON
+]
+_SKILL_PATTERN_INDEX = dict(_SKILL_PATTERNS)
+
+_MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+_DATE = rf'(?:(?:{"|".join(_MONTHS)})[a-z]*\.?\s*)?(?:19|20)\d{{2}}(?:\s*[年./\-]\s*\d{{1,2}}\s*月?)?'
+_DATE_RANGE = re.compile(
+    rf'({_DATE})\s*(?:-|–|—|~|～|至|到|to)\s*({_DATE}|至今|现在|今|present|now|current)', re.IGNORECASE
+)
+_YEAR_MONTH = re.compile(rf'(?:({"|".join(_MONTHS)})[a-z]*\.?\s*)?((?:19|20)\d{{2}})(?:\s*[年./\-]\s*(\d{{1,2}}))?', re.IGNORECASE)
+_YEAR = re.compile(r'(?:19|20)\d{2}')
+
+_EMAIL = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+_PHONE = re.compile(r'(?<!\d)(?:\+?86[\s-]?)?1[3-9]\d[\s-]?\d{4}[\s-]?\d{4}(?!\d)|\+\d{1,3}[\s-]?\d{2,4}[\s-]?\d{3,4}[\s-]?\d{3,4}')
+_NAME_LABEL = re.compile(r'(?:姓\s*名|name)\s*[:：]\s*([一-龥·]{2,8}|[A-Za-z][A-Za-z .\'-]{1,40})', re.IGNORECASE)
+_CHINESE_NAME = re.compile(r'^[一-龥·]{2,5}$')
+_ENGLISH_NAME = re.compile(r'^[A-Z][a-z]+(?: [A-Z][a-z]+){1,2}$')
+
+_SCHOOL = re.compile(
+    r'[一-龥A-Za-z]{2,20}(?:大学|学院|学校|中学)(?:[一-龥]{0,6}(?:分校|校区))?'
+    r'|(?:[A-Z][\w&.\'-]*\s+){0,5}(?:University|College|Institute|School)(?:\s+of(?:\s+[A-Z][\w&.\'-]*){1,4})?'
+)
+# 学历关键词 -> 输出的学历（与JobMatcher的学历等级匹配）
+_DEGREES = [
+    (re.compile(r'博士|ph\.?\s?d|doctor', re.IGNORECASE), '博士'),
+    (re.compile(r'硕士|研究生|master|mba|m\.s\.|m\.eng|msc', re.IGNORECASE), '硕士'),
+    (re.compile(r'本科|学士|bachelor|b\.s\.|b\.eng|b\.a\.|bsc', re.IGNORECASE), '本科'),
+    (re.compile(r'大专|专科|associate', re.IGNORECASE), '大专'),
+]
+_COMPANY = re.compile(
+    r'公司|集团|科技|有限|银行|研究院|研究所|工作室|事务所|医院'
+    r'|\b(?:inc|ltd|llc|corp|corporation|company|co\.|group|technologies|technology|labs?)\b', re.IGNORECASE
+)
+_POSITION = re.compile(
+    r'工程师|开发|程序员|经理|总监|主管|专员|助理|实习生?|设计师|分析师|架构师|负责人|组长|顾问|运营|产品|测试|研究员|算法'
+    r'|\b(?:engineer|developer|manager|intern|analyst|lead|director|designer|consultant|architect|scientist'
+    r'|researcher|specialist|administrator)\b', re.IGNORECASE
+)
+# 字段分隔：标点、制表符、连续空格，以及中文前后的空格（英文词组内的空格保留）
+_FIELD_SEPARATOR = re.compile(r'\s*[|｜/,，、;；\t]\s*|\s{2,}|(?<=[一-龥])\s+|\s+(?=[一-龥])')
+_LIST_SEPARATOR = re.compile(r'[,，、;；|｜/\n]')
+_BULLET = re.compile(r'^\s*(?:[-*•·●○◆■▪]|\d+[.、)）])\s*')
+_SENTENCE_END = re.compile(r'[。；;.!！?？]$')
+# 以动词开头的行是描述而不是项目名
+_DESCRIPTION_START = re.compile(
+    r'^(?:负责|参与|使用|采用|实现|完成|主导|协助|通过|基于|开发|设计|优化|搭建'
+    r'|developed|built|implemented|designed|led|responsible|used|worked|created)', re.IGNORECASE
+)
+_MAJOR_PREFIX = re.compile(r'^(?:in|of|major(?:\s+in)?|专业[:：]?)\s*', re.IGNORECASE)
+
+
+def _heading(line: str) -> Optional[Tuple[str, str]]:
+    """判断是否为段落标题行，返回 (段落类型, 同一行标题后的内容)"""
+    stripped = _HEADING_STRIP.sub('', line).strip()
+    section = _HEADING_INDEX.get(stripped.lower())
+    if section is not None and len(stripped) <= 30:
+        return section, ''
+    match = _INLINE_HEADING.match(line)
+    if match:
+        section = _HEADING_INDEX.get(_HEADING_STRIP.sub('', match.group(1)).strip().lower())
+        if section is not None:
+            return section, match.group(2).strip()
+    return None
+
+
+def segment_sections(text: str) -> Dict[str, List[str]]:
+    """按标题切分段落：返回 段落类型 -> 行列表，第一个标题之前的内容归入header"""
+    sections: Dict[str, List[str]] = {'header': []}
+    current = 'header'
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        heading = _heading(line)
+        if heading is not None:
+            current, rest = heading
+            sections.setdefault(current, [])
+            if rest:
+                sections[current].append(rest)
+            continue
+        sections[current].append(line)
+    return sections
+
+
+def _parse_date(value: str) -> Optional[Tuple[int, int]]:
+    match = _YEAR_MONTH.search(value)
+    if not match:
+        return None
+    if match.group(1):
+        month = _MONTHS.index(match.group(1).lower()) + 1
+    else:
+        month = int(match.group(3)) if match.group(3) else 1
+    return int(match.group(2)), min(max(month, 1), 12)
+
+
+def parse_date_range(line: str, current: Optional[Tuple[int, int]] = None) -> Optional[Dict[str, Any]]:
+    """解析行内的时间段，返回原文、起止年月和年数（至今按current计算）"""
+    match = _DATE_RANGE.search(line)
+    if not match:
+        return None
+    start = _parse_date(match.group(1))
+    end = _parse_date(match.group(2))
+    if end is None and current is not None:
+        end = current
+    result = {'duration': match.group(0).strip(), 'start': f"{start[0]}-{start[1]:02d}", 'end': None, 'years': None}
+    if end is not None:
+        result['end'] = f"{end[0]}-{end[1]:02d}"
+        months = (end[0] - start[0]) * 12 + end[1] - start[1]
+        result['years'] = round(max(months, 0) / 12, 1)
+    return result
+
+
+def _remove(line: str, *parts: Optional[str]) -> str:
+    for part in parts:
+        if part:
+            line = line.replace(part, ' ')
+    return line
+
+
+def _fields(line: str) -> List[str]:
+    """按分隔符拆分一行中的字段，去掉空白和括号"""
+    return [field.strip(' ()（）[]【】-–—:：') for field in _FIELD_SEPARATOR.split(line) if field.strip(' ()（）[]【】-–—:：')]
+
+
+def _mentions(text: str, skill: str) -> bool:
+    """文本中是否出现该技能，英文技能按词边界判断（django中不包含go）"""
+    pattern = _SKILL_PATTERN_INDEX.get(skill)
+    if pattern is None:
+        return skill.lower() in text.lower()
+    return pattern.search(text.lower()) is not None
+
+
+def _degree(text: str) -> Optional[Tuple[str, str]]:
+    for pattern, degree in _DEGREES:
+        match = pattern.search(text)
+        if match:
+            return degree, match.group(0)
+    return None
+
+
+def extract_education(lines: List[str]) -> List[Dict[str, Any]]:
+    """含学校名的行开始一条教育经历，之后不含学校名的行补充专业、学历和毕业年份"""
+    entries: List[Dict[str, Any]] = []
+    for line in lines:
+        school = _SCHOOL.search(line)
+        if school is None and not entries:
+            continue
+        if school is not None:
+            entries.append({'school': school.group(0).strip(), 'major': '', 'degree': '', 'graduation_year': ''})
+        entry = entries[-1]
+        rest = _remove(line, school.group(0) if school else None)
+        date_range = _DATE_RANGE.search(rest)
+        years = _YEAR.findall(date_range.group(2) if date_range else rest)
+        if years and not entry['graduation_year']:
+            entry['graduation_year'] = years[-1]
+        rest = _remove(rest, date_range.group(0) if date_range else None)
+        degree = _degree(rest)
+        if degree is not None and not entry['degree']:
+            entry['degree'] = degree[0]
+            rest = _remove(rest, degree[1])
+        if not entry['major']:
+            candidates = [
+                field for field in _fields(_YEAR.sub(' ', rest))
+                if 2 <= len(field) <= 30 and not _SENTENCE_END.search(field) and not re.search(r'gpa|排名|绩点', field, re.IGNORECASE)
+            ]
+            if candidates:
+                entry['major'] = _MAJOR_PREFIX.sub('', re.sub(r'专业$', '', candidates[0]))
+    return entries
+
+
+def extract_work_experience(lines: List[str], current: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+    """带时间段或公司名的非列表行开始一条工作经历，其余行作为工作描述"""
+    entries: List[Dict[str, Any]] = []
+    for line in lines:
+        date_range = parse_date_range(line, current)
+        is_bullet = bool(_BULLET.match(line))
+        company_line = not is_bullet and len(line) <= 60 and _COMPANY.search(line) and not _SENTENCE_END.search(line)
+        if date_range is None and not company_line:
+            if entries:
+                description = _BULLET.sub('', line)
+                entries[-1]['description'] = f"{entries[-1]['description']} {description}".strip()
+            continue
+        rest = _remove(line, date_range['duration'] if date_range else None)
+        fields = _fields(rest)
+        if date_range is not None and entries and not entries[-1]['duration'] and not _COMPANY.search(rest):
+            # 公司名单独成行时，下一行的时间（和职位）属于同一段经历
+            entries[-1].update(date_range)
+            if fields and not entries[-1]['position']:
+                entries[-1]['position'] = ' '.join(fields)
+            continue
+        company = next((field for field in fields if _COMPANY.search(field)), fields[0] if fields else '')
+        position = next((field for field in fields if field != company and _POSITION.search(field)), '')
+        if not position:
+            position = next((field for field in fields if field != company), '')
+        entry = {'company': company, 'position': position, 'duration': '', 'start': None, 'end': None,
+                 'years': None, 'description': ''}
+        if date_range is not None:
+            entry.update(date_range)
+        entries.append(entry)
+    return entries
+
+
+def extract_projects(lines: List[str], current: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+    """短标题行（或“项目名：描述”）开始一个项目，其余行为项目描述，技术栈为描述中出现的技能"""
+    projects: List[Dict[str, Any]] = []
+    for line in lines:
+        is_bullet = bool(_BULLET.match(line))
+        date_range = parse_date_range(line, current)
+        rest = _remove(line, date_range['duration'] if date_range else None)
+        # 去掉时间后留下的空括号
+        rest = re.sub(r'[（(\[【]\s*[)）\]】]', '', rest).strip(' |｜-–—')
+        name, description = None, ''
+        match = _INLINE_HEADING.match(rest)
+        if not is_bullet and match and len(match.group(1)) <= 30:
+            name, description = match.group(1).strip(), match.group(2).strip()
+        elif not is_bullet and rest and len(rest) <= 30 and not _SENTENCE_END.search(rest) \
+                and not _DESCRIPTION_START.match(rest):
+            name = rest
+        elif date_range is not None and not rest and projects:
+            projects[-1]['duration'] = date_range['duration']
+            continue
+        if name is None:
+            if projects:
+                text = _BULLET.sub('', line)
+                projects[-1]['description'] = f"{projects[-1]['description']} {text}".strip()
+            continue
+        projects.append({'name': name, 'description': description,
+                         'duration': date_range['duration'] if date_range else '', 'technologies': []})
+    for project in projects:
+        project['technologies'] = extract_skills(f"{project['name']} {project['description']}")
+    return projects
+
+
+def extract_skills(text: str, skill_lines: Optional[List[str]] = None) -> List[str]:
+    """技能词表中在文本里出现的技能（按出现顺序），加上技能段落中列出的其他条目"""
+    lowered = text.lower()
+    found = []
+    for skill, pattern in _SKILL_PATTERNS:
+        if pattern is None:
+            position = lowered.find(skill.lower())
+        else:
+            match = pattern.search(lowered)
+            position = match.start() if match else -1
+        if position >= 0:
+            found.append((position, skill))
+    skills = [skill for _, skill in sorted(found)]
+    # 词表命中的技能中，去掉被更长技能包含的（如 testing 与 unit testing）
+    skills = [skill for skill in skills if not any(skill != other and _mentions(other, skill) for other in skills)]
+    seen = {skill.lower() for skill in skills}
+    for line in skill_lines or []:
+        for item in _LIST_SEPARATOR.split(_BULLET.sub('', line)):
+            item = re.sub(r'^(?:熟悉|掌握|精通|了解|熟练(?:掌握|使用)?|proficient in|familiar with)\s*', '', item.strip(' .。:：'),
+                          flags=re.IGNORECASE)
+            if 1 < len(item) <= 30 and not _SENTENCE_END.search(item) and item.lower() not in seen:
+                seen.add(item.lower())
+                skills.append(item)
+    return skills
+
+
+def extract_personal_info(sections: Dict[str, List[str]], text: str) -> Dict[str, Optional[str]]:
+    """姓名优先取“姓名：”标注，否则取开头几行中像姓名的短行"""
+    name = None
+    labeled = _NAME_LABEL.search(text)
+    if labeled:
+        name = labeled.group(1).strip()
+    else:
+        for line in (sections.get('header') or []) + (sections.get('personal') or []):
+            if re.search(r'[:：@\d]', line):
+                continue
+            candidate = _fields(line)[0] if _fields(line) else ''
+            if _CHINESE_NAME.match(candidate) or _ENGLISH_NAME.match(candidate):
+                name = candidate
+                break
+    email = _EMAIL.search(text)
+    phone = _PHONE.search(text)
+    return {
+        'name': name,
+        'contact': phone.group(0).strip() if phone else None,
+        'email': email.group(0) if email else None
+    }
+
+
+def extract_resume(text: str, current: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    """
+    规则提取简历结构，字段与LLM解析结果一致（RESUME_JSON_SCHEMA）
+    current为“至今”对应的年月，用于计算工作年数，默认为当前年月
+    """
+    if current is None:
+        today = time.localtime()
+        current = (today.tm_year, today.tm_mon)
+    sections = segment_sections(text)
+    certificates = []
+    for line in sections.get('certificates', []):
+        certificates.extend(item.strip() for item in _LIST_SEPARATOR.split(_BULLET.sub('', line)) if item.strip())
+    return {
+        'personal_info': extract_personal_info(sections, text),
+        'education': extract_education(sections.get('education', [])),
+        'work_experience': extract_work_experience(sections.get('work', []), current),
+        'skills': extract_skills(text, sections.get('skills')),
+        'projects': extract_projects(sections.get('projects', []), current),
+        'certificates': certificates
+    }
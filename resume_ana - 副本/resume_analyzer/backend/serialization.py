@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import zlib
+from typing import Any, Optional
+import numpy as np
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from metrics import registry
+from tracing import span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 响应体小于该字节数时不压缩
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+
+def _default(obj: Any) -> Any:
+    """标准JSON不支持的类型：numpy标量/数组、集合"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def dumps_json(content: Any) -> bytes:
+    """序列化为UTF-8 JSON：优先使用orjson，未安装时退回标准库"""
+    with span("serialize") as trace_span:
+        if orjson is not None:
+            body = orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        else:
+            body = json.dumps(content, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+        trace_span.set_attribute('bytes', len(body))
+    return body
+
+
+class FastJSONResponse(JSONResponse):
+    """使用dumps_json序列化的JSON响应，并记录序列化耗时和大小"""
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        body = dumps_json(content)
+        registry.observe("response.serialize_seconds", time.perf_counter() - started)
+        registry.observe("response.bytes", len(body))
+        return body
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    """按Accept-Encoding协商压缩方式：客户端支持且已安装brotli时用br，否则gzip"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get('*', 0.0)
+    if brotli is not None and accepted.get('br', wildcard) > 0:
+        return 'br'
+    if accepted.get('gzip', wildcard) > 0:
+        return 'gzip'
+    return None
+
+
+class _Encoder:
+    """增量压缩：流式响应每个分块压缩后立即刷出，客户端可以边收边解压"""
+
+    def __init__(self, encoding: str):
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self.encoding = encoding
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, chunk: bytes = b'') -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.finish()
+        return self._compressor.compress(chunk) + self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    按Accept-Encoding对响应进行br/gzip压缩（ASGI中间件）
+    小于minimum_size的完整响应和已设置Content-Encoding的响应原样返回
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                # 第一个分块：决定是否压缩并改写响应头
+                headers = MutableHeaders(raw=start_message["headers"])
+                if "content-encoding" in headers or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+                encoder = _Encoder(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                del headers["Content-Length"]
+                registry.inc(f"response.compressed.{encoding}")
+
+            compressed = encoder.compress(body) if more_body else encoder.finish(body)
+            registry.inc("response.bytes_uncompressed", len(body))
+            registry.inc("response.bytes_compressed", len(compressed))
+            if start_message is not None:
+                if not more_body:
+                    MutableHeaders(raw=start_message["headers"])["Content-Length"] = str(len(compressed))
+                await send(start_message)
+                start_message = None
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,63 @@
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from deadline import Deadline
+from metrics import registry
+
+# 合并进行中的相同请求（同一文件、同一岗位、同一分析模式）
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "1") == "1"
+# 截止时间落在同一区间（秒）内的请求才合并，等待者不会受限于截止时间早得多的首个请求
+SINGLE_FLIGHT_DEADLINE_BUCKET = float(os.getenv("SINGLE_FLIGHT_DEADLINE_BUCKET", "5"))
+
+
+def deadline_bucket(deadline: Deadline, width: float = SINGLE_FLIGHT_DEADLINE_BUCKET) -> int:
+    """截止时间所在的区间，作为合并键的一部分：共享任务按首个请求的时间预算执行"""
+    return int(deadline.expires_at // width)
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    进行中请求合并：相同键的并发调用只执行一次，后来的调用等待第一次调用的结果（或异常）
+    等待者被取消时不影响其他等待者，所有等待者都取消后才取消执行中的任务
+    返回的结果由所有等待者共享，调用方不能修改
+    """
+
+    def __init__(self, name: str, enabled: bool = SINGLE_FLIGHT_ENABLED):
+        self.name = name
+        self.enabled = enabled
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await factory()
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            registry.inc(f"single_flight.{self.name}.saved_executions")
+        call.waiters += 1
+        try:
+            # shield：单个等待者被取消时不取消共享的任务
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # 没有人再等待结果，取消任务并让之后的相同请求重新执行
+                self._forget(key, call)
+                call.task.cancel()
+                registry.inc(f"single_flight.{self.name}.cancelled")
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
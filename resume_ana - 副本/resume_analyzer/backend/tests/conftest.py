@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import pytest
+
+# 后端模块为平铺结构，测试直接按模块名导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 处理器初始化时要求设置密钥，测试中不会真正调用接口
+os.environ.setdefault("DOUBAO_API_KEY", "test")
+
+# 提供 aiohttp_server 等fixture，并直接运行 async def 测试
+pytest_plugins = ["aiohttp.pytest_plugin"]
+
+RESUME_TEXT = """张三
+邮箱: zhangsan@example.com
+教育背景
+清华大学 计算机科学 本科 2016-2020
+工作经历
+字节跳动 后端工程师 2020.07-2023.06
+负责Python Django服务开发，使用MySQL和Redis。
+技能
+Python, Django, MySQL, Redis, Docker
+"""
+JOB_DESCRIPTION = "招聘后端工程师，要求本科及以上，熟悉Python、Django、MySQL、Redis和Docker。"
+
+
+class FakeLLM:
+    """替换豆包对话接口：按提示词类型返回固定的简历解析、岗位评估或合并结果，并记录提示词"""
+
+    def __init__(self):
+        self.calls = []
+        self.resume = {
+            "personal_info": {"name": "张三", "contact": None, "email": "zhangsan@example.com"},
+            "education": [{"school": "清华大学", "major": "计算机科学", "degree": "本科", "graduation_year": "2020"}],
+            "work_experience": [{"company": "字节跳动", "position": "后端工程师", "duration": "2020-2023",
+                                 "description": "Python Django MySQL Redis 开发"}],
+            "skills": ["Python", "Django", "MySQL", "Redis"],
+            "projects": [],
+            "certificates": []
+        }
+        self.assessment = {
+            "technical_skills": 0.8, "work_experience": 0.7, "project_experience": 0.6, "learning_potential": 0.8,
+            "overall_score": 0.75, "strengths": ["后端经验"], "weaknesses": ["缺少容器经验"], "summary": "匹配"
+        }
+
+    def content(self, prompt: str) -> str:
+        if '"resume":' in prompt:
+            return json.dumps({"resume": self.resume, "assessment": self.assessment}, ensure_ascii=False)
+        if '请评估' in prompt:
+            return json.dumps(self.assessment, ensure_ascii=False)
+        return json.dumps(self.resume, ensure_ascii=False)
+
+    def post_json(self, url, headers, payload, deadline=None):
+        prompt = payload["messages"][-1]["content"]
+        self.calls.append(prompt)
+        return {"choices": [{"message": {"content": self.content(prompt)}}],
+                "usage": {"prompt_tokens": len(prompt) // 2, "completion_tokens": 100}}
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    import llm_client
+    llm = FakeLLM()
+    monkeypatch.setattr(llm_client.doubao_chat_client, "post_json", llm.post_json)
+    return llm
+
+
+@pytest.fixture
+def resume_file(tmp_path):
+    path = tmp_path / "resume.txt"
+    path.write_text(RESUME_TEXT, encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def fresh_resume_store(monkeypatch):
+    """每个测试使用独立的简历存储，避免近似重复命中其他测试的分析结果"""
+    from resume_store import ResumeStore
+    store = ResumeStore()
+    for module in ("resume_processor", "candidate_store", "main"):
+        if module in sys.modules:
+            monkeypatch.setattr(sys.modules[module], "resume_store", store)
+    return store
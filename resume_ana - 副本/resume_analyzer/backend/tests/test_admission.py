@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from admission import AdmissionController, AdmissionRejected, Lane, LANE_BATCH, LANE_INTERACTIVE
+
+
+def controller(max_concurrency=2, batch_concurrency=1, interactive_queue=1, batch_queue=4):
+    return AdmissionController(max_concurrency, [
+        Lane(LANE_INTERACTIVE, max_concurrency, interactive_queue, priority=0),
+        Lane(LANE_BATCH, batch_concurrency, batch_queue, priority=1),
+    ])
+
+
+async def test_batch_lane_leaves_room_for_interactive_requests():
+    admission = controller()
+    await admission.acquire(LANE_BATCH)
+    waiting_batch = asyncio.ensure_future(admission.acquire(LANE_BATCH, timeout=1))
+    await asyncio.sleep(0)
+    assert not waiting_batch.done()
+    # 批量任务达到自身上限后，剩余名额仍可分给交互请求
+    await asyncio.wait_for(admission.acquire(LANE_INTERACTIVE), 0.1)
+    assert admission.active == 2
+    admission.release(LANE_BATCH)
+    await asyncio.wait_for(waiting_batch, 0.1)
+    assert admission.lanes[LANE_BATCH].active == 1
+
+
+async def test_free_slot_goes_to_interactive_before_batch():
+    admission = controller(max_concurrency=1, batch_concurrency=1)
+    await admission.acquire(LANE_INTERACTIVE)
+    order = []
+
+    async def wait(lane_name):
+        await admission.acquire(lane_name, timeout=1)
+        order.append(lane_name)
+
+    batch = asyncio.ensure_future(wait(LANE_BATCH))
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(wait(LANE_INTERACTIVE))
+    await asyncio.sleep(0)
+    admission.release(LANE_INTERACTIVE)
+    await interactive
+    assert order == [LANE_INTERACTIVE] and not batch.done()
+    admission.release(LANE_INTERACTIVE)
+    await batch
+    assert order == [LANE_INTERACTIVE, LANE_BATCH]
+
+
+async def test_full_queue_is_rejected_with_retry_after():
+    admission = controller(max_concurrency=1, interactive_queue=1)
+    await admission.acquire(LANE_INTERACTIVE)
+    queued = asyncio.ensure_future(admission.acquire(LANE_INTERACTIVE, timeout=1))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected, match="排队已满") as error:
+        await admission.acquire(LANE_INTERACTIVE)
+    assert 1 <= error.value.retry_after <= 60
+    # 批量任务的整批文件不受排队上限限制
+    unlimited = asyncio.ensure_future(admission.acquire(LANE_INTERACTIVE, timeout=1, enforce_queue_limit=False))
+    await asyncio.sleep(0)
+    assert len(admission.lanes[LANE_INTERACTIVE].waiters) == 2
+    queued.cancel()
+    unlimited.cancel()
+    await asyncio.gather(queued, unlimited, return_exceptions=True)
+    assert not admission.lanes[LANE_INTERACTIVE].waiters
+
+
+async def test_queue_timeout_and_cancellation_leave_no_waiters():
+    admission = controller(max_concurrency=1)
+    await admission.acquire(LANE_INTERACTIVE)
+    with pytest.raises(AdmissionRejected, match="排队超时"):
+        await admission.acquire(LANE_INTERACTIVE, timeout=0.01)
+    waiting = asyncio.ensure_future(admission.acquire(LANE_INTERACTIVE, timeout=1))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert not admission.lanes[LANE_INTERACTIVE].waiters
+    admission.release(LANE_INTERACTIVE)
+    assert admission.active == 0
+
+
+async def test_admit_releases_slot_on_error_and_tracks_duration():
+    admission = controller()
+    with pytest.raises(RuntimeError):
+        async with admission.admit(LANE_BATCH):
+            assert admission.lanes[LANE_BATCH].active == 1
+            raise RuntimeError("boom")
+    assert admission.active == 0 and admission.lanes[LANE_BATCH].active == 0
+    assert admission.lanes[LANE_BATCH].avg_seconds < 5.0
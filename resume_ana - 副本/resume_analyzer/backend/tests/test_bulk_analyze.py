@@ -0,0 +1,101 @@
+import json
+import pytest
+from bulk_analyze import BulkAnalyzer, Checkpoint, JSONLWriter, ParquetWriter, ResumeSource, PARQUET_SCHEMA
+
+JOBS = [{"title": "后端", "description": "Python"}, {"title": "算法", "description": "机器学习"}]
+
+
+def record(source, job_title, status="success", score=0.5):
+    if status == "error":
+        return {"source": source, "job_title": job_title, "status": "error", "error": "失败"}
+    return {"source": source, "job_title": job_title, "status": "success",
+            "resume_data": {"resume_id": source}, "match_result": {"overall_match_score": score}}
+
+
+def analyzer(calls, failing=()):
+    bulk = BulkAnalyzer(JOBS)
+
+    async def analyze(source, jobs=None):
+        jobs = JOBS if jobs is None else jobs
+        calls.append((source.key, [job["title"] for job in jobs]))
+        records = [record(source.key, job["title"], "error" if job["title"] in failing else "success")
+                   for job in jobs]
+        return ("error" if any(item["status"] == "error" for item in records) else "success"), records
+
+    bulk.analyze = analyze
+    return bulk
+
+
+def sources(*keys):
+    return [ResumeSource(key, ".txt", path=key) for key in keys]
+
+
+async def run(tmp_path, bulk, retry_errors=False):
+    writer = JSONLWriter(str(tmp_path / "out.jsonl"))
+    checkpoint = Checkpoint(str(tmp_path / "out.checkpoint"))
+    try:
+        await bulk.run(sources("a", "b"), writer, checkpoint, retry_errors)
+    finally:
+        checkpoint.close()
+    return checkpoint.done
+
+
+def output_keys(tmp_path):
+    with open(tmp_path / "out.jsonl", encoding="utf-8") as file:
+        return [(item["source"], item["job_title"], item["status"]) for item in map(json.loads, file)]
+
+
+async def test_records_written_before_checkpoint_are_not_duplicated(tmp_path):
+    # 上次写完a的输出后、记录检查点前中断
+    writer = JSONLWriter(str(tmp_path / "out.jsonl"))
+    writer.write("a", "success", [record("a", "后端"), record("a", "算法")])
+    writer.close()
+
+    calls = []
+    done = await run(tmp_path, analyzer(calls))
+    assert calls == [("b", ["后端", "算法"])]
+    assert done == {"a": "success", "b": "success"}
+    assert sorted(output_keys(tmp_path)) == [
+        ("a", "后端", "success"), ("a", "算法", "success"), ("b", "后端", "success"), ("b", "算法", "success")
+    ]
+
+
+async def test_retry_errors_only_reruns_failed_jobs(tmp_path):
+    calls = []
+    done = await run(tmp_path, analyzer(calls, failing={"算法"}))
+    assert done == {"a": "error", "b": "error"}
+
+    calls = []
+    done = await run(tmp_path, analyzer(calls), retry_errors=True)
+    assert calls == [("a", ["算法"]), ("b", ["算法"])]
+    assert done == {"a": "success", "b": "success"}
+    assert output_keys(tmp_path).count(("a", "后端", "success")) == 1
+
+    calls = []
+    await run(tmp_path, analyzer(calls), retry_errors=True)
+    assert calls == []
+
+
+async def test_skipped_failed_job_keeps_file_failed(tmp_path):
+    writer = JSONLWriter(str(tmp_path / "out.jsonl"))
+    writer.write("a", "error", [record("a", "算法", "error")])
+    writer.close()
+    calls = []
+    done = await run(tmp_path, analyzer(calls))
+    assert calls[0] == ("a", ["后端"])
+    assert done["a"] == "error"
+
+
+def test_parquet_parts_share_schema_and_existing_records_are_loaded(tmp_path):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    directory = tmp_path / "parquet"
+    writer = ParquetWriter(str(directory), rows_per_part=1)
+    # 第一个分片只有失败记录，所有得分列都为空
+    assert writer.write("a", "error", [record("a", "后端", "error")]) == [("a", "error")]
+    assert writer.write("b", "success", [record("b", "后端", score="0.8")]) == [("b", "success")]
+    assert writer.close() == []
+
+    table = pyarrow_parquet.read_table(str(directory))
+    assert table.schema.equals(PARQUET_SCHEMA)
+    assert table.column("overall_match_score").to_pylist() == [None, 0.8]
+    assert ParquetWriter(str(directory)).existing == {("a", "后端"): "error", ("b", "后端"): "success"}
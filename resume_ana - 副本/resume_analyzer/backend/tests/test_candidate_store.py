@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from candidate_store import CandidateStore, FEATURE_NAMES
+
+
+def add(store, resume_id, overall, skills=(), job_id="job", **scores):
+    resume_data = {"resume_id": resume_id, "skills": list(skills), "personal_info": {"name": resume_id.upper()}}
+    store.upsert(job_id, "后端工程师", resume_data, overall, scores,
+                 {"matched_skills": list(skills), "missing_skills": []}, {"total_years": 3}, {"degree_match": True})
+
+
+def weights(**values):
+    return np.array([values.get(name, 0.0) for name in FEATURE_NAMES], dtype=np.float64)
+
+
+@pytest.fixture
+def store():
+    store = CandidateStore()
+    add(store, "a", 0.9, ["Python"], skill_match=0.9, experience_match=0.2)
+    add(store, "b", 0.5, ["Java"], skill_match=0.3, experience_match=0.8)
+    add(store, "c", 0.7, ["Python", "Go"], skill_match=0.6, experience_match=0.6, ai_score=1.0)
+    return store
+
+
+def test_rank_with_weights_reorders_by_new_weights(store):
+    assert [item["resume_id"] for item in store.rank_with_weights("job", weights(skill_match=1.0))] == ["a", "c", "b"]
+    ranking = store.rank_with_weights("job", weights(experience_match=1.0))
+    assert [item["resume_id"] for item in ranking] == ["b", "c", "a"]
+    assert ranking[0] == {"rank": 1, "resume_id": "b", "name": "B", "score": pytest.approx(0.8)}
+
+
+def test_rank_with_weights_renormalizes_missing_scores(store):
+    # 只有c有AI评分，其余候选人按剩余维度重新归一化，而不是把缺失的AI评分当作0
+    ranking = store.rank_with_weights("job", weights(skill_match=0.5, ai_score=0.5))
+    assert {item["resume_id"]: item["score"] for item in ranking} == pytest.approx({"a": 0.9, "b": 0.3, "c": 0.8})
+
+
+def test_rank_with_weights_top_k_and_unknown_job(store):
+    assert [item["resume_id"] for item in store.rank_with_weights("job", weights(skill_match=1.0), 1)] == ["a"]
+    assert store.rank_with_weights("other", weights(skill_match=1.0)) is None
+
+
+def test_query_filters_by_skill_and_score(store):
+    assert [item["resume_id"] for item in store.query("job", skills=["python"])] == ["a", "c"]
+    assert [item["resume_id"] for item in store.query("job", min_score=0.6, sort_by="experience_match")] == ["c", "a"]
+    assert store.query("job", skills=["rust"]) == []
+
+
+def test_rerank_endpoint(store, monkeypatch):
+    import main
+    monkeypatch.setattr(main, "candidate_store", store)
+    client = TestClient(main.app)
+
+    response = client.post("/jobs/job/rerank", json={"weights": {name: 0.0 for name in FEATURE_NAMES} | {"experience_match": 1.0}})
+    assert response.status_code == 200
+    assert [item["resume_id"] for item in response.json()["results"]] == ["b", "c", "a"]
+    assert response.json()["total_candidates"] == 3
+
+    assert client.post("/jobs/job/rerank", json={"weights": {"unknown": 1.0}}).status_code == 400
+    assert client.post("/jobs/job/rerank", json={"weights": {"skill_match": -1.0}}).status_code == 400
+    assert client.post("/jobs/missing/rerank", json={"weights": {}}).status_code == 404
+
+
+def test_per_job_limit_evicts_least_recently_updated():
+    store = CandidateStore(max_per_job=3)
+    for resume_id in "abc":
+        add(store, resume_id, 0.5)
+    add(store, "a", 0.6)
+    add(store, "d", 0.5)
+    add(store, "x", 0.5, job_id="other")
+    assert store.count("job") == 3
+    assert {item["resume_id"] for item in store.query("job")} == {"a", "c", "d"}
+    assert store.count("other") == 1
+
+
+def test_global_limit_releases_rows_and_ids():
+    store = CandidateStore(capacity=4, max_rows=4)
+    for i in range(50):
+        add(store, f"r{i}", 0.5, ["python"], job_id=f"job{i % 7}")
+    assert len(store) == 4
+    assert len(store._rows) == 8
+    assert len(store._resumes) == 4
+    assert len(store._jobs) == 4
+    assert not store.has_job("job1")
+    assert store.query("job6") and store.query("job6")[0]["resume_id"] == "r48"
+
+
+def test_reupsert_reuses_skill_slice_and_compacts(monkeypatch):
+    monkeypatch.setattr("candidate_store.SKILL_COMPACT_MIN", 8)
+    store = CandidateStore()
+    add(store, "a", 0.5, ["python", "go", "java"])
+    add(store, "a", 0.5, ["rust"])
+    assert store._skill_size == 3
+    assert store.query("job")[0]["skills"] == ["rust"]
+
+    for i in range(20):
+        add(store, "a", 0.5, [f"skill{j}" for j in range(i % 4 + 1)])
+        add(store, "b", 0.5, ["python"] * (i % 2) + ["go"])
+    assert store._skill_size <= 2 * 8 + 8
+    assert {item["resume_id"]: len(item["skills"]) for item in store.query("job")} == {"a": 4, "b": 2}
+    assert [item["resume_id"] for item in store.query("job", skills=["go"])] == ["b"]
+
+
+def test_text_is_read_from_resume_store(fresh_resume_store):
+    store = CandidateStore()
+    add(store, "a", 0.5)
+    assert store.get_text("a") is None
+    fresh_resume_store.put("a", {"raw_text": "简历原文"}, 1)
+    assert store.get_text("a") == "简历原文"
+    assert store.get_text("missing") is None
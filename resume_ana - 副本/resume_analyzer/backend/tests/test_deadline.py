@@ -0,0 +1,43 @@
+import pytest
+import deadline as deadline_module
+from deadline import Deadline, DEADLINE_HEADER, REQUEST_DEADLINE, remaining_seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(deadline_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("30", 30.0), ("0.5", 0.5), (None, REQUEST_DEADLINE), ("abc", REQUEST_DEADLINE),
+    ("0", REQUEST_DEADLINE), ("-5", REQUEST_DEADLINE), (str(REQUEST_DEADLINE + 1), REQUEST_DEADLINE),
+])
+def test_from_headers(value, expected):
+    headers = {} if value is None else {DEADLINE_HEADER: value}
+    assert Deadline.from_headers(headers).budget == expected
+
+
+def test_remaining_limit_and_allows(clock):
+    deadline = Deadline(10)
+    clock[0] += 4
+    assert deadline.remaining() == pytest.approx(6)
+    assert deadline.limit(3) == 3 and deadline.limit(20) == pytest.approx(6)
+    assert deadline.allows(6) and not deadline.allows(6.1)
+    assert not deadline.expired()
+    clock[0] += 7
+    assert deadline.remaining() == 0 and deadline.expired()
+
+
+def test_skip_records_stage_with_remaining_time(clock):
+    deadline = Deadline(10)
+    clock[0] += 8.5
+    skipped = []
+    deadline.skip("ai_assessment", skipped)
+    assert skipped == [{"stage": "ai_assessment", "reason": "剩余时间不足（1.5秒）"}]
+
+
+def test_remaining_seconds(clock):
+    assert remaining_seconds(None) is None
+    assert remaining_seconds(Deadline(5)) == pytest.approx(5)
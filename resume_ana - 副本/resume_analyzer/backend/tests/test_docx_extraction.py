@@ -0,0 +1,51 @@
+import zipfile
+import docx
+from text_extraction import docx_to_text
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+MC = 'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"'
+
+
+def write_docx(path, body):
+    """只包含 word/document.xml 的最小DOCX，docx_to_text只读取这一部分"""
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f'<w:document {W} {MC}><w:body>{body}</w:body></w:document>')
+    return str(path)
+
+
+def paragraph(*runs):
+    return "<w:p>" + "".join(f"<w:r>{run}</w:r>" for run in runs) + "</w:p>"
+
+
+def test_paragraphs_tables_and_python_docx_output(tmp_path):
+    document = docx.Document()
+    document.add_heading("张三", level=1)
+    document.add_paragraph("后端工程师")
+    table = document.add_table(rows=2, cols=2)
+    table.rows[0].cells[0].text, table.rows[0].cells[1].text = "技能", "Python, Django"
+    table.rows[1].cells[0].text, table.rows[1].cells[1].text = "语言", "英语"
+    document.add_paragraph("结束")
+    path = str(tmp_path / "resume.docx")
+    document.save(path)
+    assert docx_to_text(path) == "张三\n后端工程师\n技能\tPython, Django\n语言\t英语\n结束"
+
+
+def test_tabs_breaks_and_split_runs(tmp_path):
+    body = paragraph("<w:t>熟悉</w:t>", "<w:t>Python</w:t>", "<w:tab/><w:t>五年</w:t>", "<w:br/><w:t>第二行</w:t>")
+    assert docx_to_text(write_docx(tmp_path / "a.docx", body)) == "熟悉Python\t五年\n第二行"
+
+
+def test_nested_table_and_multi_paragraph_cell(tmp_path):
+    inner = "<w:tbl><w:tr><w:tc>" + paragraph("<w:t>内层</w:t>") + "</w:tc></w:tr></w:tbl>"
+    body = ("<w:tbl><w:tr><w:tc>" + paragraph("<w:t>第一段</w:t>") + paragraph("<w:t>第二段</w:t>") + "</w:tc>"
+            "<w:tc>" + inner + "</w:tc></w:tr></w:tbl>")
+    assert docx_to_text(write_docx(tmp_path / "a.docx", body)) == "第一段 第二段\t内层"
+
+
+def test_text_box_is_read_once_without_fallback(tmp_path):
+    text_box = (
+        "<mc:AlternateContent><mc:Choice><w:txbxContent>" + paragraph("<w:t>文本框</w:t>") + "</w:txbxContent>"
+        "</mc:Choice><mc:Fallback>" + paragraph("<w:t>文本框</w:t>") + "</mc:Fallback></mc:AlternateContent>"
+    )
+    body = paragraph("<w:t>正文</w:t>" + text_box) + paragraph("<w:t>结尾</w:t>")
+    assert docx_to_text(write_docx(tmp_path / "a.docx", body)) == "文本框\n正文\n结尾"
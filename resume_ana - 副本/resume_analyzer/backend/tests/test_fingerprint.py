@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+from fingerprint import NUM_BANDS, SimHashIndex, hamming_distance, normalize_text, simhash
+from resume_store import ResumeStore
+
+RESUME = """张三 | 电话 138-0000-0000 | 邮箱 zhangsan@example.com
+教育背景：清华大学 计算机科学与技术 本科 2016-2020，主修数据结构、操作系统、计算机网络、数据库原理。
+工作经历：字节跳动 后端工程师 2020.07-2023.06
+负责推荐系统在线服务的开发与维护，使用Python、Django、MySQL和Redis，日均请求量超过十亿。
+主导召回服务的性能优化，通过批量查询和多级缓存将P99延迟从120毫秒降低到45毫秒。
+搭建基于Kafka和Flink的实时特征管道，支持分钟级特征更新，参与服务容器化并迁移到Kubernetes。
+项目经验：智能客服平台，基于BERT的意图识别与多轮对话管理，使用PyTorch训练模型并通过Flask部署。
+专业技能：熟悉Python、Go和Java，熟悉Linux、Docker、Kubernetes，了解机器学习与自然语言处理。
+自我评价：有较强的学习能力和团队协作精神，注重代码质量，乐于分享技术经验。"""
+
+
+def test_normalize_ignores_whitespace_punctuation_and_case():
+    assert normalize_text("Python, Django!\n 开发") == normalize_text("python django开发")
+
+
+def test_simhash_is_stable_across_formatting():
+    assert simhash(RESUME) == simhash(RESUME.replace("，", ", ").replace("。", "\n").upper())
+
+
+def test_small_edit_is_near_and_different_resume_is_far():
+    edited = RESUME.replace("2016-2020", "2016-2021")
+    other = (
+        "李四 北京大学 市场营销 硕士 2015-2018。某快消品公司品牌经理，负责年度品牌推广计划、线下活动策划、"
+        "渠道运营和预算管理，带领五人团队完成新品上市，熟悉市场调研和消费者数据分析。"
+    )
+    assert hamming_distance(simhash(RESUME), simhash(edited)) <= 3
+    assert hamming_distance(simhash(RESUME), simhash(other)) > 10
+
+
+def test_empty_text():
+    assert simhash("") == 0
+    assert simhash(" ,.\n") == 0
+
+
+def test_index_query_add_and_remove():
+    index = SimHashIndex()
+    index.add("a", 0b1011)
+    index.add("b", 0b1011 ^ (1 << 40))
+    index.add("far", (1 << 64) - 1)
+    assert index.query(0b1011) == [("a", 0), ("b", 1)]
+    index.remove("a")
+    assert index.query(0b1011) == [("b", 1)]
+    index.add("b", 0)
+    assert index.query(0b1011, max_distance=2) == []
+    assert len(index) == 2
+
+
+def test_resume_store_finds_near_duplicates_and_evicts_oldest():
+    store = ResumeStore(max_size=2)
+    store.put("first", {"skills": ["python"], "raw_text": RESUME}, simhash(RESUME))
+    match = store.find_near_duplicate(simhash(RESUME.replace("2023.06", "2023.07")))
+    assert match is not None and match[0] == "first"
+    assert store.get("first")["raw_text"] == RESUME
+
+    store.put("second", {"raw_text": "b"}, simhash("b" * 20))
+    store.put("third", {"raw_text": "c"}, simhash("c" * 20))
+    assert store.get("first") is None
+    assert store.find_near_duplicate(simhash(RESUME)) is None
+    assert len(store) == 2
+
+
+def test_resume_store_returns_copies():
+    store = ResumeStore()
+    store.put("id", {"skills": ["python"], "ai_assessment": {"overall_score": 1}}, 1)
+    data = store.get("id")
+    data["skills"].append("java")
+    assert store.get("id")["skills"] == ["python"]
+    assert "ai_assessment" not in data
+
+
+def test_max_distance_is_clamped_to_band_limit():
+    env = dict(os.environ, DEDUP_MAX_DISTANCE="10")
+    output = subprocess.run([sys.executable, "-c", "import resume_store; print(resume_store.DEDUP_MAX_DISTANCE)"],
+                            env=env, capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    assert int(output) == NUM_BANDS - 1
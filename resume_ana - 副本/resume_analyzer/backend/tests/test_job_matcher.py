@@ -0,0 +1,81 @@
+import time
+import asyncio
+import pytest
+import job_matcher
+from job_matcher import JobMatcher
+
+RESUME = {
+    "resume_id": "test-resume",
+    "personal_info": {"name": "张三"},
+    "education": [{"school": "清华大学", "major": "计算机科学", "degree": "本科", "graduation_year": "2020"}],
+    "work_experience": [{"company": "字节跳动", "position": "后端工程师", "duration": "2020-2023",
+                         "description": "使用Python和Django开发后端服务，维护MySQL和Redis"}],
+    "skills": ["Python", "Django", "MySQL", "Redis"],
+    "projects": [],
+    "raw_text": "张三 清华大学 计算机科学 本科 后端工程师 Python Django MySQL Redis Docker"
+}
+JOB = "招聘后端工程师，要求本科及以上学历，熟悉Python、Django、MySQL、Redis和Docker。"
+
+
+@pytest.fixture
+def matcher():
+    return JobMatcher()
+
+
+async def test_missing_ai_score_is_excluded_not_neutral(matcher):
+    without_score = await matcher.calculate_match(dict(RESUME), JOB, "后端工程师", ai_assessment={"strengths": []})
+    degraded = await matcher.calculate_match(
+        dict(RESUME), JOB, "后端工程师", ai_assessment={"degraded": True, "overall_score": 0.0}
+    )
+    assert without_score["overall_match_score"] == pytest.approx(degraded["overall_match_score"])
+
+
+async def test_ai_score_takes_part_in_final_score(matcher):
+    low = await matcher.calculate_match(dict(RESUME), JOB, "后端工程师", ai_assessment={"overall_score": 0.0})
+    high = await matcher.calculate_match(dict(RESUME), JOB, "后端工程师", ai_assessment={"overall_score": 1.0})
+    assert high["overall_match_score"] > low["overall_match_score"]
+
+
+async def test_slow_stage_times_out_and_is_left_out_of_score(matcher, monkeypatch):
+    baseline = await matcher.calculate_match(dict(RESUME), JOB, "后端工程师", ai_assessment={"overall_score": 0.5})
+    monkeypatch.setattr(job_matcher, "MATCH_STAGE_TIMEOUT", 0.05)
+    original = matcher._calculate_skill_match
+
+    def slow_skill_match(resume_data, job_doc):
+        time.sleep(0.3)
+        return original(resume_data, job_doc)
+
+    monkeypatch.setattr(matcher, "_calculate_skill_match", slow_skill_match)
+    result = await matcher.calculate_match(dict(RESUME), JOB, "后端工程师", ai_assessment={"overall_score": 0.5})
+    assert [item["stage"] for item in result["degraded_stages"]] == ["skill_match"]
+    assert "超时" in result["degraded_stages"][0]["reason"]
+    assert result["skill_match"]["matched_skills"] == []
+    # 其他阶段照常完成
+    assert result["tfidf_similarity"] == pytest.approx(baseline["tfidf_similarity"])
+    assert result["overall_match_score"] != pytest.approx(baseline["overall_match_score"])
+
+
+async def test_failing_stage_degrades_instead_of_failing_match(matcher, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(matcher, "_calculate_education_match", broken)
+    result = await matcher.calculate_match(dict(RESUME), JOB, "后端工程师", ai_assessment={"overall_score": 0.5})
+    assert "error" not in result
+    assert result["degraded_stages"] == [{"stage": "education_match", "reason": "education_match失败: boom"}]
+
+
+async def test_ai_assessment_timeout_is_degraded(matcher, monkeypatch):
+    async def slow_assessment(*args):
+        await asyncio.sleep(1)
+        return {"overall_score": 1.0}
+
+    monkeypatch.setattr(job_matcher, "MATCH_AI_TIMEOUT", 0.05)
+    monkeypatch.setattr(matcher, "_ai_comprehensive_assessment", slow_assessment)
+    started = time.perf_counter()
+    result = await matcher.calculate_match(dict(RESUME), JOB, "后端工程师")
+    assert time.perf_counter() - started < 1
+    assert result["ai_assessment"]["degraded"] is True
+    assert [item["stage"] for item in result["degraded_stages"]] == ["ai_assessment"]
+    skipped = await matcher.calculate_match(dict(RESUME), JOB, "后端工程师", ai_assessment={"degraded": True})
+    assert result["overall_match_score"] == pytest.approx(skipped["overall_match_score"])
@@ -0,0 +1,61 @@
+import json
+from json_stream import IncrementalJSONParser, extract_json_object
+
+DOCUMENT = {
+    "personal_info": {"name": "张三", "email": "a@b.com"},
+    "skills": ["Python", "C{++}", "say \"hi\""],
+    "assessment": {"overall_score": 0.75, "passed": True, "notes": None},
+    "years": 3
+}
+
+
+def feed_in_pieces(text: str, size: int):
+    parser = IncrementalJSONParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+
+def test_fields_are_emitted_as_soon_as_complete():
+    text = json.dumps(DOCUMENT, ensure_ascii=False)
+    for size in (1, 3, len(text)):
+        parser, events = feed_in_pieces(text, size)
+        assert parser.done
+        assert parser.result == DOCUMENT
+        assert dict(events) == {
+            "personal_info.name": "张三",
+            "personal_info.email": "a@b.com",
+            "personal_info": DOCUMENT["personal_info"],
+            "skills": DOCUMENT["skills"],
+            "assessment.overall_score": 0.75,
+            "assessment.passed": True,
+            "assessment.notes": None,
+            "assessment": DOCUMENT["assessment"],
+            "years": 3
+        }
+
+
+def test_field_order_follows_input():
+    _, events = feed_in_pieces('{"a": 1, "b": {"c": "x"}}', 1)
+    assert [path for path, _ in events] == ["a", "b.c", "b"]
+
+
+def test_prose_and_code_fence_before_json_are_skipped():
+    text = '好的，结果如下：\n```json\n{"score": 0.5}\n```\n以上。'
+    parser, events = feed_in_pieces(text, 4)
+    assert parser.result == {"score": 0.5}
+    assert events == [("score", 0.5)]
+
+
+def test_input_after_document_is_ignored():
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": 1}')
+    assert parser.feed('{"b": 2}') == []
+    assert parser.result == {"a": 1}
+
+
+def test_extract_json_object():
+    assert extract_json_object('前缀 {"a": [1, {"b": "}"}]} 后缀') == {"a": [1, {"b": "}"}]}
+    assert extract_json_object("没有JSON") is None
+    assert extract_json_object('{"a": }') is None
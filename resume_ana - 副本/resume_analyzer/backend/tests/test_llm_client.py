@@ -0,0 +1,174 @@
+import json
+import pytest
+import requests
+from llm_client import (
+    CircuitBreaker, CircuitOpenError, LLMCallConfig, LLMCallError, ResilientLLMClient, STREAM_DONE, parse_sse_line
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, lines=None):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = body
+        self._lines = lines or []
+
+    def json(self):
+        if isinstance(self._body, str):
+            return json.loads(self._body)
+        return self._body
+
+    def iter_lines(self, decode_unicode=False):
+        yield from self._lines
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def post(self, *args, **kwargs):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def make_client(*responses, failures=1, reset=0.0, retries=0):
+    config = LLMCallConfig()
+    config.max_retries = retries
+    config.backoff_base = 0.0
+    config.breaker_failure_threshold = failures
+    config.breaker_reset_timeout = reset
+    client = ResilientLLMClient(name="test_llm", config=config)
+    client.session = FakeSession(*responses)
+    return client
+
+
+OK = {"choices": [{"message": {"content": "{}"}}], "usage": {"total_tokens": 10}}
+
+
+def open_breaker(client):
+    client.breaker.record_failure()
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+def test_retries_retryable_status_then_succeeds():
+    client = make_client(FakeResponse(503), FakeResponse(200, OK), retries=2)
+    assert client.post_json("http://llm", {}, {"messages": []}) == OK
+    assert client.session.calls == 2
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_retryable_status_is_not_retried():
+    client = make_client(FakeResponse(400), retries=2)
+    with pytest.raises(LLMCallError) as error:
+        client.post_json("http://llm", {}, {"messages": []})
+    assert error.value.status_code == 400
+    assert client.session.calls == 1
+
+
+def test_invalid_json_body_becomes_llm_call_error_and_opens_breaker():
+    client = make_client(FakeResponse(200, "<html>bad gateway</html>"))
+    with pytest.raises(LLMCallError):
+        client.post_json("http://llm", {}, {"messages": []})
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_breaker_rejects_until_reset_timeout():
+    client = make_client(FakeResponse(200, OK), reset=60.0)
+    open_breaker(client)
+    with pytest.raises(CircuitOpenError):
+        client.post_json("http://llm", {}, {"messages": []})
+    assert client.session.calls == 0
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker("test_probe", failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    ticket = breaker.acquire()
+    assert ticket
+    assert breaker.acquire() is None
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.acquire() == 0
+
+
+def test_probe_released_after_unrecorded_error():
+    # 4xx不计入熔断，探测请求结束后应允许下一个探测
+    client = make_client(FakeResponse(401), FakeResponse(200, OK))
+    open_breaker(client)
+    with pytest.raises(LLMCallError):
+        client.post_json("http://llm", {}, {"messages": []})
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert client.post_json("http://llm", {}, {"messages": []}) == OK
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_probe_released_after_unexpected_exception():
+    client = make_client(RuntimeError("boom"), FakeResponse(200, OK))
+    open_breaker(client)
+    with pytest.raises(RuntimeError):
+        client.post_json("http://llm", {}, {"messages": []})
+    assert client.post_json("http://llm", {}, {"messages": []}) == OK
+
+
+def test_release_does_not_free_another_callers_probe():
+    breaker = CircuitBreaker("test_owner", failure_threshold=1, reset_timeout=0.0)
+    normal = breaker.acquire()
+    breaker.record_failure()
+    probe = breaker.acquire()
+    breaker.release(normal)
+    assert breaker.acquire() is None
+    breaker.release(probe)
+    assert breaker.acquire()
+
+
+def sse(*chunks):
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': chunk}}]})}".encode() for chunk in chunks]
+    return lines + [b"data: [DONE]"]
+
+
+def test_stream_post_yields_deltas():
+    client = make_client(FakeResponse(200, lines=sse("ab", "cd")))
+    assert list(client.stream_post("http://llm", {}, {"messages": []})) == ["ab", "cd"]
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stream_closed_early_releases_probe():
+    client = make_client(FakeResponse(200, lines=sse("ab", "cd")), FakeResponse(200, OK))
+    open_breaker(client)
+    stream = client.stream_post("http://llm", {}, {"messages": []})
+    assert next(stream) == "ab"
+    stream.close()
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert client.post_json("http://llm", {}, {"messages": []}) == OK
+
+
+def test_stream_read_error_records_failure():
+    class BrokenResponse(FakeResponse):
+        def iter_lines(self, decode_unicode=False):
+            yield sse("ab")[0]
+            raise requests.ConnectionError("reset")
+
+    client = make_client(BrokenResponse(200))
+    with pytest.raises(LLMCallError):
+        list(client.stream_post("http://llm", {}, {"messages": []}))
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+def test_parse_sse_line():
+    assert parse_sse_line('data: {"choices": [{"delta": {"content": "x"}}]}') == "x"
+    assert parse_sse_line("data: [DONE]") is STREAM_DONE
+    assert parse_sse_line(": keep-alive") is None
+    assert parse_sse_line("data: not json") is None
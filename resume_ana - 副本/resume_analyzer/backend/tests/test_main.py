@@ -0,0 +1,102 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+import main
+from conftest import JOB_DESCRIPTION, RESUME_TEXT
+from deadline import Deadline
+from response_view import ResponseView
+
+
+async def collect(generator):
+    return [json.loads(line) async for line in generator]
+
+
+async def test_stream_batch_reports_worker_exception_instead_of_hanging(monkeypatch):
+    async def analyze(file, *args, **kwargs):
+        if file.filename == "bad.txt":
+            raise RuntimeError("boom")
+        await asyncio.sleep(0.01)
+        return {"filename": file.filename, "status": "success"}
+
+    monkeypatch.setattr(main, "_analyze_batch_file", analyze)
+    files = [SimpleNamespace(filename=name) for name in ("a.txt", "bad.txt", "b.txt", "c.txt")]
+    lines = await asyncio.wait_for(collect(main._stream_batch(
+        files, "岗位描述", "后端工程师", "two_step", Deadline(10), ResponseView()
+    )), 5)
+
+    results = {line["index"]: line for line in lines if line["event"] == "result"}
+    assert sorted(results) == [0, 1, 2, 3]
+    assert results[1] == {"event": "result", "index": 1, "filename": "bad.txt", "status": "error", "error": "boom"}
+    assert lines[-1] == {"event": "summary", "status": "success", "total_files": 4,
+                         "failed_files": 1, "duplicate_files": 0}
+
+
+def score_client():
+    return TestClient(main.app)
+
+
+def test_score_parsed_resume_without_llm_in_fast_mode(fake_llm):
+    response = score_client().post("/score", json={
+        "resume_data": fake_llm.resume, "job_description": JOB_DESCRIPTION, "job_title": "后端工程师",
+        "analysis_mode": "fast", "view": "summary"
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert fake_llm.calls == []
+    assert body["status"] == "success" and body["resume_id"]
+    assert body["match_result"]["skill_match"]["matched_skills"]
+    assert body["match_result"]["skipped_stages"][0]["stage"] == "ai_assessment"
+    assert "detailed_analysis" not in body["match_result"]
+
+
+def test_score_stored_resume_by_id(fake_llm, fresh_resume_store):
+    stored = dict(fake_llm.resume, raw_text=RESUME_TEXT, ai_assessment={"overall_score": 0.1})
+    fresh_resume_store.put("r1", stored, 1)
+    response = score_client().post("/score", json={
+        "resume_id": "r1", "job_description": JOB_DESCRIPTION, "job_title": "后端工程师"
+    })
+    assert response.status_code == 200
+    assert response.json()["resume_id"] == "r1"
+    # 之前保存的岗位评估不复用，重新调用一次AI评估
+    assert len(fake_llm.calls) == 1
+    assert response.json()["match_result"]["ai_assessment"]["overall_score"] == 0.75
+
+
+def test_score_rejects_missing_or_ambiguous_resume(fake_llm):
+    client = score_client()
+    options = {"job_description": JOB_DESCRIPTION, "job_title": "后端工程师"}
+    assert client.post("/score", json=dict(options, resume_id="missing")).status_code == 404
+    assert client.post("/score", json=options).status_code == 422
+    assert client.post("/score", json=dict(options, resume_id="r1", resume_data={})).status_code == 422
+    assert client.post("/score", json=dict(options, resume_id="r1", analysis_mode="slow")).status_code == 400
+
+
+def test_score_batch_reports_failures_per_candidate(fake_llm):
+    response = score_client().post("/score/batch", json={
+        "job_description": JOB_DESCRIPTION, "job_title": "后端工程师", "analysis_mode": "fast",
+        "fields": "index,status,error,match_result.overall_match_score",
+        "candidates": [{"resume_data": fake_llm.resume}, {"resume_id": "missing"}, {"resume_data": {"skills": ["Go"]}}]
+    })
+    body = response.json()
+    assert (body["total_candidates"], body["failed_candidates"]) == (3, 1)
+    assert [item["index"] for item in body["results"]] == [0, 1, 2]
+    assert body["results"][1] == {"index": 1, "status": "error", "error": "简历不存在或已过期: missing"}
+    first, third = body["results"][0]["match_result"], body["results"][2]["match_result"]
+    assert first["overall_match_score"] > third["overall_match_score"]
+    assert fake_llm.calls == []
+
+
+def test_upload_and_score_give_the_same_scores(fake_llm):
+    client = score_client()
+    form = {"job_description": JOB_DESCRIPTION, "job_title": "后端工程师"}
+    upload = client.post("/upload/file", data=form,
+                         files={"file": ("resume.txt", RESUME_TEXT.encode("utf-8"), "text/plain")}).json()
+    by_id = client.post("/score", json=dict(form, resume_id=upload["resume_data"]["resume_id"])).json()
+    parsed = {key: upload["resume_data"][key] for key in
+              ("personal_info", "education", "work_experience", "skills", "projects", "certificates", "raw_text")}
+    by_data = client.post("/score", json=dict(form, resume_data=parsed)).json()
+
+    for key in ("tfidf_similarity", "topic_similarity"):
+        assert upload["match_result"][key] == by_id["match_result"][key] == by_data["match_result"][key], key
+    assert upload["match_result"]["overall_match_score"] == by_id["match_result"]["overall_match_score"]
@@ -0,0 +1,119 @@
+import asyncio
+import signal
+import pytest
+from fastapi.testclient import TestClient
+import main
+import memory_monitor
+import tracing
+from memory_monitor import MemoryMonitor, track_memory
+from metrics import registry
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def monitor():
+    monitor = MemoryMonitor()
+    yield monitor
+    monitor.stop_tracing()
+
+
+def leak(store, count):
+    store.extend(bytearray(1024) for _ in range(count))
+
+
+def test_gauges_are_published(monitor):
+    stats = monitor.update_gauges()
+    assert stats["tracemalloc"] is False and "traced_bytes" not in stats
+    assert registry.snapshot()["gauges"]["memory.rss_bytes"] == stats["rss_bytes"] > 0
+
+    monitor.start_tracing()
+    stats = monitor.update_gauges()
+    assert stats["tracemalloc"] and stats["traced_peak_bytes"] >= stats["traced_bytes"] > 0
+
+
+def test_allocation_report_shows_growth_since_baseline(monitor):
+    assert monitor.allocation_report() == {"tracing": False}
+    monitor.start_tracing(frames=2)
+    store = []
+    leak(store, 2000)
+
+    report = monitor.allocation_report(top=5)
+    assert report["tracing"] and report["frames"] == 2
+    growth = report["growth_since_baseline"]
+    assert "test_memory_monitor.py" in growth[0]["site"] and growth[0]["size_diff_bytes"] > 1024 * 1000
+    assert all(item["size_diff_bytes"] > 0 for item in growth)
+
+    # 重新记录基线后，已有的分配不再算作增长
+    monitor.reset_baseline()
+    sites = [item["site"] for item in monitor.allocation_report(top=5)["growth_since_baseline"]]
+    assert growth[0]["site"] not in sites
+    assert len(store) == 2000
+
+
+def test_object_types_counts_tracked_objects(monitor):
+    class Leaky:
+        pass
+
+    objects = [Leaky() for _ in range(5000)]
+    types = monitor.object_types(top=50)
+    assert {"type": "Leaky", "count": 5000} in types
+    assert len(objects) == 5000
+
+
+def test_over_limit_rechecks_after_gc(monkeypatch):
+    assert not MemoryMonitor(0).over_limit()
+    readings = iter([300 * MB, 100 * MB])
+    monkeypatch.setattr(memory_monitor, "rss_bytes", lambda: next(readings))
+    # 第一次超过上限，回收后低于上限
+    assert not MemoryMonitor(200).over_limit()
+    monkeypatch.setattr(memory_monitor, "rss_bytes", lambda: 300 * MB)
+    assert MemoryMonitor(200).over_limit()
+    monkeypatch.setattr(memory_monitor, "rss_bytes", lambda: None)
+    assert not MemoryMonitor(200).over_limit()
+
+
+async def test_run_recycles_worker_once(monkeypatch):
+    monkeypatch.setattr(memory_monitor, "rss_bytes", lambda: 300 * MB)
+    monkeypatch.setattr(memory_monitor, "MEMORY_RECYCLE_DRAIN_SECONDS", 0)
+    signals = []
+    monkeypatch.setattr(memory_monitor.os, "kill", lambda pid, sig: signals.append(sig))
+    monitor = MemoryMonitor(200)
+    task = asyncio.create_task(monitor.run(interval=0.001))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    assert monitor.recycling
+    assert signals == [signal.SIGTERM]
+
+
+def test_health_reports_recycling(monkeypatch):
+    client = TestClient(main.app)
+    assert client.get("/health").status_code == 200
+    monkeypatch.setattr(main.memory_monitor, "recycling", True)
+    response = client.get("/health")
+    assert response.status_code == 503 and response.json()["status"] == "recycling"
+
+
+def test_track_memory_records_retained_bytes(monitor):
+    with track_memory("noop"):
+        pass
+    assert "memory.stage.noop.delta_bytes" not in registry.snapshot()["summaries"]
+
+    monitor.start_tracing()
+    trace = tracing.Trace("GET /")
+    token = tracing._current_span.set(trace.root)
+    store = []
+    try:
+        with tracing.span("stage") as stage, track_memory("stage"):
+            leak(store, 100)
+    finally:
+        tracing._current_span.reset(token)
+    assert stage.attributes["memory.delta_bytes"] >= 100 * 1024
+    assert registry.snapshot()["summaries"]["memory.stage.stage.delta_bytes"]["max"] >= 100 * 1024
+
+
+def test_summary_max_of_negative_values():
+    # 释放内存的阶段增量为负数，max不能停在0
+    registry.observe("memory.stage.release.delta_bytes", -300)
+    registry.observe("memory.stage.release.delta_bytes", -100)
+    assert registry.snapshot()["summaries"]["memory.stage.release.delta_bytes"]["max"] == -100
@@ -0,0 +1,89 @@
+import threading
+from pdf_extraction import PDFExtractor, get_backend
+from resume_processor import ResumeProcessor
+
+
+def make_pdf(path, form_texts):
+    """
+    每页先写固定的标题，再通过表单XObject /X1 画出该页的文字：
+    所有页面、所有文件的内容流完全相同，只有XObject不同
+    """
+    content = b"BT /F1 12 Tf 72 720 Td (Header) Tj ET q 1 0 0 1 72 600 cm /X1 Do Q"
+    page_count = len(form_texts)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % (5 + 3 * i) for i in range(page_count)), page_count),
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(form_texts):
+        form = f"BT /F1 12 Tf 0 0 Td ({text}) Tj ET".encode()
+        objects += [
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 3 0 R "
+            b"/Resources << /Font << /F1 4 0 R >> /XObject << /X1 %d 0 R >> >> >>" % (6 + 3 * i),
+            b"<< /Type /XObject /Subtype /Form /BBox [0 0 500 100] /Resources << /Font << /F1 4 0 R >> >> "
+            b"/Length %d >>\nstream\n" % len(form) + form + b"\nendstream",
+            b"null",
+        ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+    return str(path)
+
+
+def extractor(**kwargs):
+    return PDFExtractor(backend=get_backend("pypdf2"), **kwargs)
+
+
+def test_pages_sharing_content_stream_but_not_xobjects_do_not_collide(tmp_path):
+    pdf_extractor = extractor(workers=1)
+    alice = make_pdf(tmp_path / "alice.pdf", ["Alice"])
+    bob = make_pdf(tmp_path / "bob.pdf", ["Bob"])
+    assert pdf_extractor.extract_text(alice) == "Header\nAlice"
+    assert pdf_extractor.extract_text(bob) == "Header\nBob"
+    assert len(pdf_extractor._cache) == 2
+
+
+def test_identical_pages_hit_cache_across_files(tmp_path, monkeypatch):
+    pdf_extractor = extractor(workers=1)
+    pdf_extractor.extract_text(make_pdf(tmp_path / "first.pdf", ["Alice", "Bob"]))
+    calls = []
+    original = pdf_extractor.backend.page_text
+    monkeypatch.setattr(pdf_extractor.backend, "page_text",
+                        lambda document, index: calls.append(index) or original(document, index))
+    assert pdf_extractor.extract_text(make_pdf(tmp_path / "second.pdf", ["Bob", "Carol"])) == \
+        "Header\nBob\nHeader\nCarol"
+    assert calls == [1]
+
+
+def test_parallel_extraction_keeps_page_order(tmp_path):
+    names = [f"Page{i}" for i in range(6)]
+    pdf_extractor = extractor(workers=2, parallel_min_pages=2)
+    try:
+        text = pdf_extractor.extract_text(make_pdf(tmp_path / "long.pdf", names))
+    finally:
+        pdf_extractor.shutdown()
+    assert text == "\n".join(f"Header\n{name}" for name in names)
+
+
+async def test_process_file_extracts_text_off_the_event_loop(fake_llm, tmp_path, monkeypatch):
+    processor = ResumeProcessor()
+    threads = []
+
+    def extract(file_path):
+        threads.append(threading.get_ident())
+        return "张三 后端工程师 Python"
+
+    monkeypatch.setattr(processor, "_extract_pdf_text", extract)
+    resume_data = await processor.process_file(str(tmp_path / "resume.pdf"), ".pdf")
+    assert resume_data['raw_text'] == "张三 后端工程师 Python"
+    assert threads and threads[0] != threading.get_ident()
@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi.testclient import TestClient
+import main
+import profiling
+from profiling import ProfileSession, StackSampler, bind, requested_profile
+
+
+@pytest.fixture
+def token(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    return "secret"
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_requested_profile_checks_token_and_options(token):
+    assert requested_profile({}, {}) is None
+    assert requested_profile({"X-Profile": token}, {}) == ("collapsed", "file")
+    assert requested_profile({}, {"profile": token, "profile_format": "pstats", "profile_output": "inline"}) == \
+        ("pstats", "inline")
+    with pytest.raises(PermissionError):
+        requested_profile({"X-Profile": "wrong"}, {})
+    with pytest.raises(ValueError):
+        requested_profile({"X-Profile": token, "X-Profile-Format": "svg"}, {})
+    with pytest.raises(ValueError):
+        requested_profile({"X-Profile": token}, {"profile_output": "email"})
+
+
+def test_token_disabled_when_unset(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "")
+    assert not profiling.check_token("")
+    assert not profiling.check_token("anything")
+
+
+def test_stack_sampler_aggregates_busy_thread():
+    sampler = StackSampler(0.001)
+    worker = threading.Thread(target=busy_loop, args=(0.2,), name="busy-1")
+    worker.start()
+    sampler.start()
+    worker.join()
+    sampler.stop()
+
+    assert sampler.samples > 0
+    busy = [line for line in sampler.collapsed().splitlines() if "busy_loop" in line]
+    # 线程名去掉编号后作为根节点
+    assert busy and all(line.startswith("busy;") for line in busy)
+    hot = sampler.hot_functions(5)
+    assert any(item["function"].startswith("busy_loop") for item in hot["top_self"])
+    assert "stack-sampler" not in sampler.collapsed()
+
+
+def test_stack_sampler_limits_distinct_stacks():
+    sampler = StackSampler(1, max_stacks=1)
+    with sampler._lock:
+        sampler.stacks["a;b"] = 1
+    worker = threading.Thread(target=busy_loop, args=(0.1,), name="busy")
+    worker.start()
+    sampler.sample()
+    worker.join()
+    assert list(sampler.stacks) == ["a;b"]
+    assert sampler.dropped == sampler.samples > 0
+
+
+def test_pstats_session_includes_bound_thread_work(token):
+    session = ProfileSession("pstats")
+    assert session.begin()
+    try:
+        # 同一时间只能分析一个请求
+        assert not ProfileSession().begin()
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(bind(busy_loop), 0.05).result()
+    finally:
+        session.end()
+    assert bind(busy_loop) is busy_loop
+
+    assert "busy_loop" in session.report()
+    path = session.save("/upload/file")
+    assert "-upload_file-" in os.path.basename(path) and path.endswith(".prof")
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert "busy_loop" in functions
+
+
+def test_middleware_profiles_request(token):
+    client = TestClient(main.app)
+    response = client.get("/", headers={"X-Profile": token, "X-Profile-Output": "inline",
+                                        "X-Profile-Format": "pstats"})
+    assert response.status_code == 200
+    assert response.headers["X-Profiled-Status"] == "200"
+    assert "cumulative" in response.text
+
+    response = client.get("/", params={"profile": token})
+    assert response.json() == {"message": "智能简历分析系统 API"}
+    assert os.path.dirname(response.headers["X-Profile-File"]) == profiling.PROFILE_DIR
+    assert os.path.exists(response.headers["X-Profile-File"])
+
+    assert client.get("/", headers={"X-Profile": "wrong"}).status_code == 403
+    assert client.get("/", params={"profile": token, "profile_format": "svg"}).status_code == 400
+    assert client.get("/profiling/hot", params={"profile": "wrong"}).status_code == 403
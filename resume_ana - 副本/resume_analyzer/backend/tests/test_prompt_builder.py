@@ -0,0 +1,28 @@
+from prompt_builder import build_prompt_text, count_tokens
+
+
+def test_identical_segments_are_sent_once():
+    text, stats = build_prompt_text(["熟悉Python和Django", "熟悉 Python和Django"])
+    assert text == "熟悉Python和Django"
+    assert stats['duplicates_removed'] == 1
+
+
+def test_repeated_lines_are_removed_across_segments():
+    text, _ = build_prompt_text(["工作经历\n负责后端开发", "负责后端开发\n维护数据库"])
+    assert text.split('\n') == ["工作经历", "负责后端开发", "维护数据库"]
+
+
+def test_segment_contained_in_earlier_text_is_kept():
+    # 只是前面某行的一部分，或横跨两个片段的拼接处，都不是重复内容
+    text, stats = build_prompt_text(["Python开发工程师", "发工", "Python"])
+    assert text.split('\n') == ["Python开发工程师", "发工", "Python"]
+    assert stats['duplicates_removed'] == 0
+
+
+def test_budget_keeps_most_relevant_chunks_in_original_order():
+    segments = [f"第{i}段 烹饪 烘焙 甜点 " * 40 for i in range(3)] + ["熟悉Python、Django和MySQL后端开发 " * 5]
+    text, stats = build_prompt_text(segments, "招聘Python后端工程师，熟悉Django和MySQL", token_budget=200)
+    assert stats['prompt_tokens'] <= 200
+    assert count_tokens(text) <= 200 + stats['chunks_kept']
+    assert "Python" in text
+    assert stats['chunks_kept'] < stats['chunks_total']
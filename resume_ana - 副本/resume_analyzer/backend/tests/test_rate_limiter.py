@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+import rate_limiter
+from rate_limiter import (
+    RateLimitTimeout, TokenBucketLimiter, estimate_request_tokens, estimate_tokens
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(rate_limiter.time, "time", lambda: now[0])
+    return now
+
+
+def limiter(tmp_path, rpm=0, tpm=0, name="test"):
+    return TokenBucketLimiter(name, rpm, tpm, burst_seconds=6, state_dir=str(tmp_path))
+
+
+def test_disabled_limiter_never_waits(tmp_path):
+    assert limiter(tmp_path).reserve(10 ** 9, max_wait=0) == 0.0
+
+
+def test_requests_beyond_burst_wait_for_refill(tmp_path, clock):
+    bucket = limiter(tmp_path, rpm=66)  # 每秒补充1个请求，容量6
+    assert [bucket.reserve(0, max_wait=10) for _ in range(6)] == [0.0] * 6
+    assert bucket.reserve(0, max_wait=10) == pytest.approx(1.0)
+    # 后来的预约排在前面的预约之后
+    assert bucket.reserve(0, max_wait=10) == pytest.approx(2.0)
+    clock[0] += 2
+    assert bucket.reserve(0, max_wait=10) == pytest.approx(1.0)
+
+
+def test_token_quota_and_max_wait(tmp_path, clock):
+    bucket = limiter(tmp_path, tpm=660)  # 每秒补充10个token，容量60
+    assert bucket.reserve(60, max_wait=0) == 0.0
+    with pytest.raises(RateLimitTimeout) as error:
+        bucket.reserve(100, max_wait=5)
+    assert error.value.wait == pytest.approx(10.0)
+    # 超时的调用不占用配额
+    assert bucket.reserve(20, max_wait=5) == pytest.approx(2.0)
+
+
+def test_adjust_refunds_overestimated_tokens(tmp_path, clock):
+    bucket = limiter(tmp_path, tpm=660)
+    bucket.reserve(60, max_wait=0)
+    bucket.adjust(-30)
+    assert bucket.reserve(30, max_wait=0) == 0.0
+
+
+def test_quota_is_shared_through_state_file(tmp_path, clock):
+    first = limiter(tmp_path, rpm=66)
+    second = limiter(tmp_path, rpm=66)
+    for _ in range(6):
+        first.reserve(0, max_wait=0)
+    assert second.reserve(0, max_wait=10) == pytest.approx(1.0)
+    assert limiter(tmp_path, rpm=66, name="other").reserve(0, max_wait=0) == 0.0
+
+
+async def test_cancelled_wait_returns_reservation(tmp_path):
+    bucket = limiter(tmp_path, tpm=660)
+    bucket.reserve(60, max_wait=0)
+    waiting = asyncio.ensure_future(bucket.acquire_async(30, max_wait=10))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    # 取消的预约已归还，下一个调用只需等待自身的缺口
+    assert bucket.reserve(30, max_wait=10) == pytest.approx(3.0, abs=0.1)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("张三李四") == 4
+    assert estimate_tokens("python") == 2
+    payload = {"messages": [{"role": "user", "content": "你好"}], "max_tokens": 100}
+    assert estimate_request_tokens(payload) == 102
+    assert estimate_request_tokens({"input": ["abcd", "efgh"]}) == 2
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+@pytest.fixture
+def embedding(monkeypatch, tmp_path):
+    """嵌入模型使用独立的限流器，requests.post 返回预设的响应"""
+    import resume_processor
+    bucket = limiter(tmp_path, rpm=66, name="embedding")
+    monkeypatch.setattr(resume_processor, "doubao_embedding_limiter", bucket)
+    responses = []
+    monkeypatch.setattr(resume_processor.requests, "post", lambda *args, **kwargs: responses.pop(0))
+    return resume_processor.DoubaoEmbedding(api_key="test"), bucket, responses
+
+
+def counters():
+    from metrics import registry
+    return registry.snapshot()["counters"]
+
+
+def test_embedding_quota_errors_are_not_zero_vectors(embedding, clock, monkeypatch):
+    import resume_processor
+    from llm_client import LLMCallError
+    model, bucket, responses = embedding
+    responses.append(FakeResponse(200, {"data": [{"embedding": [0.5]}], "usage": {"total_tokens": 1}}))
+    assert model._get_text_embedding("Python") == [0.5]
+
+    before = counters().get("doubao_embedding.status_429", 0)
+    responses.append(FakeResponse(429))
+    with pytest.raises(LLMCallError) as error:
+        model._get_text_embeddings(["Python", "Redis"])
+    assert error.value.status_code == 429
+    assert counters()["doubao_embedding.status_429"] == before + 1
+
+    # 其他错误仍退回零向量，但会计入指标
+    responses.append(FakeResponse(500))
+    assert model._get_text_embeddings(["Python"]) == [[0.0] * 768]
+    assert counters()["doubao_embedding.status_500"] >= 1
+
+    # 等待配额超过上限时抛出，而不是返回零向量
+    monkeypatch.setattr(resume_processor, "RATE_LIMIT_MAX_WAIT", 0)
+    for _ in range(6):
+        bucket.reserve(0, max_wait=10)
+    with pytest.raises(RateLimitTimeout):
+        model._get_text_embedding("Python")
+
+
+async def test_async_embedding_waits_without_blocking_the_loop(embedding, monkeypatch):
+    model, bucket, responses = embedding
+
+    def blocking_acquire(*args, **kwargs):
+        raise AssertionError("异步嵌入不能调用阻塞的acquire")
+
+    monkeypatch.setattr(bucket, "acquire", blocking_acquire)
+    for _ in range(6):
+        bucket.reserve(0, max_wait=10)
+    responses.append(FakeResponse(200, {"data": [{"embedding": [0.5]}]}))
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0.05)
+
+    task = asyncio.create_task(ticker())
+    assert await model._aget_text_embedding("Python") == [0.5]
+    task.cancel()
+    # 等待补充配额（约1秒）期间事件循环仍在运行
+    assert len(ticks) > 5
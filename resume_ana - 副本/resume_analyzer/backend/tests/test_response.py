@@ -0,0 +1,130 @@
+import gzip
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+import serialization
+from response_view import ResponseView
+from serialization import CompressionMiddleware, _choose_encoding
+
+ITEM = {
+    "filename": "a.pdf",
+    "status": "success",
+    "resume_data": {"resume_id": "r1", "personal_info": {"name": "张三", "phone": "123"}, "raw_text": "全文"},
+    "match_result": {
+        "overall_match_score": 0.8,
+        "skill_match": {"match_rate": 0.5, "matched_skills": ["Python"], "missing_skills": ["Go"]},
+        "detailed_analysis": "报告",
+        "recommendations": ["建议"],
+    },
+}
+
+
+def test_full_view_returns_item_unchanged():
+    view = ResponseView()
+    assert view.apply(ITEM) is ITEM
+    assert view.include_report
+
+
+def test_summary_view_keeps_scores_and_drops_report():
+    view = ResponseView("summary")
+    assert view.apply(ITEM) == {
+        "filename": "a.pdf",
+        "status": "success",
+        "resume_data": {"resume_id": "r1", "personal_info": {"name": "张三"}},
+        "match_result": {
+            "overall_match_score": 0.8,
+            "skill_match": {"match_rate": 0.5, "matched_skills": ["Python"], "missing_skills": ["Go"]},
+        },
+    }
+    assert not view.include_report
+
+
+def test_fields_projection_skips_missing_paths_and_ignores_view():
+    view = ResponseView("summary", fields="match_result.overall_match_score, resume_data.missing.x,,status")
+    assert view.apply(ITEM) == {"match_result": {"overall_match_score": 0.8}, "status": "success"}
+    # 路径穿过非字典的值时跳过
+    assert ResponseView(fields="status.code").apply(ITEM) == {}
+    assert not view.include_report
+
+
+def test_report_requested_by_field_or_parent():
+    assert ResponseView(fields="match_result.recommendations").include_report
+    assert ResponseView(fields="match_result").include_report
+    assert not ResponseView(fields="match_result.skill_match").include_report
+
+
+def test_unknown_view_is_rejected():
+    with pytest.raises(ValueError):
+        ResponseView("compact")
+
+
+def test_choose_encoding(monkeypatch):
+    assert _choose_encoding("gzip, deflate, br") == "br"
+    assert _choose_encoding("br;q=0, gzip") == "gzip"
+    assert _choose_encoding("gzip;q=0.5") == "gzip"
+    assert _choose_encoding("*") == "br"
+    assert _choose_encoding("identity") is None
+    assert _choose_encoding("gzip;q=0, *;q=0") is None
+    assert _choose_encoding("") is None
+    monkeypatch.setattr(serialization, "brotli", None)
+    assert _choose_encoding("br, gzip") == "gzip"
+    assert _choose_encoding("br") is None
+
+
+BODY = "张三 后端工程师 Python " * 200
+
+
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/large")
+    def large():
+        return {"text": BODY}
+
+    @app.get("/small")
+    def small():
+        return {"text": "ok"}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((f"{i}\n" for i in range(3)), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+
+def raw_get(path, accept_encoding):
+    # 关闭自动解压，直接检查压缩后的字节
+    with client().stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_middleware_compresses_with_gzip_and_brotli():
+    response, body = raw_get("/large", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body)
+    assert gzip.decompress(body) == f'{{"text":"{BODY}"}}'.encode()
+
+    response, body = raw_get("/large", "br")
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(body) == f'{{"text":"{BODY}"}}'.encode()
+
+
+def test_middleware_skips_small_and_unaccepted_responses():
+    response, body = raw_get("/small", "gzip, br")
+    assert "content-encoding" not in response.headers
+    assert body == b'{"text":"ok"}'
+
+    response, body = raw_get("/large", "identity")
+    assert "content-encoding" not in response.headers
+    assert len(body) == int(response.headers["content-length"])
+
+
+def test_streaming_response_is_compressed_incrementally():
+    response, body = raw_get("/stream", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(body) == b"0\n1\n2\n"
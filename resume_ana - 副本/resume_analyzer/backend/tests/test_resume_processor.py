@@ -0,0 +1,65 @@
+from conftest import JOB_DESCRIPTION, RESUME_TEXT
+from metrics import registry
+from resume_processor import ResumeProcessor
+from prompts import ANALYSIS_MODE_COMBINED, ANALYSIS_MODE_TWO_STEP
+
+
+async def test_two_step_parses_resume_with_one_call(fake_llm, resume_file):
+    resume_data = await ResumeProcessor().process_file(
+        resume_file, '.txt', JOB_DESCRIPTION, "后端工程师", ANALYSIS_MODE_TWO_STEP
+    )
+    assert len(fake_llm.calls) == 1
+    assert resume_data['skills'] == fake_llm.resume['skills']
+    assert 'ai_assessment' not in resume_data
+
+
+async def test_combined_mode_returns_assessment_from_same_call(fake_llm, resume_file):
+    resume_data = await ResumeProcessor().process_file(
+        resume_file, '.txt', JOB_DESCRIPTION, "后端工程师", ANALYSIS_MODE_COMBINED
+    )
+    assert len(fake_llm.calls) == 1
+    assert JOB_DESCRIPTION in fake_llm.calls[0]
+    assert resume_data['education'] == fake_llm.resume['education']
+    assert resume_data['ai_assessment']['overall_score'] == 0.75
+
+
+async def test_combined_mode_drops_assessment_without_score(fake_llm, resume_file):
+    del fake_llm.assessment['overall_score']
+    resume_data = await ResumeProcessor().process_file(
+        resume_file, '.txt', JOB_DESCRIPTION, "后端工程师", ANALYSIS_MODE_COMBINED
+    )
+    assert 'ai_assessment' not in resume_data
+
+
+async def test_combined_mode_without_job_falls_back_to_resume_prompt(fake_llm, resume_file):
+    await ResumeProcessor().process_file(resume_file, '.txt', None, None, ANALYSIS_MODE_COMBINED)
+    assert len(fake_llm.calls) == 1
+    assert '"resume":' not in fake_llm.calls[0]
+
+
+
+def counter(name):
+    return registry.snapshot()["counters"].get(f"dedup.{name}", 0)
+
+
+async def test_same_file_is_cache_hit_and_near_duplicate_keeps_own_text(fake_llm, resume_file, tmp_path):
+    processor = ResumeProcessor()
+    first = await processor.process_file(resume_file, '.txt', None, None, ANALYSIS_MODE_TWO_STEP)
+    cache_hits, hits = counter("cache_hits"), counter("hits")
+
+    # 同一文件再次上传：复用结果，不报告为自身的重复
+    again = await processor.process_file(resume_file, '.txt', None, None, ANALYSIS_MODE_TWO_STEP)
+    assert len(fake_llm.calls) == 1
+    assert again['resume_id'] == first['resume_id'] and 'duplicate_of' not in again
+    assert counter("cache_hits") == cache_hits + 1 and counter("hits") == hits
+
+    # 只有格式不同的简历：复用分析结果，但原文是本次上传的文本
+    edited = RESUME_TEXT.replace("Python, Django", "PYTHON ,  DJANGO")
+    path = tmp_path / "edited.txt"
+    path.write_text(edited, encoding="utf-8")
+    duplicate = await processor.process_file(str(path), '.txt', None, None, ANALYSIS_MODE_TWO_STEP)
+    assert len(fake_llm.calls) == 1
+    assert duplicate['duplicate_of'] == first['resume_id'] != duplicate['resume_id']
+    assert "PYTHON ,  DJANGO" in duplicate['raw_text']
+    assert duplicate['text_length'] == len(duplicate['raw_text']) != first['text_length']
+    assert counter("hits") == hits + 1
@@ -0,0 +1,103 @@
+from conftest import JOB_DESCRIPTION
+from job_matcher import JobMatcher
+from prompts import ANALYSIS_MODE_FAST
+from resume_processor import ResumeProcessor
+from rule_extractor import extract_resume, extract_skills, parse_date_range, segment_sections
+
+CHINESE_RESUME = """张三
+电话：138-1234-5678 | 邮箱：zhangsan@example.com
+【教育背景】
+清华大学  计算机科学与技术  本科  2014.09-2018.06
+工作经历
+字节跳动科技有限公司 | 高级后端工程师 | 2020.07 - 至今
+- 负责推荐服务开发，使用Python和Go
+- 维护Kafka消息管道
+阿里巴巴集团
+2018.07-2020.06  Java开发工程师
+负责交易系统。
+项目经验
+推荐引擎重构（2021.03-2021.12）
+- 基于Redis和Kafka实现实时特征
+专业技能
+熟悉Python、Django, 领域驱动设计
+证书
+CET-6、PMP
+"""
+
+ENGLISH_RESUME = """John Smith
+john.smith@example.com  +1 415 555 1234
+EDUCATION
+Stanford University, M.S. in Computer Science, 2016 - 2018
+EXPERIENCE
+Google LLC | Software Engineer | Jan 2019 - Present
+Built search ranking pipelines with Python and TensorFlow.
+SKILLS
+Python, Go, Kubernetes
+"""
+
+
+def test_chinese_resume_structure():
+    resume = extract_resume(CHINESE_RESUME, current=(2024, 7))
+    assert resume['personal_info'] == {'name': '张三', 'contact': '138-1234-5678', 'email': 'zhangsan@example.com'}
+    assert resume['education'] == [
+        {'school': '清华大学', 'major': '计算机科学与技术', 'degree': '本科', 'graduation_year': '2018'}
+    ]
+    current, previous = resume['work_experience']
+    assert (current['company'], current['position'], current['duration']) == \
+        ('字节跳动科技有限公司', '高级后端工程师', '2020.07 - 至今')
+    assert (current['start'], current['end'], current['years']) == ('2020-07', '2024-07', 4.0)
+    assert current['description'] == '负责推荐服务开发，使用Python和Go 维护Kafka消息管道'
+    # 公司名单独成行，时间和职位在下一行
+    assert (previous['company'], previous['position'], previous['duration'], previous['years']) == \
+        ('阿里巴巴集团', 'Java开发工程师', '2018.07-2020.06', 1.9)
+    assert resume['projects'] == [{'name': '推荐引擎重构', 'description': '基于Redis和Kafka实现实时特征',
+                                   'duration': '2021.03-2021.12', 'technologies': ['redis', 'kafka']}]
+    assert {'python', 'go', 'kafka', 'java', 'redis', 'django', '领域驱动设计'} <= set(resume['skills'])
+    assert resume['certificates'] == ['CET-6', 'PMP']
+
+
+def test_english_resume_structure():
+    resume = extract_resume(ENGLISH_RESUME, current=(2024, 7))
+    assert resume['personal_info'] == {'name': 'John Smith', 'contact': '+1 415 555 1234',
+                                       'email': 'john.smith@example.com'}
+    assert resume['education'] == [
+        {'school': 'Stanford University', 'major': 'Computer Science', 'degree': '硕士', 'graduation_year': '2018'}
+    ]
+    assert [(item['company'], item['position'], item['start'], item['years']) for item in resume['work_experience']] == \
+        [('Google LLC', 'Software Engineer', '2019-01', 5.5)]
+    assert resume['skills'] == ['python', 'tensorflow', 'go', 'kubernetes']
+    assert resume['projects'] == [] and resume['certificates'] == []
+
+
+def test_sections_and_inline_headings():
+    sections = segment_sections("李四\n技能：Python, Redis\n## Work Experience\n某公司 工程师\n")
+    assert sections == {'header': ['李四'], 'skills': ['Python, Redis'], 'work': ['某公司 工程师']}
+
+
+def test_skills_use_word_boundaries():
+    assert extract_skills("email: a@b.com, going to use Django") == ['django']
+    # 被更长技能包含的才去掉，django不包含go
+    assert extract_skills("Django 和 Go") == ['django', 'go']
+    assert extract_skills("", ["熟练掌握Spring、消息队列", "- Python / python"]) == ['Spring', '消息队列', 'Python']
+
+
+def test_date_ranges():
+    assert parse_date_range("2019年3月 至 2021年9月") == {
+        'duration': '2019年3月 至 2021年9月', 'start': '2019-03', 'end': '2021-09', 'years': 2.5
+    }
+    assert parse_date_range("Sep 2020 – present", current=(2021, 9))['years'] == 1.0
+    assert parse_date_range("至今", current=(2021, 9)) is None
+
+
+async def test_fast_mode_does_not_call_llm(fake_llm, resume_file):
+    resume_data = await ResumeProcessor().process_file(
+        resume_file, '.txt', JOB_DESCRIPTION, "后端工程师", ANALYSIS_MODE_FAST
+    )
+    assert fake_llm.calls == []
+    assert resume_data['personal_info']['name'] == '张三'
+    assert resume_data['education'][0]['school'] == '清华大学'
+    assert [stage['stage'] for stage in resume_data['skipped_stages']] == ['ai_resume_analysis', 'ai_assessment']
+
+    match = await JobMatcher().calculate_match(resume_data, JOB_DESCRIPTION, "后端工程师")
+    assert fake_llm.calls == []
+    assert match['skill_match']['match_rate'] > 0
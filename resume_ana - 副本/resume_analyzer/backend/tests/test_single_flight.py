@@ -0,0 +1,143 @@
+import asyncio
+from types import SimpleNamespace
+import httpx
+import pytest
+import main
+import deadline
+from deadline import Deadline
+from metrics import registry
+from single_flight import SingleFlight, deadline_bucket
+
+
+def counter(name):
+    return registry.snapshot()["counters"].get(f"single_flight.{name}", 0)
+
+
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test_share")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"score": 1}
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)), flight.do("other", work))
+    assert len(calls) == 2
+    assert results[0] is results[1] is results[2]
+    assert counter("test_share.saved_executions") == 2
+    assert len(flight) == 0
+
+    # 完成后相同的键重新执行
+    await flight.do("key", work)
+    assert len(calls) == 3
+
+
+async def test_error_is_propagated_to_all_waiters():
+    flight = SingleFlight("test_error")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("解析失败")
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(2)), return_exceptions=True)
+    assert [str(item) for item in results] == ["解析失败", "解析失败"]
+    assert len(flight) == 0
+
+
+async def test_cancelled_waiter_does_not_cancel_shared_work():
+    flight = SingleFlight("test_cancel")
+    started = asyncio.Event()
+    finished = []
+
+    async def work():
+        started.set()
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", work))
+    await started.wait()
+    second = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "done"
+    assert first.cancelled() and finished == [1]
+
+
+async def test_work_is_cancelled_when_every_waiter_leaves():
+    flight = SingleFlight("test_abandon")
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    waiters = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert cancelled == [1]
+    assert len(flight) == 0
+    assert counter("test_abandon.cancelled") == 1
+
+
+async def test_disabled_flight_runs_every_call():
+    flight = SingleFlight("test_disabled", enabled=False)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+
+    await asyncio.gather(flight.do("key", work), flight.do("key", work))
+    assert len(calls) == 2
+
+
+def test_deadline_bucket():
+    first, second = Deadline(120), Deadline(120)
+    second.expires_at = first.expires_at
+    assert deadline_bucket(first) == deadline_bucket(second)
+    assert deadline_bucket(Deadline(10)) != deadline_bucket(Deadline(120))
+    assert deadline_bucket(Deadline(10), width=1000) == deadline_bucket(Deadline(11), width=1000)
+
+
+@pytest.fixture
+def slow_analysis(monkeypatch):
+    """替换上传分析：记录每次执行使用的时间预算"""
+    budgets = []
+
+    async def process_file(file_path, file_extension, job_description, job_title, analysis_mode, deadline=None):
+        budgets.append(deadline.budget)
+        await asyncio.sleep(0.1)
+        return {"resume_id": "r1", "skills": ["Python"]}
+
+    async def calculate_match(resume_data, job_description, job_title, **kwargs):
+        return {"overall_match_score": 0.5}
+
+    # 固定时钟，同时到达的请求截止时间只取决于时间预算
+    monkeypatch.setattr(deadline, "time", SimpleNamespace(monotonic=lambda: 1000.0))
+    monkeypatch.setattr(main.resume_processor, "process_file", process_file)
+    monkeypatch.setattr(main.job_matcher, "calculate_match", calculate_match)
+    return budgets
+
+
+async def test_upload_only_coalesces_requests_with_similar_deadlines(slow_analysis):
+    form = {"job_description": "招聘后端工程师", "job_title": "后端工程师"}
+
+    async def upload(client, timeout):
+        response = await client.post("/upload/file", data=form, headers={"X-Request-Timeout": str(timeout)},
+                                     files={"file": ("resume.txt", "张三 Python".encode("utf-8"), "text/plain")})
+        assert response.status_code == 200
+        return response.json()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        results = await asyncio.gather(upload(client, 60), upload(client, 60), upload(client, 5))
+    # 时间预算更长的请求不使用只有5秒预算的分析结果
+    assert sorted(slow_analysis) == [5, 60]
+    assert all(result["match_result"]["overall_match_score"] == 0.5 for result in results)
@@ -0,0 +1,38 @@
+import text_extraction
+from text_extraction import html_to_text, markdown_to_text
+
+
+def test_markdown_structure_is_stripped():
+    document = (
+        "# 张三\n\n## 工作经历\n\n- **后端工程师** · *某科技公司*\n"
+        "- 详见 [项目主页](https://example.com) 和 `Python`\n\n> 年度优秀员工\n\n"
+        "| 技能 | 熟练度 |\n|---|---|\n| Redis | 熟练 |\n"
+    )
+    lines = [line.strip() for line in markdown_to_text(document).splitlines() if line.strip()]
+    assert lines == ["张三", "工作经历", "后端工程师 · 某科技公司", "详见 项目主页 和 Python", "年度优秀员工",
+                     "技能    熟练度", "Redis    熟练"]
+
+
+def test_emphasis_only_stripped_when_wrapping_text():
+    assert markdown_to_text("负责**Python**开发，熟悉*Go*") == "负责Python开发，熟悉Go"
+    assert markdown_to_text("*斜体* 与 _下划线_、__粗体__") == "斜体 与 下划线、粗体"
+    # 数字和单词之间的星号、下划线是原文的一部分
+    assert markdown_to_text("面积 2*3*4 平方米，2**10 次，a*b*c") == "面积 2*3*4 平方米，2**10 次，a*b*c"
+    assert markdown_to_text("变量 snake_case_name 和 x * y * z") == "变量 snake_case_name 和 x * y * z"
+
+
+def test_code_fence_is_kept_verbatim():
+    document = "技能\n```\nx = a*b*c  # **不处理**\n```\n**结束**"
+    assert markdown_to_text(document) == "技能\nx = a*b*c  # **不处理**\n结束"
+
+
+def test_html_skips_scripts_and_navigation(monkeypatch):
+    page = (
+        "<html><head><title>简历</title><style>.a{}</style></head><body><nav>首页</nav>"
+        "<h1>张三</h1><p>负责<b>Python</b>开发 &amp; 部署</p><script>var x = '<p>隐藏</p>';</script>"
+        "<table><tr><td>技能</td><td>Redis</td></tr></table><br/>结束</body></html>"
+    )
+    expected = "简历\n张三\n负责Python开发 & 部署\n技能\nRedis\n结束"
+    assert html_to_text(page) == expected
+    monkeypatch.setattr(text_extraction, "etree", None)
+    assert html_to_text(page) == expected
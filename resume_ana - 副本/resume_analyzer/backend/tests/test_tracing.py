@@ -0,0 +1,162 @@
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+import tracing
+from tracing import NOOP_SPAN, Trace, TraceExporter, TracingMiddleware, span, start_trace, to_otlp
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def traced(trace):
+    """把trace的根span设为当前span，返回用于恢复的token"""
+    return tracing._current_span.set(trace.root)
+
+
+def test_span_is_noop_without_trace():
+    with span("stage") as current:
+        assert current is NOOP_SPAN
+        current.set_attribute("ignored", 1)
+    assert tracing.current_span() is NOOP_SPAN
+
+
+def worker_stage():
+    with span("worker"):
+        pass
+
+
+def test_nested_spans_and_errors_build_waterfall():
+    trace = Trace("POST /upload/file")
+    token = traced(trace)
+    try:
+        with span("parse", {"bytes": 10}) as parse:
+            with span("llm") as llm:
+                llm.set_attribute("model", "doubao")
+                llm.set_attribute("skipped", None)
+        with pytest.raises(RuntimeError):
+            with span("match"):
+                raise RuntimeError("boom")
+        with ThreadPoolExecutor(1) as executor:
+            # 线程池任务经bind继承当前span
+            executor.submit(tracing.bind(worker_stage)).result()
+    finally:
+        tracing._current_span.reset(token)
+    trace.root.end()
+
+    waterfall = trace.waterfall()
+    spans = {item["name"]: item for item in waterfall["spans"]}
+    assert [item["name"] for item in waterfall["spans"]] == ["POST /upload/file", "parse", "llm", "match", "worker"]
+    assert spans["parse"]["depth"] == 1 and spans["parse"]["attributes"] == {"bytes": 10}
+    assert spans["llm"]["parent_id"] == parse.span_id and spans["llm"]["depth"] == 2
+    assert spans["llm"]["attributes"] == {"model": "doubao"}
+    assert spans["match"]["error"] == "RuntimeError: boom"
+    assert spans["worker"]["parent_id"] == trace.root.span_id
+    assert all(item["duration_ms"] >= 0 for item in waterfall["spans"])
+
+
+def test_max_spans_counts_dropped(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_MAX_SPANS", 2)
+    trace = Trace("GET /")
+    token = traced(trace)
+    try:
+        for _ in range(3):
+            with span("stage"):
+                pass
+    finally:
+        tracing._current_span.reset(token)
+    assert len(trace.spans) == 2 and trace.dropped == 1
+
+
+def test_traceparent_and_sampling(monkeypatch):
+    assert tracing._parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+    assert tracing._parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+    assert tracing._parse_traceparent("00-xyz-abc-01") == (None, None, False)
+    assert tracing._parse_traceparent(None) == (None, None, False)
+
+    monkeypatch.setattr(tracing, "exporter", TraceExporter("none"))
+    assert start_trace("GET /") is None
+    trace = start_trace("GET /", f"00-{TRACE_ID}-{PARENT_ID}-01", debug=True)
+    assert trace.trace_id == TRACE_ID and trace.root.parent_id == PARENT_ID and not trace.export
+
+    monkeypatch.setattr(tracing, "exporter", TraceExporter("console"))
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0)
+    assert start_trace("GET /") is None
+    # 上游已采样的请求总是导出
+    assert start_trace("GET /", f"00-{TRACE_ID}-{PARENT_ID}-01").export
+
+
+def test_otlp_payload_and_file_export(tmp_path, monkeypatch):
+    trace = Trace("GET /", TRACE_ID, PARENT_ID)
+    token = traced(trace)
+    try:
+        with pytest.raises(ValueError):
+            with span("stage", {"count": 3, "ratio": 0.5, "ok": True, "tags": ["a"], "name": "x"}):
+                raise ValueError("bad")
+    finally:
+        tracing._current_span.reset(token)
+    trace.root.end()
+
+    payload = to_otlp(trace)
+    spans = {item["name"]: item for item in payload["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+    assert spans["GET /"]["parentSpanId"] == PARENT_ID and spans["GET /"]["kind"] == 2
+    assert spans["stage"]["status"] == {"code": 2, "message": "ValueError: bad"}
+    assert {item["key"]: item["value"] for item in spans["stage"]["attributes"]} == {
+        "count": {"intValue": "3"}, "ratio": {"doubleValue": 0.5}, "ok": {"boolValue": True},
+        "tags": {"arrayValue": {"values": [{"stringValue": "a"}]}}, "name": {"stringValue": "x"}
+    }
+
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(tmp_path / "traces.jsonl"))
+    TraceExporter("file")._export(trace)
+    with open(tmp_path / "traces.jsonl", encoding="utf-8") as file:
+        assert json.loads(file.readline()) == payload
+    with pytest.raises(ValueError):
+        TraceExporter("zipkin")
+
+
+def client(monkeypatch):
+    monkeypatch.setattr(tracing, "exporter", TraceExporter("none"))
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, authorize_debug=lambda token: token == "secret")
+
+    @app.get("/json")
+    async def get_json():
+        with span("stage"):
+            await asyncio.sleep(0)
+        return {"status": "success"}
+
+    @app.get("/stream")
+    async def get_stream():
+        async def lines():
+            for index in range(2):
+                with span("item", current=False):
+                    yield json.dumps({"event": "result", "index": index}) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+
+def test_middleware_attaches_waterfall_to_debug_requests(monkeypatch):
+    test_client = client(monkeypatch)
+    response = test_client.get("/json", headers={"X-Debug-Trace": "secret"})
+    body = response.json()
+    assert body["status"] == "success"
+    assert [item["name"] for item in body["trace"]["spans"]] == ["GET /json", "stage"]
+    assert body["trace"]["spans"][0]["attributes"]["http.status_code"] == 200
+    assert response.headers["traceparent"] == f"00-{body['trace']['trace_id']}-{body['trace']['spans'][0]['span_id']}-01"
+    assert int(response.headers["content-length"]) == len(response.content)
+
+    lines = [json.loads(line) for line in test_client.get("/stream", headers={"X-Debug-Trace": "secret"}).text.splitlines()]
+    assert [line["event"] for line in lines] == ["result", "result", "trace"]
+    assert [item["name"] for item in lines[-1]["spans"]] == ["GET /stream", "item", "item"]
+
+
+def test_middleware_skips_untraced_and_unauthorized_requests(monkeypatch):
+    test_client = client(monkeypatch)
+    for headers in ({}, {"X-Debug-Trace": "wrong"}):
+        response = test_client.get("/json", headers=headers)
+        assert response.json() == {"status": "success"}
+        assert "traceparent" not in response.headers
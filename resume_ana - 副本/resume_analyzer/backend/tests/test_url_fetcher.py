@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from aiohttp import web
+import url_fetcher
+from url_fetcher import URLFetcher, URLFetchError
+
+PAGE = "<html><body><h1>张三</h1><p>后端工程师</p></body></html>"
+
+
+@pytest.fixture
+async def fetcher():
+    fetcher = URLFetcher(max_bytes=1000)
+    yield fetcher
+    await fetcher.close()
+
+
+@pytest.fixture
+async def server(aiohttp_server):
+    state = {"requests": 0, "active": 0, "max_active": 0}
+
+    async def page(request):
+        state["requests"] += 1
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text=PAGE, content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def plain(request):
+        return web.Response(text="张三 后端工程师", content_type="text/plain")
+
+    async def pdf(request):
+        return web.Response(body=b"%PDF-1.4", content_type="application/pdf")
+
+    async def large(request):
+        return web.Response(text="x" * 2000, content_type="text/html")
+
+    async def streamed(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for _ in range(20):
+            await response.write(b"x" * 100)
+        await response.write_eof()
+        return response
+
+    async def redirect(request):
+        remaining = int(request.match_info["remaining"])
+        if remaining == 0:
+            return web.Response(text=PAGE, content_type="text/html")
+        raise web.HTTPFound(f"/redirect/{remaining - 1}")
+
+    async def slow(request):
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        await asyncio.sleep(0.05)
+        state["active"] -= 1
+        return web.Response(text=PAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/page", page)
+    app.router.add_get("/plain", plain)
+    app.router.add_get("/pdf", pdf)
+    app.router.add_get("/large", large)
+    app.router.add_get("/streamed", streamed)
+    app.router.add_get("/redirect/{remaining}", redirect)
+    app.router.add_get("/slow", slow)
+    server = await aiohttp_server(app)
+    server.state = state
+    return server
+
+
+async def test_unchanged_page_is_served_from_cache_after_304(server, fetcher):
+    text, info = await fetcher.fetch_text(str(server.make_url("/page")))
+    assert text == PAGE and info["status"] == 200 and not info["not_modified"]
+
+    text, info = await fetcher.fetch_text(str(server.make_url("/page")))
+    assert text == PAGE
+    assert info["status"] == 304 and info["not_modified"] and info["bytes"] == 0
+    assert server.state["requests"] == 2
+
+
+async def test_response_larger_than_limit_is_rejected(server, fetcher):
+    with pytest.raises(URLFetchError, match="网页过大: 2000"):
+        await fetcher.fetch_text(str(server.make_url("/large")))
+    # 未声明长度的响应在读取过程中截止
+    with pytest.raises(URLFetchError, match="超过 1000 字节"):
+        await fetcher.fetch_text(str(server.make_url("/streamed")))
+
+
+async def test_redirects_are_capped(server, fetcher, monkeypatch):
+    monkeypatch.setattr(url_fetcher, "URL_MAX_REDIRECTS", 2)
+    text, info = await fetcher.fetch_text(str(server.make_url("/redirect/2")))
+    assert text == PAGE and info["final_url"].endswith("/redirect/0")
+    with pytest.raises(URLFetchError, match="重定向次数超过 2 次"):
+        await fetcher.fetch_text(str(server.make_url("/redirect/3")))
+
+
+async def test_connections_per_host_are_limited(server, fetcher, monkeypatch):
+    monkeypatch.setattr(url_fetcher, "URL_PER_HOST_LIMIT", 2)
+    await asyncio.gather(*(fetcher.fetch_text(str(server.make_url("/slow"))) for _ in range(6)))
+    assert server.state["max_active"] == 2
+
+
+async def test_non_html_content_types(server, fetcher):
+    text, _ = await fetcher.fetch_text(str(server.make_url("/plain")))
+    assert text == "张三 后端工程师"
+    with pytest.raises(URLFetchError, match="不支持的网页类型: application/pdf"):
+        await fetcher.fetch_text(str(server.make_url("/pdf")))
+    with pytest.raises(URLFetchError, match="不支持的URL"):
+        await fetcher.fetch_text("ftp://example.com/resume.html")
+
+
+def test_session_from_previous_event_loop_is_closed():
+    fetcher = URLFetcher()
+
+    async def get_session():
+        return await fetcher._get_session()
+
+    first = asyncio.run(get_session())
+    second = asyncio.run(get_session())
+    assert first is not second
+    assert first.closed and not second.closed
+    asyncio.run(fetcher.close())
+    assert second.closed
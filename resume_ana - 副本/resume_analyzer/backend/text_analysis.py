@@ -0,0 +1,138 @@
+import re
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+# 与 sklearn TfidfVectorizer 默认一致的分词规则
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+SENTENCE_PATTERN = re.compile(r'[.!?。！？\n]')
+
+# 岗位描述中常见的技术技能关键词
+TECH_SKILLS = [
+    'python', 'java', 'javascript', 'react', 'vue', 'angular', 'node.js',
+    'django', 'flask', 'spring', 'mysql', 'postgresql', 'mongodb',
+    'docker', 'kubernetes', 'aws', 'azure', 'git', 'linux',
+    'machine learning', 'deep learning', 'ai', 'data analysis',
+    'html', 'css', 'sql', 'redis', 'elasticsearch', 'microservices',
+    'agile', 'scrum', 'devops', 'ci/cd', 'api', 'graphql',
+    'testing', 'unit testing', 'integration testing', 'selenium', 'junit', 'testng',
+    '人工智能', '大数据', '数据分析', '深度学习', '机器学习', '前端', '后端', '全栈', '小程序',
+    '算法', '架构', '测试', '自动化测试', '项目管理', '产品经理', '运维', '云计算', '区块链',
+    '移动开发', '安卓', 'iOS', '嵌入式', '网络安全', '数据挖掘', '爬虫', '数据库', '分布式',
+    '高并发', '高可用', '微服务', '接口', '中台', 'ERP', 'CRM', 'OA', 'CMS', 'B2B', 'B2C',
+    'SaaS', 'PaaS', 'IaaS', '物联网', '边缘计算', '智能硬件', '虚拟现实', '增强现实', '5G',
+    '区块链', '智能合约', '数字货币', 'NFT', '云原生', '边缘计算', '容器化', '服务网格',
+    '持续集成', '持续部署', '自动化运维', '基础设施即代码', '监控', '日志分析', '性能优化',
+    '安全', '加密', '身份认证', '访问控制', '漏洞扫描', '渗透测试', '安全审计',
+    '数据可视化', 'BI', '报表', '数据仓库', 'ETL', '数据治理', '数据质量',
+    '数据建模', '数据挖掘', '数据科学', '统计分析', '自然语言处理',
+]
+
+# 岗位关键词提取时过滤的中文停用词
+KEYWORD_STOPWORDS = {'的', '了', '和', '是', '在', '与', '及', '为', '对', '等', '也', '就', '都', '而', '及其', '并', '或', '被', '由', '于'}
+
+
+def word_ngrams(tokens: List[str], ngram_range: Tuple[int, int] = (1, 2)) -> List[str]:
+    """去停用词后生成n-gram，规则与 sklearn 的 word analyzer 相同"""
+    tokens = [token for token in tokens if token not in ENGLISH_STOP_WORDS]
+    min_n, max_n = ngram_range
+    ngrams = list(tokens) if min_n == 1 else []
+    for n in range(max(min_n, 2), max_n + 1):
+        ngrams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return ngrams
+
+
+class AnalyzedDocument:
+    """
+    一次性完成的文本分析结果：规范化文本、分词、n-gram计数、句子切分和技能命中
+    简历和岗位描述各构建一次，供TF-IDF、主题模型、技能/经验/学历匹配等阶段共用
+    """
+
+    def __init__(self, text: str, parts: Optional[List[str]] = None):
+        self.text = text
+        self.parts = parts if parts is not None else [text]
+        self.normalized = text.lower()
+        matches = list(TOKEN_PATTERN.finditer(self.normalized))
+        self.tokens = [match.group() for match in matches]
+        self._token_starts = [match.start() for match in matches]
+        self.unigram_counts = Counter(word_ngrams(self.tokens, (1, 1)))
+        self.ngram_counts = Counter(word_ngrams(self.tokens, (1, 2)))
+        self.sentence_spans = self._split_sentences()
+        self.skill_hits = [skill for skill in TECH_SKILLS if skill in self.normalized]
+        self._keywords = None
+
+    def _split_sentences(self) -> List[Tuple[int, int]]:
+        """句子在规范化文本中的起止位置"""
+        spans = []
+        start = 0
+        for match in SENTENCE_PATTERN.finditer(self.normalized):
+            spans.append((start, match.start()))
+            start = match.end()
+        spans.append((start, len(self.normalized)))
+        return spans
+
+    def sentence_ngrams(self, min_length: int = 0) -> List[List[str]]:
+        """去掉首尾空白后长度超过min_length的句子，返回每句的n-gram（复用已有分词结果）"""
+        result = []
+        for start, end in self.sentence_spans:
+            if len(self.normalized[start:end].strip()) <= min_length:
+                continue
+            first = bisect_left(self._token_starts, start)
+            last = bisect_left(self._token_starts, end)
+            result.append(word_ngrams(self.tokens[first:last], (1, 2)))
+        return result
+
+    def keywords(self, top_n: int = 20) -> List[str]:
+        """出现次数最多的关键词（过滤中文停用词和单字）"""
+        if self._keywords is None:
+            counts = Counter(token for token in self.tokens if token not in KEYWORD_STOPWORDS)
+            self._keywords = [word for word, count in counts.most_common()]
+        return self._keywords[:top_n]
+
+
+@lru_cache(maxsize=64)
+def analyze_job_description(job_description: str) -> AnalyzedDocument:
+    """岗位描述的分析结果按内容缓存，批量分析同一岗位时只做一次"""
+    return AnalyzedDocument(job_description)
+
+
+def tfidf_vectors(counts: List[Counter], max_features: Optional[int] = None) -> np.ndarray:
+    """
+    由预先统计的词频直接计算TF-IDF矩阵（平滑idf、L2归一化，与 TfidfVectorizer 默认参数一致）
+    无需对文本重新分词
+    """
+    total = Counter()
+    df = Counter()
+    for doc_counts in counts:
+        total.update(doc_counts)
+        df.update(doc_counts.keys())
+    if not total:
+        raise ValueError("empty vocabulary")
+
+    vocabulary = sorted(total)
+    if max_features is not None and len(vocabulary) > max_features:
+        vocabulary = sorted(vocabulary, key=lambda term: -total[term])[:max_features]
+        vocabulary.sort()
+    index = {term: i for i, term in enumerate(vocabulary)}
+
+    matrix = np.zeros((len(counts), len(vocabulary)), dtype=np.float64)
+    for row, doc_counts in enumerate(counts):
+        for term, count in doc_counts.items():
+            column = index.get(term)
+            if column is not None:
+                matrix[row, column] = count
+
+    n_docs = len(counts)
+    idf = np.log((1 + n_docs) / (1 + np.array([df[term] for term in vocabulary], dtype=np.float64))) + 1
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> float:
+    denominator = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b / denominator) if denominator > 0 else 0.0
@@ -0,0 +1,226 @@
+import re
+import html
+import zipfile
+from html.parser import HTMLParser
+from typing import List
+from xml.etree.ElementTree import iterparse
+
+try:
+    from lxml import etree
+except ImportError:  # 未安装lxml时使用标准库的流式解析器
+    etree = None
+
+# 整个子树都不输出文本的标签
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'nav'}
+# 块级标签前后换行，单元格之间用空格分隔
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'hr', 'li', 'ul', 'ol', 'dl', 'dt', 'dd', 'tr', 'table', 'thead', 'tbody',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'title', 'section', 'article', 'header', 'footer',
+    'aside', 'main', 'blockquote', 'pre', 'form', 'address', 'figure', 'figcaption'
+}
+CELL_TAGS = {'td', 'th'}
+
+
+class _TextCollector:
+    """
+    HTML解析事件的接收器：只收集文本，不构建DOM；进入SKIP_TAGS时跳过整个子树
+    接口与 lxml 的 parser target 一致，标准库解析器通过 _StdlibHTMLParser 转发事件
+    """
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def start(self, tag, attrib=None):
+        tag = tag.lower() if isinstance(tag, str) else ''
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif not self._skip_depth:
+            if tag in BLOCK_TAGS:
+                self.parts.append('\n')
+            elif tag in CELL_TAGS:
+                self.parts.append('  ')
+
+    def end(self, tag):
+        tag = tag.lower() if isinstance(tag, str) else ''
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif not self._skip_depth and tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+    def close(self) -> str:
+        return ''.join(self.parts)
+
+
+class _StdlibHTMLParser(HTMLParser):
+    """标准库流式HTML解析器，把事件转发给 _TextCollector"""
+
+    def __init__(self, collector: _TextCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/> 等自闭合标签只换行，不影响跳过深度
+        if tag not in SKIP_TAGS:
+            self.collector.start(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def clean_lines(text: str) -> str:
+    """去除每行首尾空白，按连续两个空格拆分短语，丢弃空行"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+
+def html_to_text(html_content: str) -> str:
+    """
+    提取HTML正文文本，跳过script/style/nav等子树
+    安装了lxml时使用其C解析器（target模式，只回调事件、不建树），否则使用标准库流式解析
+    """
+    collector = _TextCollector()
+    if etree is not None:
+        parser = etree.HTMLParser(target=collector, remove_comments=True, remove_pis=True)
+        parser.feed(html_content)
+        text = parser.close()
+    else:
+        parser = _StdlibHTMLParser(collector)
+        parser.feed(html_content)
+        parser.close()
+        text = collector.close()
+    return clean_lines(text)
+
+
+_FENCE_PATTERN = re.compile(r'^[ \t]{0,3}(```|~~~)')
+# 规则作用于整段文本（MULTILINE），用[ \t]而不是\s，避免跨行匹配
+_BLOCK_RULES = [
+    (re.compile(r'^[ \t]{0,3}#{1,6}[ \t]+(.*?)([ \t]+#+)?[ \t]*$', re.M), r'\1'),     # ATX标题
+    (re.compile(r'^[ \t]{0,3}([-*_])([ \t]*\1){2,}[ \t]*$', re.M), ''),               # 分隔线
+    (re.compile(r'^[ \t]{0,3}=+[ \t]*$', re.M), ''),                                  # Setext标题下划线
+    (re.compile(r'^[ \t]{0,3}\[[^\]\n]+\]:[ \t]*\S+.*$', re.M), ''),                  # 引用式链接定义
+    (re.compile(r'^[ \t]*\|?([ \t]*:?-+:?[ \t]*\|)+[ \t]*(:?-+:?[ \t]*)?$', re.M), ''),  # 表格分隔行
+    (re.compile(r'^[ \t]*(>[ \t]?)+', re.M), ''),                                     # 引用
+    (re.compile(r'^[ \t]*([-*+]|\d+[.)])[ \t]+(\[[ xX]\][ \t]+)?', re.M), ''),        # 列表标记和任务框
+    (re.compile(r'^[ \t]*\|(.*?)\|?[ \t]*$', re.M), lambda m: m.group(1).replace('|', '  ')),  # 表格行
+    (re.compile(r'!\[([^\]\n]*)\]\([^)\n]*\)'), r'\1'),                               # 图片
+    (re.compile(r'\[([^\]\n]*)\]\([^)\n]*\)'), r'\1'),                                # 行内链接
+    (re.compile(r'\[([^\]\n]*)\]\[[^\]\n]*\]'), r'\1'),                               # 引用式链接
+    (re.compile(r'<((?:https?|mailto):[^>\s]+|[^>\s@]+@[^>\s]+)>'), r'\1'),           # 自动链接
+    (re.compile(r'</?[A-Za-z][^>\n]*>'), ''),                                         # 内嵌HTML标签
+    (re.compile(r'`+([^`\n]*)`+'), r'\1'),                                            # 行内代码
+    # 强调标记只在包裹文字、且两侧不是单词字符时去掉，2*3*4、a**b这类表达式保持原样
+    # *的两侧按ASCII字母数字判断，中文紧挨着的 **Python** 仍按强调处理；_与CommonMark一致，两侧不能是任何单词字符
+    (re.compile(r'(?<![0-9A-Za-z])\*\*(\S.*?\S|\S)\*\*(?![0-9A-Za-z])'), r'\1'),           # 粗体
+    (re.compile(r'(?<!\w)__(\S.*?\S|\S)__(?!\w)'), r'\1'),
+    (re.compile(r'(?<![0-9A-Za-z])\*(\S.*?\S|\S)\*(?![0-9A-Za-z])'), r'\1'),               # 斜体
+    (re.compile(r'(?<!\w)_(\S.*?\S|\S)_(?!\w)'), r'\1'),
+    (re.compile(r'~~(.+?)~~'), r'\1'),                                                # 删除线
+    (re.compile(r'\\([\\`*_{}\[\]()#+\-.!|>])'), r'\1'),                              # 转义字符
+]
+
+
+def _markdown_block_to_text(block: str) -> str:
+    for pattern, replacement in _BLOCK_RULES:
+        block = pattern.sub(replacement, block)
+    return block
+
+
+def markdown_to_text(md_content: str) -> str:
+    """把Markdown直接转换为纯文本，不经过HTML渲染和解析；代码块内容原样保留"""
+    output = []
+    block = []
+    in_fence = False
+    for line in md_content.splitlines():
+        if _FENCE_PATTERN.match(line):
+            if not in_fence:
+                output.append(_markdown_block_to_text('\n'.join(block)))
+            else:
+                output.append('\n'.join(block))
+            block = []
+            in_fence = not in_fence
+            continue
+        block.append(line)
+    text = '\n'.join(block)
+    output.append(text if in_fence else _markdown_block_to_text(text))
+    return html.unescape('\n'.join(output))
+
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+_W_P, _W_T, _W_TAB, _W_BR, _W_CR = _W + 'p', _W + 't', _W + 'tab', _W + 'br', _W + 'cr'
+_W_TC, _W_TR = _W + 'tc', _W + 'tr'
+
+
+def docx_to_text(file_path: str) -> str:
+    """
+    直接解析DOCX压缩包中的 word/document.xml，按文档顺序输出段落、表格和文本框中的文字
+    增量解析（iterparse），处理完的元素立即从树中移除，内存占用与文档大小无关
+    表格每行输出一行，单元格之间用制表符分隔
+    """
+    lines: List[str] = []
+    # 未结束的段落（文本框中的段落嵌套在外层段落内）、表格行和单元格，嵌套时逐层入栈
+    paragraphs: List[List[str]] = []
+    rows: List[List[str]] = []
+    cells: List[List[str]] = []
+    elements = []
+    fallback_depth = 0
+
+    with zipfile.ZipFile(file_path) as archive, archive.open('word/document.xml') as document:
+        for event, elem in iterparse(document, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                elements.append(elem)
+                if tag == _MC_FALLBACK:
+                    # 兼容性备用内容（如VML文本框）与主内容重复，整体跳过
+                    fallback_depth += 1
+                elif fallback_depth:
+                    pass
+                elif tag == _W_P:
+                    paragraphs.append([])
+                elif tag == _W_TR:
+                    rows.append([])
+                elif tag == _W_TC:
+                    cells.append([])
+                continue
+
+            elements.pop()
+            if tag == _MC_FALLBACK:
+                fallback_depth -= 1
+            elif fallback_depth:
+                pass
+            elif tag == _W_T:
+                if paragraphs and elem.text:
+                    paragraphs[-1].append(elem.text)
+            elif tag == _W_TAB:
+                if paragraphs:
+                    paragraphs[-1].append('\t')
+            elif tag == _W_BR or tag == _W_CR:
+                if paragraphs:
+                    paragraphs[-1].append('\n')
+            elif tag == _W_P:
+                (cells[-1] if cells else lines).append(''.join(paragraphs.pop()))
+            elif tag == _W_TC:
+                cell = ' '.join(part for part in cells.pop() if part)
+                if rows:
+                    rows[-1].append(cell)
+            elif tag == _W_TR:
+                (cells[-1] if cells else lines).append('\t'.join(rows.pop()))
+
+            # 处理完的元素从父元素中移除，保持内存有界
+            if elements:
+                elements[-1].remove(elem)
+
+    return '\n'.join(lines).strip()
+
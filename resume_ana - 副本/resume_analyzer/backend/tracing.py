@@ -0,0 +1,398 @@
+import os
+import json
+import time
+import queue
+import random
+import tempfile
+import threading
+import contextvars
+import functools
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+import requests
+from starlette.datastructures import Headers, MutableHeaders
+from metrics import registry
+
+# 导出方式：none（默认，只在调试请求中记录）、console（打印到标准输出）、file（追加到TRACE_FILE）、otlp（发送到OTLP/HTTP收集器）
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(tempfile.gettempdir(), "resume_analyzer_traces.jsonl"))
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "resume-analyzer")
+# 导出的请求比例（0~1），调试请求和上游标记为已采样（traceparent）的请求总是记录
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1"))
+# 单个请求最多记录的span数，超出的只计数
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "2000"))
+TRACE_EXPORT_QUEUE = 1000
+# 携带该请求头（值为管理令牌）时把span瀑布图附在响应中
+TRACE_DEBUG_HEADER = "X-Debug-Trace"
+
+EXPORTERS = {"none", "console", "file", "otlp"}
+# OTLP的span类型与状态码
+_KIND_INTERNAL = 1
+_KIND_SERVER = 2
+_STATUS_UNSET = 0
+_STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("trace_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """一个计时区间，属性和状态按OpenTelemetry的约定记录"""
+
+    __slots__ = ('name', 'trace', 'span_id', 'parent_id', 'kind', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name: str, trace: 'Trace', parent_id: Optional[str], kind: int = _KIND_INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_error(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.add(self)
+
+
+class _NoopSpan:
+    """请求未被追踪时使用，所有操作为空"""
+
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """一个请求内的所有span"""
+
+    def __init__(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+                 export: bool = True):
+        self.trace_id = trace_id or _new_id(128)
+        self.export = export
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self.root = Span(name, self, parent_id, kind=_KIND_SERVER)
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            if len(self.spans) < TRACE_MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.root.span_id}-01"
+
+    def waterfall(self) -> Dict[str, Any]:
+        """按开始时间排列的span瀑布图，时间为相对请求开始的毫秒数"""
+        origin = self.root.start_ns
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+            dropped = self.dropped
+        depths = {self.root.parent_id: -1}
+        items = []
+        for span in spans:
+            depth = depths.get(span.parent_id, -1) + 1
+            depths[span.span_id] = depth
+            items.append({
+                'name': span.name,
+                'span_id': span.span_id,
+                'parent_id': span.parent_id,
+                'depth': depth,
+                'start_ms': round((span.start_ns - origin) / 1e6, 3),
+                'duration_ms': round((span.end_ns - span.start_ns) / 1e6, 3),
+                'attributes': span.attributes,
+                'error': span.error
+            })
+        return {
+            'trace_id': self.trace_id,
+            'duration_ms': round(((self.root.end_ns or time.time_ns()) - origin) / 1e6, 3),
+            'dropped_spans': dropped,
+            'spans': items
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if isinstance(value, (list, tuple)):
+        return {'arrayValue': {'values': [_otlp_value(item) for item in value]}}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    """转换为OTLP/JSON格式（ExportTraceServiceRequest），可直接发送到OpenTelemetry收集器"""
+    with trace._lock:
+        finished = list(trace.spans)
+    spans = []
+    for span in finished:
+        item = {
+            'traceId': trace.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': span.kind,
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in span.attributes.items()],
+            'status': {'code': _STATUS_ERROR, 'message': span.error} if span.error else {'code': _STATUS_UNSET}
+        }
+        if span.parent_id:
+            item['parentSpanId'] = span.parent_id
+        spans.append(item)
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': TRACE_SERVICE_NAME}}]},
+            'scopeSpans': [{'scope': {'name': 'resume_analyzer'}, 'spans': spans}]
+        }]
+    }
+
+
+class TraceExporter:
+    """后台线程导出已完成的请求，不阻塞请求处理；队列满时丢弃"""
+
+    def __init__(self, exporter: str = TRACE_EXPORTER):
+        if exporter not in EXPORTERS:
+            raise ValueError(f"不支持的TRACE_EXPORTER: {exporter}，支持: {', '.join(sorted(EXPORTERS))}")
+        self.exporter = exporter
+        self._queue: queue.Queue = queue.Queue(maxsize=TRACE_EXPORT_QUEUE)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter != "none"
+
+    def submit(self, trace: Trace) -> None:
+        if not self.enabled:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            registry.inc("tracing.export_dropped")
+
+    def _run(self) -> None:
+        while True:
+            trace = self._queue.get()
+            try:
+                self._export(trace)
+                registry.inc("tracing.exported")
+            except Exception as e:
+                registry.inc("tracing.export_errors")
+                print(f"追踪数据导出失败: {str(e)}")
+
+    def _export(self, trace: Trace) -> None:
+        payload = to_otlp(trace)
+        if self.exporter == "otlp":
+            if self._session is None:
+                self._session = requests.Session()
+            response = self._session.post(TRACE_OTLP_ENDPOINT, json=payload, timeout=5)
+            response.raise_for_status()
+            return
+        line = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+        if self.exporter == "console":
+            print(line)
+        else:
+            with open(TRACE_FILE, 'a', encoding='utf-8') as file:
+                file.write(line + "\n")
+
+
+exporter = TraceExporter()
+
+
+def _parse_traceparent(value: Optional[str]):
+    """解析W3C traceparent请求头，返回 (trace_id, parent_span_id, 是否已采样)"""
+    parts = (value or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None, None, False
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None, None, False
+    return parts[1], parts[2], sampled
+
+
+def start_trace(name: str, traceparent: Optional[str] = None, debug: bool = False) -> Optional[Trace]:
+    """开始追踪一个请求；未开启导出且不是调试请求，或未被采样时返回None"""
+    trace_id, parent_id, sampled = _parse_traceparent(traceparent)
+    export = exporter.enabled and (sampled or random.random() < TRACE_SAMPLE_RATE)
+    if not export and not debug:
+        return None
+    registry.inc("tracing.traces")
+    return Trace(name, trace_id, parent_id, export=export)
+
+
+def finish_trace(trace: Trace) -> None:
+    trace.root.end()
+    if trace.export:
+        exporter.submit(trace)
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, current: bool = True):
+    """
+    在当前请求的追踪中记录一个span，未追踪时为空操作
+    current=False时不作为后续span的父级，用于生成器等会跨越yield的场景
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = Span(name, parent.trace, parent.span_id, attributes=attributes)
+    token = _current_span.set(child) if current else None
+    try:
+        yield child
+    except GeneratorExit:
+        child.set_attribute('cancelled', True)
+        raise
+    except BaseException as e:
+        child.record_error(e)
+        raise
+    finally:
+        child.end()
+        if token is not None:
+            _current_span.reset(token)
+
+
+def bind(func: Callable) -> Callable:
+    """提交到线程池的任务继承当前span（ThreadPoolExecutor.submit不会传递contextvars）"""
+    if _current_span.get() is None:
+        return func
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+class TracingMiddleware:
+    """
+    为每个HTTP请求创建根span，响应结束后导出（ASGI中间件），响应头traceparent为本请求的追踪ID
+    X-Debug-Trace请求头通过authorize_debug校验后，把span瀑布图附在响应中：
+    JSON响应增加trace字段，NDJSON流末尾增加一行 {"event": "trace", ...}
+    """
+
+    def __init__(self, app, authorize_debug: Optional[Callable[[str], bool]] = None):
+        self.app = app
+        self.authorize_debug = authorize_debug
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        debug_token = headers.get(TRACE_DEBUG_HEADER)
+        debug = bool(debug_token) and self.authorize_debug is not None and self.authorize_debug(debug_token)
+        trace = start_trace(f"{scope['method']} {scope['path']}", headers.get("traceparent"), debug)
+        if trace is None:
+            await self.app(scope, receive, send)
+            return
+
+        root = trace.root
+        root.set_attributes({'http.method': scope['method'], 'http.target': scope['path']})
+        token = _current_span.set(root)
+        mode = None
+        start_message = None
+        buffered: List[bytes] = []
+
+        async def send_traced(message):
+            nonlocal mode, start_message
+            if message["type"] == "http.response.start":
+                root.set_attribute('http.status_code', message["status"])
+                response_headers = MutableHeaders(scope=message)
+                response_headers["traceparent"] = trace.traceparent()
+                content_type = response_headers.get("content-type", "")
+                if debug and content_type.startswith("application/json"):
+                    mode = "json"
+                elif debug and content_type.startswith("application/x-ndjson"):
+                    mode = "ndjson"
+                if mode == "json":
+                    # 等完整响应体到达后再发送响应头（Content-Length会变化）
+                    start_message = message
+                    return
+                await send(message)
+                return
+            if message["type"] != "http.response.body" or mode is None:
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    root.end()
+                await send(message)
+                return
+
+            more_body = message.get("more_body", False)
+            if mode == "json":
+                buffered.append(message.get("body", b""))
+                if more_body:
+                    return
+                root.end()
+                body = b"".join(buffered)
+                try:
+                    content = json.loads(body)
+                    if isinstance(content, dict):
+                        content['trace'] = trace.waterfall()
+                        body = json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                except ValueError:
+                    pass
+                MutableHeaders(scope=start_message)["Content-Length"] = str(len(body))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+            if more_body:
+                await send(message)
+                return
+            root.end()
+            await send({"type": "http.response.body", "body": message.get("body", b""), "more_body": True})
+            event = dict(trace.waterfall(), event='trace')
+            line = json.dumps(event, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b"\n"
+            await send({"type": "http.response.body", "body": line, "more_body": False})
+
+        try:
+            await self.app(scope, receive, send_traced)
+        except BaseException as e:
+            root.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            finish_trace(trace)
@@ -0,0 +1,175 @@
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+import aiohttp
+from metrics import registry
+
+# 单次抓取的总超时与连接超时（秒）
+URL_FETCH_TIMEOUT = float(os.getenv("URL_FETCH_TIMEOUT", "15"))
+URL_CONNECT_TIMEOUT = float(os.getenv("URL_CONNECT_TIMEOUT", "5"))
+# 响应体大小上限（字节），超过后中止读取
+URL_MAX_BYTES = int(os.getenv("URL_MAX_BYTES", str(5 * 1024 * 1024)))
+URL_MAX_REDIRECTS = int(os.getenv("URL_MAX_REDIRECTS", "5"))
+# 连接池总连接数与单个主机的连接数上限
+URL_POOL_LIMIT = int(os.getenv("URL_POOL_LIMIT", "100"))
+URL_PER_HOST_LIMIT = int(os.getenv("URL_PER_HOST_LIMIT", "8"))
+# 条件请求缓存的网页数量（ETag/Last-Modified）
+URL_CACHE_MAX = int(os.getenv("URL_CACHE_MAX", "256"))
+
+READ_CHUNK_SIZE = 64 * 1024
+# 可以按网页解析的响应类型（text/* 之外），其他类型如PDF、图片直接拒绝
+TEXT_CONTENT_TYPES = ('application/xhtml+xml', 'application/xml')
+
+
+class URLFetchError(Exception):
+    """网页抓取失败"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class URLFetcher:
+    """
+    共享连接池的网页抓取器：限制超时、重定向次数和响应大小，流式读取响应体，
+    并缓存ETag/Last-Modified，再次抓取未变化的网页时只需一次304响应
+    """
+
+    def __init__(self, max_bytes: int = URL_MAX_BYTES, cache_max: int = URL_CACHE_MAX):
+        self.max_bytes = max_bytes
+        self.cache_max = cache_max
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """会话与事件循环绑定，循环变化时关闭旧会话并重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._session_loop is not loop:
+            await self._close_stale_session(self._session, self._session_loop)
+            self._session = None
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=URL_POOL_LIMIT, limit_per_host=URL_PER_HOST_LIMIT, ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=URL_FETCH_TIMEOUT, sock_connect=URL_CONNECT_TIMEOUT),
+                headers={"User-Agent": "resume-analyzer/1.0"}
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def _close_stale_session(self, session: aiohttp.ClientSession, loop) -> None:
+        """旧循环仍在其他线程运行时交给它关闭；已停止或关闭的循环上连接已失效，直接在当前循环关闭会话"""
+        if session.closed:
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        try:
+            await session.close()
+        except Exception as e:
+            print(f"关闭旧的抓取会话失败: {str(e)}")
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _cached(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is not None:
+                self._cache.move_to_end(url)
+            return entry
+
+    def _store(self, url: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[url] = entry
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.cache_max:
+                self._cache.popitem(last=False)
+
+    def _evict(self, url: str) -> None:
+        with self._lock:
+            self._cache.pop(url, None)
+
+    async def fetch_text(self, url: str) -> Tuple[str, Dict[str, Any]]:
+        """抓取网页并返回 (文本, 抓取信息)，失败时抛出URLFetchError"""
+        if urlsplit(url).scheme not in ('http', 'https'):
+            raise URLFetchError(f"不支持的URL: {url}")
+
+        registry.inc("url_fetch.requests")
+        started = time.perf_counter()
+        cached = self._cached(url)
+        headers = {}
+        if cached is not None:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            session = await self._get_session()
+            # aiohttp在重定向次数达到max_redirects时即报错，加1后允许恰好URL_MAX_REDIRECTS次
+            async with session.get(url, headers=headers, max_redirects=URL_MAX_REDIRECTS + 1) as response:
+                if response.status == 304 and cached is not None:
+                    registry.inc("url_fetch.not_modified")
+                    return cached['text'], {
+                        'url': url, 'final_url': cached['final_url'], 'status': 304,
+                        'not_modified': True, 'bytes': 0
+                    }
+                if response.status != 200:
+                    raise URLFetchError(f"无法访问URL: {response.status}", response.status)
+                # 未声明类型时按网页处理
+                if 'Content-Type' in response.headers and not (
+                    response.content_type.startswith('text/') or response.content_type in TEXT_CONTENT_TYPES
+                ):
+                    raise URLFetchError(f"不支持的网页类型: {response.content_type}")
+                if response.content_length is not None and response.content_length > self.max_bytes:
+                    raise URLFetchError(f"网页过大: {response.content_length} 字节（上限 {self.max_bytes}）")
+
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                    body.extend(chunk)
+                    if len(body) > self.max_bytes:
+                        raise URLFetchError(f"网页过大: 超过 {self.max_bytes} 字节")
+
+                text = bytes(body).decode(response.charset or 'utf-8', errors='replace')
+                final_url = str(response.url)
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                if etag or last_modified:
+                    self._store(url, {
+                        'text': text, 'final_url': final_url, 'etag': etag, 'last_modified': last_modified
+                    })
+                elif cached is not None:
+                    self._evict(url)
+                registry.inc("url_fetch.bytes", len(body))
+                return text, {
+                    'url': url, 'final_url': final_url, 'status': 200,
+                    'not_modified': False, 'bytes': len(body)
+                }
+        except URLFetchError:
+            registry.inc("url_fetch.errors")
+            raise
+        except aiohttp.TooManyRedirects:
+            registry.inc("url_fetch.errors")
+            raise URLFetchError(f"重定向次数超过 {URL_MAX_REDIRECTS} 次")
+        except asyncio.TimeoutError:
+            registry.inc("url_fetch.errors")
+            raise URLFetchError(f"抓取超时（>{URL_FETCH_TIMEOUT:g}秒）")
+        except aiohttp.ClientError as e:
+            registry.inc("url_fetch.errors")
+            raise URLFetchError(f"无法访问URL: {str(e)}")
+        finally:
+            registry.observe("url_fetch.seconds", time.perf_counter() - started)
+
+
+url_fetcher = URLFetcher()
@@ -489,6 +489,10 @@ document.addEventListener('DOMContentLoaded', async function() {
         
         formData.append('job_title', jobTitle);
         formData.append('job_description', jobDescription);
+        // 流式返回：每分析完一个文件就返回一行结果
+        formData.append('stream', 'true');
+        // 列表只展示得分，不需要原文和分析报告
+        formData.append('view', 'summary');
         
         // 逐个添加文件，使用相同的字段名
         for (let i = 0; i < files.length; i++) {
@@ -514,14 +518,25 @@ document.addEventListener('DOMContentLoaded', async function() {
                 body: formData
             });
 
-            const result = await response.json();
-            console.log('批量分析响应:', result);
-            
-            if (response.ok) {
-                displayBatchResults(result);
-            } else {
+            if (!response.ok) {
+                const result = await response.json();
                 console.error('批量分析失败:', result);
                 showError(result.detail || '批量分析失败');
+                return;
+            }
+            
+            // 逐行读取NDJSON，结果到达即渲染
+            startBatchResults(files.length);
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => handleBatchEvent(JSON.parse(line)));
             }
         } catch (error) {
             console.error('批量分析网络错误:', error);
@@ -647,6 +662,52 @@ document.addEventListener('DOMContentLoaded', async function() {
         `;
     }
 
+    function renderBatchRow(item, rank) {
+        const score = item.match_result.overall_match_score;
+        const scoreClass = getScoreClass(score);
+        
+        return `
+            <div class="row align-items-center mb-3 p-3 border rounded batch-row" data-score="${score}">
+                <div class="col-md-3">
+                    <h6 class="mb-1">${item.filename}</h6>
+                    <small class="text-muted batch-rank">排名 #${rank}</small>
+                </div>
+                <div class="col-md-2 text-center">
+                    <div class="score-circle ${scoreClass}" style="width: 60px; height: 60px; font-size: 1rem;">
+                        ${Math.round(score * 100)}%
+                    </div>
+                </div>
+                <div class="col-md-7">
+                    <div class="row">
+                        <div class="col-6">
+                            <small class="text-muted">技能匹配</small>
+                            <div class="progress progress-sm">
+                                <div class="progress-bar" style="width: ${item.match_result.skill_match.match_rate * 100}%"></div>
+                            </div>
+                        </div>
+                        <div class="col-6">
+                            <small class="text-muted">经验匹配</small>
+                            <div class="progress progress-sm">
+                                <div class="progress-bar" style="width: ${item.match_result.experience_match.match_score * 100}%"></div>
+                            </div>
+                        </div>
+                    </div>
+                    <div class="mt-2">
+                        ${item.match_result.skill_match.matched_skills.slice(0, 3).map(skill => 
+                            `<span class="skill-tag" style="font-size: 0.7rem;">${skill}</span>`
+                        ).join('')}
+                    </div>
+                </div>
+            </div>
+        `;
+    }
+
+    function renderBatchFailure(item) {
+        return `<div class="alert alert-danger py-2">
+            <strong>${item.filename}</strong>: ${item.error}
+        </div>`;
+    }
+
     function displayBatchResults(result) {
         const batchResults = document.getElementById('batchResults');
         let html = `
@@ -663,43 +724,7 @@ document.addEventListener('DOMContentLoaded', async function() {
             .sort((a, b) => b.match_result.overall_match_score - a.match_result.overall_match_score);
         
         sortedResults.forEach((item, index) => {
-            const score = item.match_result.overall_match_score;
-            const scoreClass = getScoreClass(score);
-            
-            html += `
-                <div class="row align-items-center mb-3 p-3 border rounded">
-                    <div class="col-md-3">
-                        <h6 class="mb-1">${item.filename}</h6>
-                        <small class="text-muted">排名 #${index + 1}</small>
-                    </div>
-                    <div class="col-md-2 text-center">
-                        <div class="score-circle ${scoreClass}" style="width: 60px; height: 60px; font-size: 1rem;">
-                            ${Math.round(score * 100)}%
-                        </div>
-                    </div>
-                    <div class="col-md-7">
-                        <div class="row">
-                            <div class="col-6">
-                                <small class="text-muted">技能匹配</small>
-                                <div class="progress progress-sm">
-                                    <div class="progress-bar" style="width: ${item.match_result.skill_match.match_rate * 100}%"></div>
-                                </div>
-                            </div>
-                            <div class="col-6">
-                                <small class="text-muted">经验匹配</small>
-                                <div class="progress progress-sm">
-                                    <div class="progress-bar" style="width: ${item.match_result.experience_match.match_score * 100}%"></div>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="mt-2">
-                            ${item.match_result.skill_match.matched_skills.slice(0, 3).map(skill => 
-                                `<span class="skill-tag" style="font-size: 0.7rem;">${skill}</span>`
-                            ).join('')}
-                        </div>
-                    </div>
-                </div>
-            `;
+            html += renderBatchRow(item, index + 1);
         });
         
         const failedResults = result.results.filter(r => r.status === 'error');
@@ -707,11 +732,7 @@ document.addEventListener('DOMContentLoaded', async function() {
             html += `
                 <div class="mt-4">
                     <h6 class="text-danger">处理失败的文件：</h6>
-                    ${failedResults.map(item => 
-                        `<div class="alert alert-danger py-2">
-                            <strong>${item.filename}</strong>: ${item.error}
-                        </div>`
-                    ).join('')}
+                    ${failedResults.map(renderBatchFailure).join('')}
                 </div>
             `;
         }
@@ -724,6 +745,60 @@ document.addEventListener('DOMContentLoaded', async function() {
         batchResults.innerHTML = html;
     }
 
+    // 流式批量分析的进度
+    const batchStream = { total: 0, completed: 0, failed: 0 };
+
+    function startBatchResults(total) {
+        batchStream.total = total;
+        batchStream.completed = 0;
+        batchStream.failed = 0;
+        document.getElementById('batchResults').innerHTML = `
+            <div class="result-card">
+                <div class="card-header bg-info text-white">
+                    <h5 class="mb-0">批量分析结果</h5>
+                    <small id="batchProgress">已完成 0 / ${total} 个文件</small>
+                </div>
+                <div class="card-body">
+                    <div id="batchRows"></div>
+                    <div id="batchFailures" class="mt-4" style="display: none;">
+                        <h6 class="text-danger">处理失败的文件：</h6>
+                    </div>
+                </div>
+            </div>
+        `;
+    }
+
+    function handleBatchEvent(event) {
+        const progress = document.getElementById('batchProgress');
+        if (event.event === 'summary') {
+            progress.textContent = `共处理 ${event.total_files} 个文件` +
+                (event.failed_files ? `，失败 ${event.failed_files} 个` : '');
+            return;
+        }
+        if (event.event !== 'result') return;
+        
+        batchStream.completed += 1;
+        if (event.status === 'success') {
+            // 按得分插入到对应位置，并更新排名
+            const rows = document.getElementById('batchRows');
+            const score = event.match_result.overall_match_score;
+            const next = Array.from(rows.children).find(row => parseFloat(row.dataset.score) < score);
+            const template = document.createElement('template');
+            template.innerHTML = renderBatchRow(event, 0).trim();
+            rows.insertBefore(template.content.firstChild, next || null);
+            rows.querySelectorAll('.batch-rank').forEach((rank, index) => {
+                rank.textContent = `排名 #${index + 1}`;
+            });
+        } else {
+            batchStream.failed += 1;
+            const failures = document.getElementById('batchFailures');
+            failures.style.display = 'block';
+            failures.insertAdjacentHTML('beforeend', renderBatchFailure(event));
+        }
+        progress.textContent = `已完成 ${batchStream.completed} / ${batchStream.total} 个文件` +
+            (batchStream.failed ? `，失败 ${batchStream.failed} 个` : '');
+    }
+
     function displayUrlResult(result) {
         const urlResults = document.getElementById('urlResults');
         urlResults.innerHTML = `